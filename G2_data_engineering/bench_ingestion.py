@@ -0,0 +1,65 @@
+"""
+G2 - Benchmark du chargement parallèle
+Charge le même fichier avec 1, 2, 4, ... processus et affiche la courbe
+débit / nombre de processus.
+ATTENTION : vide power_consumption et ingestion_checkpoint avant chaque
+mesure — à lancer uniquement sur une base de test.
+"""
+
+import argparse
+import os
+from test_db_connection import get_connection
+from parallel_loader import run_parallel
+from reader import CHUNK_BYTES
+
+TXT_PATH = "data/household_power_consumption.txt"
+
+
+def reset_tables():
+    conn = get_connection()
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE power_consumption, ingestion_checkpoint")
+    conn.commit()
+    conn.close()
+
+
+def worker_counts(max_workers):
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="G2 - Benchmark ingestion parallèle")
+    parser.add_argument("--source", default=TXT_PATH)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-mb", type=float, default=CHUNK_BYTES / (1024 * 1024))
+    parser.add_argument("--reset", action="store_true",
+                        help="Confirme que les tables peuvent être vidées entre les mesures")
+    args = parser.parse_args()
+
+    if not args.reset:
+        parser.error("le benchmark vide power_consumption : relancer avec --reset sur une base de test")
+
+    chunk_bytes = int(args.chunk_mb * 1024 * 1024)
+    results = []
+    for workers in worker_counts(args.max_workers):
+        reset_tables()
+        print(f"\n▶ {workers} processus")
+        summary = run_parallel(args.source, workers, chunk_bytes=chunk_bytes, resume=False)
+        results.append((workers, summary))
+
+    base = results[0][1]["rows_per_s"]
+    print("\nprocessus | lignes/s   | accélération | efficacité")
+    for workers, summary in results:
+        speedup = summary["rows_per_s"] / max(base, 1e-9)
+        print(f"{workers:9d} | {summary['rows_per_s']:10,.0f} | "
+              f"{speedup:12.2f} | {speedup / workers:9.0%}")
+
+
+if __name__ == "__main__":
+    main()
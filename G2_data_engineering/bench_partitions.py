@@ -0,0 +1,138 @@
+"""
+G2 - Benchmark des requêtes de lecture sur power_consumption partitionnée
+La table est remplie par tranches de mois (une mesure synthétique par
+minute) ; après chaque tranche on mesure la latence :
+  - de /api/data (G5) : les 100 mesures les plus récentes
+  - de l'extraction de dérive (G7) : fenêtres déc. 2006 et mai 2007
+et le nombre de partitions effectivement lues (élagage).
+ATTENTION : vide power_consumption — à lancer uniquement sur une base de test.
+"""
+
+import argparse
+import json
+import statistics
+import time
+from datetime import timedelta
+import pandas as pd
+from test_db_connection import get_connection
+from partitions import ensure_partitions
+
+START = "2006-12-01"
+
+QUERIES = {
+    "api_data": """
+        SELECT ts, global_active_power_kw, global_reactive_power_kw, voltage_v,
+               global_intensity_a, sub_metering_1_wh, sub_metering_2_wh, sub_metering_3_wh
+        FROM power_consumption
+        ORDER BY ts DESC LIMIT 100
+    """,
+    "drift_baseline": """
+        SELECT * FROM power_consumption
+        WHERE ts BETWEEN '2006-12-01' AND '2006-12-31'
+    """,
+    "drift_current": """
+        SELECT * FROM power_consumption
+        WHERE ts BETWEEN '2007-05-01' AND '2007-05-31'
+    """,
+}
+
+FILL_SQL = """
+    INSERT INTO power_consumption (ts, global_active_power_kw, global_reactive_power_kw,
+        voltage_v, global_intensity_a, sub_metering_1_wh, sub_metering_2_wh, sub_metering_3_wh)
+    SELECT t, random() * 5, random() * 0.5, 230 + random() * 10, random() * 20,
+           floor(random() * 40), floor(random() * 40), floor(random() * 20)
+    FROM generate_series(%s::TIMESTAMP, %s::TIMESTAMP - INTERVAL '1 minute', INTERVAL '1 minute') AS t
+"""
+
+
+def reset_table(conn):
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE power_consumption")
+    conn.commit()
+
+
+def fill_months(conn, start, end):
+    """Une mesure par minute sur [start, end)"""
+    ensure_partitions(conn, start, end - timedelta(minutes=1))
+    with conn.cursor() as cur:
+        cur.execute(FILL_SQL, (start, end))
+        cur.execute("ANALYZE power_consumption")
+    conn.commit()
+
+
+def partitions_scanned(cur, query):
+    """Nombre de partitions réellement lues (nœuds exécutés au moins une fois)"""
+    cur.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + query)
+    plan = cur.fetchone()[0]
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    names = set()
+
+    def walk(node):
+        # Avec ORDER BY ts LIMIT, les partitions suivantes de l'Append
+        # ordonné figurent au plan mais ne sont jamais exécutées
+        if (node.get("Relation Name", "").startswith("power_consumption_y")
+                and node.get("Actual Loops", 0) > 0):
+            names.add(node["Relation Name"])
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return len(names)
+
+
+def time_query(cur, query, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        cur.execute(query)
+        cur.fetchall()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="G2 - Benchmark partitionnement")
+    parser.add_argument("--months", type=int, default=48, help="Historique total (mois)")
+    parser.add_argument("--step", type=int, default=6, help="Mois ajoutés entre deux mesures")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--reset", action="store_true",
+                        help="Confirme que power_consumption peut être vidée")
+    args = parser.parse_args()
+
+    if not args.reset:
+        parser.error("le benchmark vide power_consumption : relancer avec --reset sur une base de test")
+
+    conn = get_connection()
+    reset_table(conn)
+
+    start = pd.Timestamp(START)
+    cursor_ts = start.to_pydatetime()
+    results = []
+    for months in range(args.step, args.months + 1, args.step):
+        next_ts = (start + pd.DateOffset(months=months)).to_pydatetime()
+        fill_months(conn, cursor_ts, next_ts)
+        cursor_ts = next_ts
+
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM power_consumption")
+            rows = cur.fetchone()[0]
+            row = {"months": months, "rows": rows}
+            for name, query in QUERIES.items():
+                row[name] = time_query(cur, query, args.repeat)
+                row[name + "_parts"] = partitions_scanned(cur, query)
+        conn.commit()
+        results.append(row)
+        print(f"▶ {months} mois ({rows:,} lignes)")
+
+    conn.close()
+
+    print("\n  mois |    lignes | api_data ms (part.) | drift déc. ms (part.) | drift mai ms (part.)")
+    for r in results:
+        print(f"{r['months']:6d} | {r['rows']:9,d} | "
+              f"{r['api_data']:11.2f} ({r['api_data_parts']:3d}) | "
+              f"{r['drift_baseline']:13.2f} ({r['drift_baseline_parts']:3d}) | "
+              f"{r['drift_current']:12.2f} ({r['drift_current_parts']:3d})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+G2 - Vérification des plans d'exécution des requêtes critiques
+Pour chaque requête du pipeline (G4, G5, G7), EXPLAIN doit montrer un
+parcours de l'index prévu (sur la table partitionnée, l'un des index
+enfants créés dans chaque partition). Code retour 1 si une requête
+n'utilise pas son index.
+
+Usage :
+    python check_indexes.py            # statistiques existantes
+    python check_indexes.py --analyze  # ANALYZE des tables d'abord
+"""
+
+import argparse
+import json
+import sys
+from test_db_connection import get_connection
+
+# (nom, requête, index acceptés)
+HOT_QUERIES = [
+    (
+        "G4 claim_scoring_batch (ids après le curseur)",
+        """
+        SELECT p.id
+        FROM power_consumption p
+        WHERE p.id > 0
+        ORDER BY p.id
+        LIMIT 1000
+        """,
+        {"pk_power_consumption"},
+    ),
+    (
+        "G4 claim_scoring_batch (mesure déjà scorée ?)",
+        """
+        SELECT p.id, p.ts
+        FROM power_consumption p
+        WHERE p.id > 0 AND p.id <= 1000
+          AND NOT EXISTS (SELECT 1 FROM anomaly_scores s WHERE s.measurement_id = p.id)
+          AND NOT EXISTS (SELECT 1 FROM scoring_claims r WHERE r.measurement_id = p.id)
+        ORDER BY p.id
+        LIMIT 100
+        """,
+        {"pk_anomaly_scores", "scoring_claims_pkey"},
+    ),
+    (
+        "G5 /api/anomalies",
+        """
+        SELECT p.ts, p.global_active_power_kw, p.voltage_v, s.anomaly_score, s.scored_at
+        FROM anomaly_scores s
+        JOIN power_consumption p ON p.id = s.measurement_id AND p.ts = s.measurement_ts
+        WHERE s.is_anomaly = TRUE
+        ORDER BY s.scored_at DESC LIMIT 20
+        """,
+        {"idx_as_anomalies"},
+    ),
+    (
+        "G5 /api/current_alert",
+        """
+        SELECT p.ts, p.global_active_power_kw, p.voltage_v, p.global_intensity_a,
+               s.anomaly_score, s.scored_at
+        FROM anomaly_scores s
+        JOIN power_consumption p ON p.id = s.measurement_id AND p.ts = s.measurement_ts
+        WHERE s.is_anomaly = TRUE
+          AND s.scored_at >= NOW() - INTERVAL '1 minute'
+        ORDER BY s.scored_at DESC LIMIT 1
+        """,
+        {"idx_as_anomalies"},
+    ),
+    (
+        "G5 /api/data",
+        """
+        SELECT ts, global_active_power_kw, voltage_v
+        FROM power_consumption
+        ORDER BY ts DESC LIMIT 100
+        """,
+        {"uq_power_consumption_ts"},
+    ),
+    (
+        "Plage de ts (une journée)",
+        """
+        SELECT ts, global_active_power_kw
+        FROM power_consumption
+        WHERE ts >= '2007-05-10' AND ts < '2007-05-11'
+        """,
+        {"idx_pc_ts_brin", "uq_power_consumption_ts"},
+    ),
+]
+
+# Index enfant (dans une partition) → index déclaré sur power_consumption
+CHILD_INDEX_SQL = """
+    SELECT c.relname, p.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    JOIN pg_class p ON p.oid = i.inhparent
+    WHERE p.relkind = 'I'
+      AND p.oid IN (SELECT indexrelid FROM pg_index WHERE indrelid = 'power_consumption'::regclass)
+"""
+
+
+def plan_indexes(plan):
+    """Noms des index parcourus dans un plan EXPLAIN (FORMAT JSON)"""
+    names = set()
+    if "Index Name" in plan:
+        names.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        names |= plan_indexes(child)
+    return names
+
+
+def explain(cur, query):
+    cur.execute("EXPLAIN (FORMAT JSON) " + query)
+    plan = cur.fetchone()[0]
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return plan[0]["Plan"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="G2 - Vérification des index")
+    parser.add_argument("--analyze", action="store_true",
+                        help="Met à jour les statistiques avant de vérifier")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    failures = 0
+    try:
+        with conn.cursor() as cur:
+            if args.analyze:
+                cur.execute("ANALYZE power_consumption")
+                cur.execute("ANALYZE anomaly_scores")
+                cur.execute("ANALYZE scoring_claims")
+            cur.execute(CHILD_INDEX_SQL)
+            parents = dict(cur.fetchall())
+
+            for name, query, expected in HOT_QUERIES:
+                used = {parents.get(idx, idx) for idx in plan_indexes(explain(cur, query))}
+                if used & expected:
+                    print(f"✅ {name} : {', '.join(sorted(used & expected))}")
+                else:
+                    failures += 1
+                    print(f"❌ {name} : attendu {', '.join(sorted(expected))}, "
+                          f"plan : {', '.join(sorted(used)) or 'parcours séquentiel'}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+G2 - Point de reprise de l'ingestion (table ingestion_checkpoint)
+Le point de reprise est écrit dans la même transaction que les lignes
+insérées : après un redémarrage, le producer repart exactement après la
+dernière ligne validée, en se positionnant directement (seek) sur
+l'offset en octets enregistré.
+"""
+
+import os
+from reader import data_start, is_compressed
+
+CREATE_SQL = """
+    CREATE TABLE IF NOT EXISTS ingestion_checkpoint (
+        source TEXT PRIMARY KEY,
+        byte_offset BIGINT NOT NULL,
+        row_offset BIGINT NOT NULL,
+        last_ts TIMESTAMP NULL,
+        updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+    )
+"""
+
+SAVE_SQL = """
+    INSERT INTO ingestion_checkpoint (source, byte_offset, row_offset, last_ts, updated_at)
+    VALUES (%s, %s, %s, %s, NOW())
+    ON CONFLICT (source) DO UPDATE SET
+        byte_offset = EXCLUDED.byte_offset,
+        row_offset = EXCLUDED.row_offset,
+        last_ts = EXCLUDED.last_ts,
+        updated_at = NOW()
+"""
+
+
+def source_key(path):
+    """Identifiant stable du fichier source (indépendant du répertoire de travail)"""
+    return os.path.basename(path)
+
+
+def ensure_table(conn):
+    """Crée la table si la base a été initialisée avant son ajout"""
+    with conn.cursor() as cur:
+        cur.execute(CREATE_SQL)
+    conn.commit()
+
+
+def load_checkpoint(conn, source):
+    """
+    Retourne le point de reprise {byte_offset, row_offset, last_ts}
+    ou None si la source n'a jamais été chargée.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT byte_offset, row_offset, last_ts FROM ingestion_checkpoint WHERE source = %s",
+            (source,)
+        )
+        row = cur.fetchone()
+    conn.commit()
+    if row is None:
+        return None
+    return {"byte_offset": row[0], "row_offset": row[1], "last_ts": row[2]}
+
+
+def save_checkpoint(cur, source, byte_offset, row_offset, last_ts):
+    """Enregistre le point de reprise (sans commit : même transaction que le lot)"""
+    cur.execute(SAVE_SQL, (source, byte_offset, row_offset, last_ts))
+
+
+def reset_checkpoint(conn, source):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM ingestion_checkpoint WHERE source = %s", (source,))
+    conn.commit()
+
+
+def range_source_key(path, start, end):
+    """Identifiant du point de reprise d'une plage d'octets (chargement parallèle)"""
+    return f"{source_key(path)}#{start}-{end}"
+
+
+def resume_position(conn, path, source=None, resume=True, start=0, end=None):
+    """
+    Lit le point de reprise de la source (ou d'une plage [start, end))
+    et retourne (byte_offset, row_offset, last_ts) pour iter_blocks.
+    """
+    source = source or source_key(path)
+    if end is None and not is_compressed(path):
+        end = os.path.getsize(path)
+    fresh = (max(start, data_start(path)), 0, None)
+    ensure_table(conn)
+    if not resume:
+        reset_checkpoint(conn, source)
+        return fresh
+
+    cp = load_checkpoint(conn, source)
+    if cp is None:
+        return fresh
+    if cp["byte_offset"] < start or (end is not None and cp["byte_offset"] > end):
+        print(f"⚠️ Point de reprise hors de {source} : rechargement depuis le début")
+        return fresh
+
+    print(f"⏩ Reprise de {source} à la ligne {cp['row_offset']} "
+          f"(octet {cp['byte_offset']}, dernier ts {cp['last_ts']})")
+    return cp["byte_offset"], cp["row_offset"], cp["last_ts"]
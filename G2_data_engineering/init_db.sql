@@ -1,7 +1,14 @@
+DROP VIEW IF EXISTS power_consumption_scored;
+DROP TABLE IF EXISTS anomaly_scores;
 DROP TABLE IF EXISTS power_consumption;
 
+-- Table partitionnée par mois sur ts (une partition power_consumption_yAAAAmMM
+-- par mois) : les requêtes filtrées ou triées sur ts ne lisent que les
+-- partitions concernées. La clé de partitionnement doit figurer dans les
+-- contraintes d'unicité, d'où la clé primaire (id, ts).
+-- Table en ajout seul : les résultats du scoring G4 vont dans anomaly_scores.
 CREATE TABLE power_consumption (
-  id BIGSERIAL PRIMARY KEY,
+  id BIGSERIAL NOT NULL,
   ts TIMESTAMP NOT NULL,
 
   global_active_power_kw DOUBLE PRECISION NULL,
@@ -12,9 +19,602 @@ CREATE TABLE power_consumption (
   sub_metering_2_wh DOUBLE PRECISION NULL,
   sub_metering_3_wh DOUBLE PRECISION NULL,
 
-  is_anomaly BOOLEAN NOT NULL DEFAULT FALSE,
-  anomaly_score DOUBLE PRECISION NULL,
-  scored_at TIMESTAMP NULL,
+  inserted_at TIMESTAMP NOT NULL DEFAULT NOW(),
 
-  inserted_at TIMESTAMP NOT NULL DEFAULT NOW()
+  -- Clé naturelle : une seule mesure par instant (compteur unique).
+  -- Si plusieurs compteurs sont ajoutés, passer à UNIQUE (meter_id, ts).
+  CONSTRAINT pk_power_consumption PRIMARY KEY (id, ts),
+  CONSTRAINT uq_power_consumption_ts UNIQUE (ts)
+) PARTITION BY RANGE (ts);
+
+-- Index calés sur les requêtes du pipeline (vérifiés par G2_data_engineering/check_indexes.py).
+-- Déclarés sur la table partitionnée : chaque partition reçoit les siens.
+-- Historique en ajout seul, ts croissant : BRIN minuscule pour les plages
+-- de ts. L'index unique uq_power_consumption_ts (B-tree) reste nécessaire
+-- pour le dédoublonnage et sert ORDER BY ts DESC LIMIT.
+CREATE INDEX idx_pc_ts_brin ON power_consumption USING BRIN (ts) WITH (pages_per_range = 32);
+
+-- Notification des nouvelles mesures sur le canal power_consumption_new :
+-- une par instruction d'insertion (un COPY de bloc compris), fusionnées par
+-- transaction. Le scoring G4 l'écoute (LISTEN) au lieu d'interroger la
+-- table à intervalle fixe.
+CREATE OR REPLACE FUNCTION notify_power_consumption_new()
+RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+  PERFORM pg_notify('power_consumption_new', '');
+  RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER trg_power_consumption_notify
+AFTER INSERT ON power_consumption
+FOR EACH STATEMENT EXECUTE FUNCTION notify_power_consumption_new();
+
+-- Crée les partitions mensuelles manquantes couvrant [p_from, p_to].
+-- Retourne le nombre de partitions créées.
+CREATE OR REPLACE FUNCTION ensure_power_partitions(p_from TIMESTAMP, p_to TIMESTAMP)
+RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+  m TIMESTAMP := date_trunc('month', p_from);
+  part TEXT;
+  created INTEGER := 0;
+BEGIN
+  WHILE m <= p_to LOOP
+    part := 'power_consumption_' || to_char(m, '"y"YYYY"m"MM');
+    IF to_regclass(part) IS NULL THEN
+      BEGIN
+        EXECUTE format(
+          'CREATE TABLE %I PARTITION OF power_consumption FOR VALUES FROM (%L) TO (%L)',
+          part, m, m + INTERVAL '1 month'
+        );
+        created := created + 1;
+      EXCEPTION WHEN duplicate_table OR unique_violation THEN
+        NULL;  -- créée en parallèle par un autre producteur
+      END;
+    END IF;
+    m := m + INTERVAL '1 month';
+  END LOOP;
+  RETURN created;
+END;
+$$;
+
+-- Détache les partitions entièrement antérieures à p_before. Les tables
+-- détachées sont conservées telles quelles (archivage, rattachement).
+CREATE OR REPLACE FUNCTION detach_power_partitions(p_before TIMESTAMP)
+RETURNS SETOF TEXT
+LANGUAGE plpgsql AS $$
+DECLARE
+  part TEXT;
+BEGIN
+  FOR part IN
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'power_consumption'::regclass
+      -- CASE : le nom n'est converti en date que s'il suit le motif yAAAAmMM
+      AND CASE WHEN c.relname ~ '_y[0-9]{4}m[0-9]{2}$'
+               THEN to_date(right(c.relname, 8), '"y"YYYY"m"MM') + INTERVAL '1 month' <= p_before
+          END
+    ORDER BY c.relname
+  LOOP
+    EXECUTE format('ALTER TABLE power_consumption DETACH PARTITION %I', part);
+    RETURN NEXT part;
+  END LOOP;
+END;
+$$;
+
+-- Rattache une partition détachée (bornes déduites de son nom).
+CREATE OR REPLACE FUNCTION attach_power_partition(p_name TEXT)
+RETURNS VOID
+LANGUAGE plpgsql AS $$
+DECLARE
+  m TIMESTAMP := to_date(right(p_name, 8), '"y"YYYY"m"MM');
+BEGIN
+  EXECUTE format(
+    'ALTER TABLE power_consumption ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+    p_name, m, m + INTERVAL '1 month'
+  );
+END;
+$$;
+
+-- Partitions couvrant le jeu de données UCI (déc. 2006 → nov. 2010) ;
+-- les mois suivants sont créés à la demande par le producer (partitions.py).
+SELECT ensure_power_partitions('2006-12-01', '2010-11-30');
+
+-- Point de reprise de l'ingestion G2 (mis à jour dans la transaction de chaque lot)
+DROP TABLE IF EXISTS ingestion_checkpoint;
+
+CREATE TABLE ingestion_checkpoint (
+  source TEXT PRIMARY KEY,
+  byte_offset BIGINT NOT NULL,
+  row_offset BIGINT NOT NULL,
+  last_ts TIMESTAMP NULL,
+  updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Résultats du scoring G4, en ajout seul (COPY) : une ligne par mesure et
+-- par version de modèle. power_consumption n'est jamais réécrite.
+CREATE TABLE anomaly_scores (
+  measurement_id BIGINT NOT NULL,
+  measurement_ts TIMESTAMP NOT NULL,     -- ts de la mesure : jointure (id, ts) élaguée par partition
+  model_version TEXT NOT NULL,
+  anomaly_score DOUBLE PRECISION NOT NULL,
+  is_anomaly BOOLEAN NOT NULL,
+  scored_at TIMESTAMP NOT NULL DEFAULT NOW(),
+
+  CONSTRAINT pk_anomaly_scores PRIMARY KEY (measurement_id, model_version)
+);
+
+-- G5 : anomalies récentes (WHERE is_anomaly ORDER BY scored_at DESC)
+CREATE INDEX idx_as_anomalies ON anomaly_scores (scored_at DESC) WHERE is_anomaly;
+
+-- Version de modèle active (pointeur basculé par rescore_history.py une fois
+-- toute une plage rescorée) : power_consumption_scored et les agrégats
+-- préfèrent ses scores (étiquettes '<version>' et '<version>:<rescorage>'),
+-- à défaut le score le plus récent de la mesure. model_version NULL :
+-- toujours le score le plus récent. Un rescorage écrit sous l'étiquette
+-- pending_version, dont les scores ne passent qu'en dernier recours jusqu'à
+-- la bascule.
+DROP TABLE IF EXISTS active_model_version;
+
+CREATE TABLE active_model_version (
+  name TEXT PRIMARY KEY,
+  model_version TEXT NULL,
+  pending_version TEXT NULL,
+  previous_version TEXT NULL,
+  activated_at TIMESTAMP NULL
 );
+
+INSERT INTO active_model_version (name) VALUES ('anomaly');
+
+-- Rang d'un score pour le choix du score retenu d'une mesure (le plus grand
+-- l'emporte, puis le plus récent) : 2 version active, 1 autre version,
+-- 0 rescorage en cours.
+CREATE OR REPLACE FUNCTION served_score_rank(p_label TEXT, p_active TEXT, p_pending TEXT)
+RETURNS INT
+LANGUAGE sql IMMUTABLE AS $$
+  SELECT CASE WHEN p_label = p_pending THEN 0
+              WHEN split_part(p_label, ':', 1) = p_active THEN 2
+              ELSE 1 END
+$$;
+
+-- Vue de compatibilité : colonnes historiques de power_consumption avec le
+-- score de chaque mesure (NULL / FALSE si non scorée) : celui de la version
+-- active, sinon le plus récent (hors version en cours de rescorage).
+CREATE VIEW power_consumption_scored AS
+SELECT
+  p.id,
+  p.ts,
+  p.global_active_power_kw,
+  p.global_reactive_power_kw,
+  p.voltage_v,
+  p.global_intensity_a,
+  p.sub_metering_1_wh,
+  p.sub_metering_2_wh,
+  p.sub_metering_3_wh,
+  COALESCE(s.is_anomaly, FALSE) AS is_anomaly,
+  s.anomaly_score,
+  s.scored_at,
+  p.inserted_at,
+  s.model_version
+FROM power_consumption p
+LEFT JOIN LATERAL (
+  SELECT a.is_anomaly, a.anomaly_score, a.scored_at, a.model_version
+  FROM anomaly_scores a
+  WHERE a.measurement_id = p.id
+  ORDER BY served_score_rank(a.model_version,
+                             (SELECT v.model_version FROM active_model_version v WHERE v.name = 'anomaly'),
+                             (SELECT v.pending_version FROM active_model_version v WHERE v.name = 'anomaly')) DESC,
+           a.scored_at DESC
+  LIMIT 1
+) s ON TRUE;
+
+-- Réclamations de travail du scoring G4 : chaque worker réclame un lot de
+-- mesures non scorées avec un bail (lease_until). Les lignes sont supprimées
+-- dans la transaction qui écrit les scores ; un bail expiré (worker arrêté
+-- ou planté) est repris par le worker suivant.
+DROP TABLE IF EXISTS scoring_claims;
+
+CREATE TABLE scoring_claims (
+  measurement_id BIGINT PRIMARY KEY,
+  measurement_ts TIMESTAMP NOT NULL,
+  worker TEXT NOT NULL,
+  lease_until TIMESTAMP NOT NULL
+);
+
+CREATE INDEX idx_sc_lease ON scoring_claims (lease_until);
+CREATE INDEX idx_sc_worker ON scoring_claims (worker);
+
+-- Curseur persistant de la file de scoring : toute mesure d'id <= last_id a
+-- déjà été réclamée (ou scorée). Les réclamations partent de last_id
+-- (id > last_id ORDER BY id) : coût O(lot) quelle que soit la taille de
+-- l'historique, reprise immédiate après redémarrage.
+DROP TABLE IF EXISTS scoring_watermark;
+
+CREATE TABLE scoring_watermark (
+  queue TEXT PRIMARY KEY,
+  last_id BIGINT NOT NULL DEFAULT 0,
+  swept_at TIMESTAMP NULL,
+  updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO scoring_watermark (queue) VALUES ('scoring');
+
+-- Plages d'ids réservées par un rattrapage massif (reserve_scoring_range) :
+-- scorées sans réclamation, elles sont ignorées par sweep_scoring_gaps tant
+-- que le bail court (renouvelé à chaque fenêtre, supprimé à la fin du
+-- rattrapage ; un rattrapage arrêté net rend sa plage au bout du bail).
+DROP TABLE IF EXISTS scoring_reservations;
+
+CREATE TABLE scoring_reservations (
+  range_from BIGINT NOT NULL,            -- exclu
+  range_to BIGINT NOT NULL,              -- inclus
+  owner TEXT NOT NULL,
+  lease_until TIMESTAMP NOT NULL,
+  PRIMARY KEY (range_from, range_to)
+);
+
+-- Réclame au plus p_limit mesures pour p_worker : d'abord les baux expirés,
+-- puis les mesures suivant le curseur, par id croissant (les mesures déjà
+-- scorées sont sautées, le curseur avance quand même). Les réclamations
+-- sont sérialisées (verrou consultatif, quelques ms) ; le scoring lui-même
+-- reste parallèle.
+CREATE OR REPLACE FUNCTION claim_scoring_batch(p_worker TEXT, p_limit INT, p_lease INTERVAL)
+RETURNS TABLE (measurement_id BIGINT, measurement_ts TIMESTAMP)
+LANGUAGE plpgsql AS $$
+#variable_conflict use_column
+DECLARE
+  taken BIGINT;
+  wm BIGINT;
+  window_max BIGINT;
+  ids BIGINT[];
+  tss TIMESTAMP[];
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext('claim_scoring_batch'));
+
+  RETURN QUERY
+  UPDATE scoring_claims c
+  SET worker = p_worker, lease_until = NOW() + p_lease
+  WHERE c.measurement_id IN (
+    SELECT e.measurement_id
+    FROM scoring_claims e
+    WHERE e.lease_until < NOW()
+    ORDER BY e.measurement_ts
+    LIMIT p_limit
+    -- Lignes verrouillées : bail en cours de validation par son worker
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING c.measurement_id, c.measurement_ts;
+  GET DIAGNOSTICS taken = ROW_COUNT;
+
+  SELECT w.last_id INTO wm FROM scoring_watermark w WHERE w.queue = 'scoring';
+  IF wm IS NULL THEN
+    INSERT INTO scoring_watermark (queue) VALUES ('scoring');
+    wm := 0;
+  END IF;
+
+  WHILE taken < p_limit LOOP
+    -- Fenêtre des ids suivant le curseur (au moins 1000 : rattrapage rapide
+    -- d'un historique déjà scoré)
+    SELECT MAX(f.id) INTO window_max
+    FROM (
+      SELECT p.id FROM power_consumption p
+      WHERE p.id > wm
+      ORDER BY p.id
+      LIMIT GREATEST(p_limit, 1000)
+    ) f;
+    EXIT WHEN window_max IS NULL;
+
+    WITH claimed AS (
+      INSERT INTO scoring_claims AS c (measurement_id, measurement_ts, worker, lease_until)
+      SELECT p.id, p.ts, p_worker, NOW() + p_lease
+      FROM power_consumption p
+      WHERE p.id > wm AND p.id <= window_max
+        AND NOT EXISTS (SELECT 1 FROM anomaly_scores s WHERE s.measurement_id = p.id)
+        AND NOT EXISTS (SELECT 1 FROM scoring_claims r WHERE r.measurement_id = p.id)
+      ORDER BY p.id
+      LIMIT p_limit - taken
+      ON CONFLICT (measurement_id) DO NOTHING
+      RETURNING c.measurement_id, c.measurement_ts
+    )
+    SELECT array_agg(claimed.measurement_id ORDER BY claimed.measurement_id),
+           array_agg(claimed.measurement_ts ORDER BY claimed.measurement_id)
+    INTO ids, tss
+    FROM claimed;
+
+    IF ids IS NULL THEN
+      wm := window_max;
+      CONTINUE;
+    END IF;
+    RETURN QUERY SELECT * FROM unnest(ids, tss);
+    taken := taken + cardinality(ids);
+    -- Lot complet : le curseur s'arrête au dernier id réclamé ; sinon la
+    -- fenêtre est épuisée
+    wm := CASE WHEN taken >= p_limit THEN ids[cardinality(ids)] ELSE window_max END;
+  END LOOP;
+
+  UPDATE scoring_watermark w SET last_id = wm, updated_at = NOW()
+  WHERE w.queue = 'scoring' AND w.last_id <> wm;
+END;
+$$;
+
+-- Rattrapage des trous derrière le curseur : mesures d'id <= last_id sans
+-- score ni réclamation (id attribué par la séquence mais validé après le
+-- passage du curseur, chargements parallèles). Elles sont réclamées avec un
+-- bail déjà expiré, donc servies en priorité par claim_scoring_batch. Les
+-- plages réservées par un rattrapage en cours sont exclues.
+-- p_lookback : nombre d'ids examinés sous le curseur (NULL : tout l'historique).
+CREATE OR REPLACE FUNCTION sweep_scoring_gaps(p_lookback BIGINT)
+RETURNS BIGINT
+LANGUAGE plpgsql AS $$
+DECLARE
+  wm BIGINT;
+  repaired BIGINT;
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext('claim_scoring_batch'));
+
+  SELECT last_id INTO wm FROM scoring_watermark WHERE queue = 'scoring';
+  IF wm IS NULL THEN
+    RETURN 0;
+  END IF;
+
+  INSERT INTO scoring_claims (measurement_id, measurement_ts, worker, lease_until)
+  SELECT p.id, p.ts, 'gap-sweep', '-infinity'
+  FROM power_consumption p
+  WHERE p.id <= wm
+    AND (p_lookback IS NULL OR p.id > wm - p_lookback)
+    AND NOT EXISTS (SELECT 1 FROM anomaly_scores s WHERE s.measurement_id = p.id)
+    AND NOT EXISTS (SELECT 1 FROM scoring_claims r WHERE r.measurement_id = p.id)
+    AND NOT EXISTS (
+      SELECT 1 FROM scoring_reservations v
+      WHERE p.id > v.range_from AND p.id <= v.range_to AND v.lease_until >= NOW()
+    )
+  ON CONFLICT (measurement_id) DO NOTHING;
+  GET DIAGNOSTICS repaired = ROW_COUNT;
+
+  UPDATE scoring_watermark SET swept_at = NOW() WHERE queue = 'scoring';
+  RETURN repaired;
+END;
+$$;
+
+-- Rattrapage massif (scoring_engine --mode backfill) : réserve toute la
+-- plage suivant le curseur, qui saute à MAX(id). Les workers en direct
+-- réclament au-delà pendant que le rattrapage score ]range_from, range_to]
+-- sans passer par scoring_claims (plage vide si rien n'attend). La plage est
+-- inscrite dans scoring_reservations pour p_owner, avec un bail p_lease.
+CREATE OR REPLACE FUNCTION reserve_scoring_range(p_owner TEXT, p_lease INTERVAL,
+                                                 OUT range_from BIGINT, OUT range_to BIGINT)
+LANGUAGE plpgsql AS $$
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtext('claim_scoring_batch'));
+
+  SELECT last_id INTO range_from FROM scoring_watermark WHERE queue = 'scoring';
+  IF range_from IS NULL THEN
+    INSERT INTO scoring_watermark (queue) VALUES ('scoring');
+    range_from := 0;
+  END IF;
+
+  SELECT GREATEST(COALESCE(MAX(id), 0), range_from) INTO range_to FROM power_consumption;
+
+  UPDATE scoring_watermark SET last_id = range_to, updated_at = NOW()
+  WHERE queue = 'scoring' AND last_id <> range_to;
+
+  IF range_to > range_from THEN
+    INSERT INTO scoring_reservations (range_from, range_to, owner, lease_until)
+    VALUES (range_from, range_to, p_owner, NOW() + p_lease);
+  END IF;
+END;
+$$;
+
+-- État des workers de scoring G4 (une ligne par worker, publiée toutes les
+-- SCORING_METRICS_INTERVAL s) : taille de lot adaptative, file d'attente,
+-- durées par étape du dernier lot.
+DROP TABLE IF EXISTS scoring_worker_status;
+
+CREATE TABLE scoring_worker_status (
+  worker TEXT PRIMARY KEY,
+  mode TEXT NOT NULL,                    -- live | catch-up
+  batch_size INT NOT NULL,
+  backlog BIGINT NULL,
+  rows_per_s DOUBLE PRECISION NULL,
+  last_latency_ms DOUBLE PRECISION NULL,
+  stage_ms JSONB NOT NULL DEFAULT '{}',  -- claim / transform / predict / write
+  stage_utilization JSONB NULL,          -- mode pipeline : part du temps occupé par étage
+  model_version TEXT NULL,               -- modèle en service (rechargé à chaud)
+  controller JSONB NOT NULL DEFAULT '{}',
+  updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Agrégats par minute / heure / jour, tenus à jour par G2 (insertion) et
+-- G4 (scoring) via refresh_power_rollups : seuls les intervalles touchés
+-- sont recalculés. Les agrégats survivent au détachement des partitions.
+DROP FUNCTION IF EXISTS power_rollup_buckets(TIMESTAMP, TIMESTAMP);
+DROP TABLE IF EXISTS power_rollup_day;
+DROP TABLE IF EXISTS power_rollup_hour;
+DROP TABLE IF EXISTS power_rollup_minute;
+
+CREATE TABLE power_rollup_minute (
+  bucket TIMESTAMP PRIMARY KEY,
+  row_count BIGINT NOT NULL,
+  scored_count BIGINT NOT NULL,
+  anomaly_count BIGINT NOT NULL,
+  score_sum DOUBLE PRECISION NULL,
+
+  -- pour chaque mesure : somme, min, max et nombre de valeurs NULL
+  global_active_power_kw_sum DOUBLE PRECISION NULL,
+  global_active_power_kw_min DOUBLE PRECISION NULL,
+  global_active_power_kw_max DOUBLE PRECISION NULL,
+  global_active_power_kw_nulls BIGINT NOT NULL,
+  global_reactive_power_kw_sum DOUBLE PRECISION NULL,
+  global_reactive_power_kw_min DOUBLE PRECISION NULL,
+  global_reactive_power_kw_max DOUBLE PRECISION NULL,
+  global_reactive_power_kw_nulls BIGINT NOT NULL,
+  voltage_v_sum DOUBLE PRECISION NULL,
+  voltage_v_min DOUBLE PRECISION NULL,
+  voltage_v_max DOUBLE PRECISION NULL,
+  voltage_v_nulls BIGINT NOT NULL,
+  global_intensity_a_sum DOUBLE PRECISION NULL,
+  global_intensity_a_min DOUBLE PRECISION NULL,
+  global_intensity_a_max DOUBLE PRECISION NULL,
+  global_intensity_a_nulls BIGINT NOT NULL,
+  sub_metering_1_wh_sum DOUBLE PRECISION NULL,
+  sub_metering_1_wh_min DOUBLE PRECISION NULL,
+  sub_metering_1_wh_max DOUBLE PRECISION NULL,
+  sub_metering_1_wh_nulls BIGINT NOT NULL,
+  sub_metering_2_wh_sum DOUBLE PRECISION NULL,
+  sub_metering_2_wh_min DOUBLE PRECISION NULL,
+  sub_metering_2_wh_max DOUBLE PRECISION NULL,
+  sub_metering_2_wh_nulls BIGINT NOT NULL,
+  sub_metering_3_wh_sum DOUBLE PRECISION NULL,
+  sub_metering_3_wh_min DOUBLE PRECISION NULL,
+  sub_metering_3_wh_max DOUBLE PRECISION NULL,
+  sub_metering_3_wh_nulls BIGINT NOT NULL
+);
+
+CREATE TABLE power_rollup_hour (LIKE power_rollup_minute INCLUDING ALL);
+CREATE TABLE power_rollup_day (LIKE power_rollup_minute INCLUDING ALL);
+
+-- Recalcule les agrégats des intervalles contenant [p_from, p_to] :
+-- minutes depuis power_consumption_scored, heures depuis les minutes, jours
+-- depuis les heures. Idempotent. Un verrou par jour touché (pris dans
+-- l'ordre des jours) : seuls les appels sur les mêmes jours sont
+-- sérialisés, les chargeurs et workers de scoring parallèles ne s'attendent
+-- pas entre eux.
+CREATE OR REPLACE FUNCTION refresh_power_rollups(p_from TIMESTAMP, p_to TIMESTAMP)
+RETURNS VOID
+LANGUAGE plpgsql AS $$
+DECLARE
+  measures TEXT[] := ARRAY[
+    'global_active_power_kw', 'global_reactive_power_kw', 'voltage_v', 'global_intensity_a',
+    'sub_metering_1_wh', 'sub_metering_2_wh', 'sub_metering_3_wh'
+  ];
+  cols TEXT;
+  raw_aggs TEXT;
+  rollup_aggs TEXT;
+  updates TEXT;
+  level TEXT[];
+BEGIN
+  IF p_from IS NULL OR p_to IS NULL THEN
+    RETURN;
+  END IF;
+  PERFORM pg_advisory_xact_lock(hashtext('refresh_power_rollups'), d::DATE - DATE '2000-01-01')
+  FROM generate_series(date_trunc('day', p_from), date_trunc('day', p_to), INTERVAL '1 day') AS d
+  ORDER BY d;
+
+  SELECT string_agg(format('%1$s_sum, %1$s_min, %1$s_max, %1$s_nulls', m), ', '),
+         string_agg(format('SUM(%1$s), MIN(%1$s), MAX(%1$s), COUNT(*) - COUNT(%1$s)', m), ', '),
+         string_agg(format('SUM(%1$s_sum), MIN(%1$s_min), MAX(%1$s_max), SUM(%1$s_nulls)', m), ', '),
+         string_agg(format('%1$s_sum = EXCLUDED.%1$s_sum, %1$s_min = EXCLUDED.%1$s_min, '
+                           '%1$s_max = EXCLUDED.%1$s_max, %1$s_nulls = EXCLUDED.%1$s_nulls', m), ', ')
+  INTO cols, raw_aggs, rollup_aggs, updates
+  FROM unnest(measures) AS m;
+
+  updates := 'row_count = EXCLUDED.row_count, scored_count = EXCLUDED.scored_count, '
+             'anomaly_count = EXCLUDED.anomaly_count, score_sum = EXCLUDED.score_sum, ' || updates;
+
+  EXECUTE format(
+    'INSERT INTO power_rollup_minute (bucket, row_count, scored_count, anomaly_count, score_sum, %s)
+     SELECT date_trunc(''minute'', ts), COUNT(*), COUNT(anomaly_score),
+            COUNT(*) FILTER (WHERE is_anomaly), SUM(anomaly_score), %s
+     FROM power_consumption_scored
+     WHERE ts >= $1 AND ts < $2
+     GROUP BY 1
+     ON CONFLICT (bucket) DO UPDATE SET %s',
+    cols, raw_aggs, updates
+  ) USING date_trunc('minute', p_from), date_trunc('minute', p_to) + INTERVAL '1 minute';
+
+  -- {granularité, table source}
+  FOREACH level SLICE 1 IN ARRAY ARRAY[['hour', 'minute'], ['day', 'hour']] LOOP
+    EXECUTE format(
+      'INSERT INTO power_rollup_%1$s (bucket, row_count, scored_count, anomaly_count, score_sum, %3$s)
+       SELECT date_trunc(%1$L, bucket), SUM(row_count), SUM(scored_count),
+              SUM(anomaly_count), SUM(score_sum), %4$s
+       FROM power_rollup_%2$s
+       WHERE bucket >= $1 AND bucket < $2
+       GROUP BY 1
+       ON CONFLICT (bucket) DO UPDATE SET %5$s',
+      level[1], level[2], cols, rollup_aggs, updates
+    ) USING date_trunc(level[1], p_from),
+            date_trunc(level[1], p_to) + ('1 ' || level[1])::INTERVAL;
+  END LOOP;
+END;
+$$;
+
+-- Bascule de la version active : simple changement de pointeur, en temps
+-- constant quelle que soit la taille de la plage rescorée. Les scores écrits
+-- sous l'étiquette pending_version de cette version sont retenus dès la
+-- validation ; rescore_history.py rafraîchit ensuite les agrégats de la
+-- plage, jour par jour, hors de cette transaction.
+CREATE OR REPLACE FUNCTION activate_model_version(p_version TEXT)
+RETURNS TEXT
+LANGUAGE plpgsql AS $$
+DECLARE
+  previous TEXT;
+BEGIN
+  SELECT model_version INTO previous FROM active_model_version WHERE name = 'anomaly' FOR UPDATE;
+  IF NOT FOUND THEN
+    INSERT INTO active_model_version (name) VALUES ('anomaly');
+  END IF;
+
+  UPDATE active_model_version
+  -- réactivation (plage étendue) : la version précédente est conservée
+  SET previous_version = CASE WHEN previous IS DISTINCT FROM p_version THEN previous
+                              ELSE previous_version END,
+      model_version = p_version, activated_at = NOW(),
+      pending_version = CASE WHEN split_part(pending_version, ':', 1) = p_version THEN NULL
+                             ELSE pending_version END
+  WHERE name = 'anomaly';
+
+  RETURN previous;
+END;
+$$;
+
+-- Intervalles couvrant exactement [p_from, p_to) au plus grossier possible :
+-- jours entiers, puis heures, puis minutes aux extrémités. Sommer les
+-- colonnes du résultat donne l'agrégat de la plage en quelques centaines
+-- de lignes au plus, quelle que soit la profondeur de l'historique.
+CREATE OR REPLACE FUNCTION power_rollup_buckets(
+  p_from TIMESTAMP DEFAULT '-infinity',
+  p_to TIMESTAMP DEFAULT 'infinity'
+)
+RETURNS SETOF power_rollup_minute
+LANGUAGE sql STABLE AS $$
+  WITH raw AS (
+    -- bornes arrondies vers l'intérieur de la plage
+    SELECT
+      CASE WHEN date_trunc('minute', p_from) = p_from THEN p_from
+           ELSE date_trunc('minute', p_from) + INTERVAL '1 minute' END AS m_lo,
+      date_trunc('minute', p_to) AS m_hi,
+      CASE WHEN date_trunc('hour', p_from) = p_from THEN p_from
+           ELSE date_trunc('hour', p_from) + INTERVAL '1 hour' END AS h_lo,
+      date_trunc('hour', p_to) AS h_hi,
+      CASE WHEN date_trunc('day', p_from) = p_from THEN p_from
+           ELSE date_trunc('day', p_from) + INTERVAL '1 day' END AS d_lo,
+      date_trunc('day', p_to) AS d_hi
+  ),
+  h AS (
+    -- aucune heure entière : les minutes couvrent toute la plage
+    SELECT m_lo, m_hi, d_lo, d_hi,
+           CASE WHEN h_lo < h_hi THEN h_lo ELSE m_hi END AS h_lo,
+           CASE WHEN h_lo < h_hi THEN h_hi ELSE m_hi END AS h_hi
+    FROM raw
+  ),
+  b AS (
+    -- aucun jour entier : les heures couvrent toute la plage
+    SELECT m_lo, m_hi, h_lo, h_hi,
+           CASE WHEN d_lo < d_hi THEN d_lo ELSE h_hi END AS d_lo,
+           CASE WHEN d_lo < d_hi THEN d_hi ELSE h_hi END AS d_hi
+    FROM h
+  )
+  SELECT r.* FROM power_rollup_day r, b WHERE r.bucket >= b.d_lo AND r.bucket < b.d_hi
+  UNION ALL
+  SELECT r.* FROM power_rollup_hour r, b WHERE r.bucket >= b.h_lo AND r.bucket < b.d_lo
+  UNION ALL
+  SELECT r.* FROM power_rollup_hour r, b WHERE r.bucket >= b.d_hi AND r.bucket < b.h_hi
+  UNION ALL
+  SELECT r.* FROM power_rollup_minute r, b WHERE r.bucket >= b.m_lo AND r.bucket < b.h_lo
+  UNION ALL
+  SELECT r.* FROM power_rollup_minute r, b WHERE r.bucket >= b.h_hi AND r.bucket < b.m_hi
+$$;
@@ -0,0 +1,160 @@
+"""
+G2 - Chargement en masse dans power_consumption (COPY FROM STDIN)
+Un lot = une transaction, les valeurs manquantes deviennent NULL.
+Les lots passent par une table temporaire puis sont fusionnés avec
+ON CONFLICT (ts) DO NOTHING : un rechargement ne crée pas de doublons.
+Les partitions mensuelles des ts du bloc sont créées au besoin avant le
+chargement (partitions.py).
+"""
+
+import io
+import time
+from psycopg2 import errors
+from checkpoint import save_checkpoint
+from partitions import ensure_block_partitions, forget_partitions
+from reader import DB_COLUMNS
+
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# En CSV, un champ vide non quoté est lu comme NULL par PostgreSQL
+COPY_SQL = (
+    f"COPY {{table}} ({', '.join(DB_COLUMNS)}) "
+    "FROM STDIN WITH (FORMAT csv, NULL '')"
+)
+
+# Table de transit : temporaire (non journalisée), vidée à chaque commit
+STAGE_TABLE = "power_consumption_stage"
+
+CREATE_STAGE_SQL = f"""
+    CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE} (
+        ts TIMESTAMP,
+        {', '.join(f"{col} DOUBLE PRECISION" for col in DB_COLUMNS[1:])}
+    ) ON COMMIT DELETE ROWS
+"""
+
+# Agrégats minute / heure / jour des intervalles touchés par le lot
+REFRESH_ROLLUPS_SQL = "SELECT refresh_power_rollups(%s, %s)"
+
+MERGE_SQL = f"""
+    INSERT INTO power_consumption ({', '.join(DB_COLUMNS)})
+    SELECT {', '.join(DB_COLUMNS)} FROM {STAGE_TABLE}
+    ON CONFLICT (ts) DO NOTHING
+"""
+
+
+def frame_to_csv_buffer(frame):
+    """Sérialise un DataFrame (colonnes DB_COLUMNS) en CSV prêt pour COPY"""
+    buf = io.StringIO()
+    frame.to_csv(
+        buf,
+        columns=DB_COLUMNS,
+        index=False,
+        header=False,
+        na_rep="",
+        date_format=TS_FORMAT,
+    )
+    buf.seek(0)
+    return buf
+
+
+def copy_frame(cur, frame, table="power_consumption"):
+    """COPY d'un DataFrame sur un curseur (la transaction reste ouverte)"""
+    cur.copy_expert(COPY_SQL.format(table=table), frame_to_csv_buffer(frame))
+
+
+def merge_frame(cur, frame):
+    """
+    COPY du lot dans la table de transit puis fusion dédoublonnée dans
+    power_consumption (la transaction reste ouverte).
+    Retourne le nombre de lignes réellement insérées.
+    """
+    cur.execute(CREATE_STAGE_SQL)
+    copy_frame(cur, frame, table=STAGE_TABLE)
+    cur.execute(MERGE_SQL)
+    return cur.rowcount
+
+
+def copy_batch(conn, frame):
+    """
+    Insère un lot (COPY + fusion dédoublonnée) dans une seule transaction.
+    Retourne le nombre de lignes insérées.
+    """
+    cur = conn.cursor()
+    try:
+        inserted = merge_frame(cur, frame)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return inserted
+
+
+def refresh_rollups(cur, first_ts, last_ts):
+    """Met à jour les agrégats couvrant [first_ts, last_ts] (sans commit)"""
+    cur.execute(REFRESH_ROLLUPS_SQL, (first_ts, last_ts))
+
+
+def copy_block(conn, block, source=None):
+    """
+    Insère un ColumnBlock (reader.py) via COPY + fusion, une transaction.
+    Les agrégats des intervalles touchés sont mis à jour, et si `source`
+    est fourni le point de reprise est avancé à la fin du bloc, dans cette
+    même transaction.
+    Retourne le nombre de lignes insérées (les doublons de ts sont ignorés).
+    """
+    cur = conn.cursor()
+    try:
+        inserted = merge_frame(cur, block.to_frame())
+        if inserted:
+            ts = block.columns["ts"]
+            refresh_rollups(cur, ts.min().astype("datetime64[us]").item(),
+                            ts.max().astype("datetime64[us]").item())
+        if source is not None:
+            save_checkpoint(cur, source, block.end_offset, block.next_row, block.last_ts)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return inserted
+
+
+def load_blocks(conn, blocks, source=None, controller=None, last_ts=None, on_batch=None):
+    """
+    Charge une suite de ColumnBlock par lots COPY (une transaction par lot).
+    - controller : RateController optionnel, les blocs sont découpés pour
+      respecter sa consigne
+    - last_ts : dernier ts déjà validé (reprise au milieu d'un bloc)
+    - on_batch(batch, inserted, seconds) : appelé après chaque lot
+    Retourne (lignes insérées, doublons ignorés).
+    """
+    inserted_total = 0
+    skipped = 0
+    for block in blocks:
+        # Le point de reprise peut pointer au milieu d'un bloc
+        if last_ts is not None:
+            block = block.after(last_ts)
+            last_ts = None
+        ensure_block_partitions(conn, block)
+
+        max_rows = controller.batch_size(block.columns["ts"]) if controller else None
+        for batch in block.split(max_rows):
+            if controller:
+                controller.acquire(len(batch), batch.last_ts)
+            t0 = time.perf_counter()
+            try:
+                inserted = copy_block(conn, batch, source=source)
+            except errors.CheckViolation:
+                # Aucune partition pour ces ts : supprimée depuis qu'elle est
+                # connue du processus (mois archivé puis rechargé)
+                forget_partitions()
+                ensure_block_partitions(conn, batch)
+                inserted = copy_block(conn, batch, source=source)
+            inserted_total += inserted
+            skipped += len(batch) - inserted
+            if on_batch:
+                on_batch(batch, inserted, time.perf_counter() - t0)
+    return inserted_total, skipped
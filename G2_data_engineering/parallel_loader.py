@@ -0,0 +1,128 @@
+"""
+G2 - Chargement parallèle par plages du fichier source
+Le fichier est découpé en plages d'octets alignées sur les lignes ; chaque
+plage est parsée et chargée par un processus distinct, avec sa propre
+connexion et son propre point de reprise. Le coordinateur suit
+l'avancement de chaque plage.
+"""
+
+import multiprocessing as mp
+import queue
+import time
+from test_db_connection import get_connection
+from checkpoint import range_source_key, resume_position
+from loader import load_blocks
+from rate_control import RateController
+from reader import CHUNK_BYTES, iter_blocks, split_ranges
+
+PROGRESS_SECONDS = 5.0
+
+
+def load_range(path, range_id, start, end, chunk_bytes, resume, rate, burst, progress):
+    """Processus de chargement de la plage [start, end)"""
+    source = range_source_key(path, start, end)
+    conn = get_connection()
+    try:
+        byte_offset, row_offset, last_ts = resume_position(
+            conn, path, source, resume, start=start, end=end
+        )
+        progress.put(("start", range_id, byte_offset, 0, 0))
+
+        controller = None
+        if rate and burst:
+            controller = RateController("burst", rate=rate, burst=burst)
+        elif rate:
+            controller = RateController("fixed", rate=rate)
+
+        def report(batch, inserted, seconds):
+            progress.put(("batch", range_id, batch.end_offset, inserted, len(batch) - inserted))
+
+        blocks = iter_blocks(path, chunk_bytes=chunk_bytes, start_offset=byte_offset,
+                             start_row=row_offset, end_offset=end)
+        load_blocks(conn, blocks, source=source, controller=controller,
+                    last_ts=last_ts, on_batch=report)
+        progress.put(("done", range_id, end, 0, 0))
+    except Exception as e:
+        progress.put(("error", range_id, str(e), 0, 0))
+        raise
+    finally:
+        conn.close()
+
+
+def _print_progress(ranges, state, total, elapsed):
+    parts = []
+    for range_id, (start, end) in enumerate(ranges):
+        done = (state[range_id]["offset"] - start) / max(end - start, 1)
+        mark = "✔" if state[range_id]["status"] == "done" else f"{done:.0%}"
+        parts.append(f"#{range_id}:{mark}")
+    print(f"⏳ {total} lignes ({total / max(elapsed, 1e-9):,.0f} lignes/s) | {' '.join(parts)}")
+
+
+def run_parallel(path, workers, chunk_bytes=CHUNK_BYTES, resume=True, rate=None, burst=None):
+    """
+    Charge le fichier avec `workers` processus (une plage chacun).
+    Les consignes de débit sont réparties entre les processus.
+    Retourne un résumé {rows, skipped, seconds, rows_per_s, failed}.
+    """
+    ranges = split_ranges(path, workers)
+    print(f"🧵 {len(ranges)} plages / {workers} processus")
+
+    progress = mp.Queue()
+    per_worker_rate = rate / len(ranges) if rate else None
+    per_worker_burst = max(1, burst // len(ranges)) if burst else None
+    state = {i: {"offset": start, "rows": 0, "skipped": 0, "status": "pending"}
+             for i, (start, _) in enumerate(ranges)}
+
+    start_time = time.perf_counter()
+    processes = [
+        mp.Process(
+            target=load_range,
+            args=(path, i, start, end, chunk_bytes, resume,
+                  per_worker_rate, per_worker_burst, progress),
+            name=f"g2-range-{i}",
+        )
+        for i, (start, end) in enumerate(ranges)
+    ]
+    for p in processes:
+        p.start()
+
+    last_print = time.perf_counter()
+    while any(p.is_alive() for p in processes) or not progress.empty():
+        try:
+            kind, range_id, value, inserted, skipped = progress.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        entry = state[range_id]
+        if kind == "error":
+            entry["status"] = "error"
+            print(f"❌ Plage #{range_id} en échec : {value}")
+            continue
+        entry["offset"] = max(entry["offset"], value)
+        entry["rows"] += inserted
+        entry["skipped"] += skipped
+        entry["status"] = "done" if kind == "done" else "running"
+
+        if time.perf_counter() - last_print >= PROGRESS_SECONDS:
+            total = sum(e["rows"] for e in state.values())
+            _print_progress(ranges, state, total, time.perf_counter() - start_time)
+            last_print = time.perf_counter()
+
+    for p in processes:
+        p.join()
+
+    elapsed = time.perf_counter() - start_time
+    total = sum(e["rows"] for e in state.values())
+    skipped = sum(e["skipped"] for e in state.values())
+    failed = [i for i, e in state.items() if e["status"] != "done"]
+    print(f"📊 {total} lignes chargées en {elapsed:.1f}s "
+          f"({total / max(elapsed, 1e-9):,.0f} lignes/s, {skipped} doublons ignorés)")
+    if failed:
+        print(f"⚠️ Plages non terminées : {failed} (relancer pour reprendre)")
+
+    return {
+        "rows": total,
+        "skipped": skipped,
+        "seconds": elapsed,
+        "rows_per_s": total / max(elapsed, 1e-9),
+        "failed": failed,
+    }
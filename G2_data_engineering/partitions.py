@@ -0,0 +1,153 @@
+"""
+G2 - Maintenance des partitions mensuelles de power_consumption
+- Le producer crée à la demande les partitions des mois qu'il charge
+  (ensure_partitions, une transaction courte avant chaque bloc).
+- En ligne de commande : pré-création des mois à venir, détachement des
+  mois anciens, rattachement d'une partition détachée, inventaire.
+
+Exemples :
+    python partitions.py --list
+    python partitions.py --ahead 3
+    python partitions.py --detach-before 2008-01-01
+    python partitions.py --attach power_consumption_y2007m01
+"""
+
+import argparse
+import numpy as np
+from test_db_connection import get_connection
+
+ENSURE_SQL = "SELECT ensure_power_partitions(%s, %s)"
+DETACH_SQL = "SELECT detach_power_partitions(%s)"
+ATTACH_SQL = "SELECT attach_power_partition(%s)"
+
+LIST_SQL = """
+    SELECT c.relname,
+           pg_get_expr(c.relpartbound, c.oid) AS bounds,
+           c.reltuples::BIGINT AS rows_estimate,
+           pg_total_relation_size(c.oid) AS bytes
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'power_consumption'::regclass
+    ORDER BY c.relname
+"""
+
+# Mois dont la partition est connue (par processus) : évite un aller-retour
+# vers la base pour chaque bloc
+_known_months = set()
+
+
+def _months(first_ts, last_ts):
+    start = np.datetime64(first_ts, "M")
+    end = np.datetime64(last_ts, "M")
+    return set(np.arange(start, end + 1).tolist())
+
+
+def ensure_partitions(conn, first_ts, last_ts):
+    """
+    Garantit l'existence des partitions couvrant [first_ts, last_ts]
+    (transaction séparée, validée immédiatement).
+    Retourne le nombre de partitions créées.
+    """
+    if first_ts is None or last_ts is None:
+        return 0
+    months = _months(first_ts, last_ts)
+    if months <= _known_months:
+        return 0
+    with conn.cursor() as cur:
+        cur.execute(ENSURE_SQL, (first_ts, last_ts))
+        created = cur.fetchone()[0]
+    conn.commit()
+    _known_months.update(months)
+    if created:
+        print(f"🗂️ {created} partition(s) créée(s) pour {first_ts} → {last_ts}")
+    return created
+
+
+def forget_partitions():
+    """
+    Vide le cache des mois connus : une partition peut avoir été supprimée
+    depuis (mois archivé par common/archive.py dans un autre processus) ;
+    le prochain ensure_partitions repasse par la base.
+    """
+    _known_months.clear()
+
+
+def ensure_block_partitions(conn, block):
+    """ensure_partitions sur la plage de ts d'un ColumnBlock (reader.py)"""
+    ts = block.columns["ts"]
+    if len(ts) == 0:
+        return 0
+    first = ts.min().astype("datetime64[us]").item()
+    last = ts.max().astype("datetime64[us]").item()
+    return ensure_partitions(conn, first, last)
+
+
+def ensure_ahead(conn, months_ahead):
+    """Pré-crée les partitions jusqu'à `months_ahead` mois après le plus récent de (NOW, MAX(ts))"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT ensure_power_partitions(
+                date_trunc('month', NOW())::TIMESTAMP,
+                GREATEST(NOW()::TIMESTAMP, COALESCE(MAX(ts), NOW()::TIMESTAMP))
+                    + make_interval(months => %s)
+            )
+            FROM power_consumption
+        """, (months_ahead,))
+        created = cur.fetchone()[0]
+    conn.commit()
+    return created
+
+
+def detach_before(conn, before):
+    with conn.cursor() as cur:
+        cur.execute(DETACH_SQL, (before,))
+        detached = [row[0] for row in cur.fetchall()]
+    conn.commit()
+    return detached
+
+
+def attach(conn, name):
+    with conn.cursor() as cur:
+        cur.execute(ATTACH_SQL, (name,))
+    conn.commit()
+
+
+def list_partitions(conn):
+    with conn.cursor() as cur:
+        cur.execute(LIST_SQL)
+        rows = cur.fetchall()
+    conn.commit()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="G2 - Partitions de power_consumption")
+    parser.add_argument("--ahead", type=int, metavar="MOIS",
+                        help="Pré-crée les partitions des N prochains mois")
+    parser.add_argument("--detach-before", metavar="AAAA-MM-JJ",
+                        help="Détache les partitions entièrement antérieures à cette date")
+    parser.add_argument("--attach", metavar="TABLE",
+                        help="Rattache une partition détachée")
+    parser.add_argument("--list", action="store_true", help="Liste les partitions")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        if args.ahead is not None:
+            created = ensure_ahead(conn, args.ahead)
+            print(f"✅ {created} partition(s) créée(s) ({args.ahead} mois d'avance)")
+        if args.detach_before:
+            detached = detach_before(conn, args.detach_before)
+            print(f"📦 {len(detached)} partition(s) détachée(s) : {', '.join(detached) or '-'}")
+        if args.attach:
+            attach(conn, args.attach)
+            print(f"✅ {args.attach} rattachée")
+        if args.list or not (args.ahead is not None or args.detach_before or args.attach):
+            for name, bounds, rows, size in list_partitions(conn):
+                print(f"{name:32s} {max(rows, 0):>10,d} lignes {size / 1e6:8.1f} Mo  {bounds}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
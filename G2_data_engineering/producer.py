@@ -1,79 +1,155 @@
+import argparse
 import time
-import pandas as pd
+import numpy as np
 from test_db_connection import get_connection
+from checkpoint import resume_position, save_checkpoint, source_key
+from loader import DB_COLUMNS, load_blocks, refresh_rollups
+from parallel_loader import run_parallel
+from partitions import ensure_block_partitions
+from rate_control import RateController
+from reader import CHUNK_BYTES, is_compressed, iter_blocks
 
 TXT_PATH = "data/household_power_consumption.txt"
 SLEEP_SECONDS = 2
 
+INSERT_SQL = f"""
+    INSERT INTO power_consumption ({", ".join(DB_COLUMNS)})
+    VALUES ({", ".join(["%s"] * len(DB_COLUMNS))})
+    ON CONFLICT (ts) DO NOTHING
+"""
 
-def clean_float(value):
-    """Convertit ?, NaN ou valeurs invalides en None (NULL SQL)"""
-    if value == "?" or pd.isna(value):
-        return None
-    try:
-        return float(value)
-    except ValueError:
-        return None
 
+def block_rows(block):
+    """Itère les lignes d'un bloc en tuples Python (NaN → None, NULL SQL)"""
+    ts = block.columns["ts"].astype("datetime64[us]").tolist()
+    values = []
+    for col in DB_COLUMNS[1:]:
+        arr = block.columns[col]
+        values.append(np.where(np.isnan(arr), None, arr).tolist())
+    return zip(ts, *values)
 
-def main():
-    print("📡 Producer G2 démarré (source .txt)")
 
-    # Lecture du fichier TXT (séparateur ;)
-    df = pd.read_csv(
-        TXT_PATH,
-        sep=";",
-        low_memory=False
-    )
+def run_bulk(path, chunk_bytes=CHUNK_BYTES, resume=True, controller=None):
+    """
+    Charge le fichier par lots COPY (une transaction par lot).
+    Avec un contrôleur de débit, les blocs sont découpés en lots qui
+    respectent la consigne.
+    """
+    controller = controller or RateController()
+    conn = get_connection()
+    source = source_key(path)
+    byte_offset, row_offset, last_ts = resume_position(conn, path, source, resume)
+    start = time.perf_counter()
 
+    def report(batch, inserted, seconds):
+        if controller.mode is None:
+            print(f"✅ Lot COPY : {inserted}/{len(batch)} lignes "
+                  f"({len(batch) / max(seconds, 1e-9):,.0f} lignes/s)")
+
+    try:
+        blocks = iter_blocks(path, chunk_bytes=chunk_bytes,
+                             start_offset=byte_offset, start_row=row_offset)
+        total, skipped = load_blocks(conn, blocks, source=source, controller=controller,
+                                     last_ts=last_ts, on_batch=report)
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"📊 {total} lignes chargées en {elapsed:.1f}s "
+          f"({total / max(elapsed, 1e-9):,.0f} lignes/s, {skipped} doublons ignorés)")
+    controller.summary()
+
+
+def run_rows(path, chunk_bytes=CHUNK_BYTES, resume=True, controller=None):
+    """Mode historique : un INSERT + commit par ligne, au rythme du contrôleur"""
+    controller = controller or RateController("fixed", rate=1 / SLEEP_SECONDS)
     conn = get_connection()
+    source = source_key(path)
+    byte_offset, row_offset, last_ts = resume_position(conn, path, source, resume)
     cur = conn.cursor()
 
-    for _, row in df.iterrows():
-        try:
-            # Construction du timestamp → ts (MATCH SQL)
-            ts = pd.to_datetime(
-                row["Date"] + " " + row["Time"],
-                format="%d/%m/%Y %H:%M:%S",
-                errors="coerce"
-            )
-
-            if pd.isna(ts):
-                continue
-
-            # INSERT STRICTEMENT ALIGNÉ AVEC LA TABLE SQL
-            cur.execute("""
-                INSERT INTO power_consumption (
-                    ts,
-                    global_active_power_kw,
-                    global_reactive_power_kw,
-                    voltage_v,
-                    global_intensity_a,
-                    sub_metering_1_wh,
-                    sub_metering_2_wh,
-                    sub_metering_3_wh
-                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
-            """, (
-                ts,
-                clean_float(row["Global_active_power"]),
-                clean_float(row["Global_reactive_power"]),
-                clean_float(row["Voltage"]),
-                clean_float(row["Global_intensity"]),
-                clean_float(row["Sub_metering_1"]),
-                clean_float(row["Sub_metering_2"]),
-                clean_float(row["Sub_metering_3"]),
-            ))
-
-            conn.commit()
-            print(f"✅ Inserted @ {ts}")
-            time.sleep(SLEEP_SECONDS)
-
-        except Exception as e:
-            conn.rollback()
-            print("❌ Erreur insertion :", e)
+    blocks = iter_blocks(path, chunk_bytes=chunk_bytes,
+                         start_offset=byte_offset, start_row=row_offset)
+    for block in blocks:
+        ensure_block_partitions(conn, block)
+        for row in block_rows(block):
+            # Le point de reprise pointe sur le début du bloc en cours :
+            # on saute les lignes déjà validées (source ordonnée par ts)
+            if last_ts is not None:
+                if row[0] <= last_ts:
+                    continue
+                last_ts = None
+            try:
+                controller.acquire(1, row[0])
+                cur.execute(INSERT_SQL, row)
+                inserted = cur.rowcount
+                if inserted:
+                    refresh_rollups(cur, row[0], row[0])
+                save_checkpoint(cur, source, block.start_offset, block.first_row, row[0])
+                conn.commit()
+                if inserted:
+                    print(f"✅ Inserted @ {row[0]}")
+                else:
+                    print(f"↩️ Déjà présent @ {row[0]} (ignoré)")
+
+            except Exception as e:
+                conn.rollback()
+                print("❌ Erreur insertion :", e)
 
     cur.close()
     conn.close()
+    controller.summary()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="G2 - Producer (ingestion power_consumption)")
+    parser.add_argument("--source", default=TXT_PATH,
+                        help="Fichier source (séparateur ;), brut ou compressé (gzip, zstd, zip)")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Chargement en masse via COPY FROM STDIN (sans pause)")
+    parser.add_argument("--chunk-mb", type=float, default=CHUNK_BYTES / (1024 * 1024),
+                        help="Taille des blocs lus dans la source, en Mo (= un lot COPY en mode --bulk)")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Ignore le point de reprise enregistré et repart du début du fichier")
+    parser.add_argument("--rate", type=float, default=None,
+                        help=f"Débit cible en lignes/s (défaut : illimité en --bulk, "
+                             f"1 ligne / {SLEEP_SECONDS}s sinon)")
+    parser.add_argument("--burst", type=int, default=None,
+                        help="Avec --rate : autorise des rafales jusqu'à ce nombre de lignes")
+    parser.add_argument("--warp", type=float, default=None,
+                        help="Rejeu en N× temps réel d'après les écarts entre ts (ex : 60)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Chargement parallèle (--bulk) : nombre de processus, "
+                             "chacun sur une plage du fichier")
+    args = parser.parse_args()
+    if args.workers > 1 and not args.bulk:
+        parser.error("--workers nécessite --bulk")
+    if args.workers > 1 and is_compressed(args.source):
+        parser.error("--workers nécessite une source non compressée (découpage en plages)")
+    if args.workers > 1 and args.warp:
+        parser.error("--warp n'est pas compatible avec --workers (ordre des ts non global)")
+    return args
+
+
+def main():
+    args = parse_args()
+    chunk_bytes = int(args.chunk_mb * 1024 * 1024)
+    print(f"📡 Producer G2 démarré (source {args.source})")
+
+    default_rate = None if args.bulk else 1 / SLEEP_SECONDS
+    controller = RateController.from_args(args, default_rate=default_rate)
+    print(f"⏱️ Débit : {controller.describe()}")
+
+    if args.bulk and args.workers > 1:
+        run_parallel(args.source, args.workers, chunk_bytes=chunk_bytes,
+                     resume=not args.no_resume, rate=args.rate, burst=args.burst)
+    elif args.bulk:
+        run_bulk(args.source, chunk_bytes=chunk_bytes, resume=not args.no_resume,
+                 controller=controller)
+    else:
+        run_rows(args.source, chunk_bytes=chunk_bytes, resume=not args.no_resume,
+                 controller=controller)
+
     print("🛑 Producer terminé")
 
 
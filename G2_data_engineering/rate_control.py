@@ -0,0 +1,160 @@
+"""
+G2 - Contrôle du débit de rejeu (lignes/s)
+Trois modes :
+  - fixed : débit constant (seau à jetons, rafales limitées à TICK_SECONDS)
+  - burst : débit moyen constant, rafales jusqu'à `burst` lignes
+  - warp  : rejeu en N× temps réel d'après les écarts entre ts
+Le contrôleur mesure le débit obtenu et signale la dérive par rapport à
+la consigne.
+"""
+
+import time
+import numpy as np
+
+# Granularité des lots en mode fixed / warp (secondes de débit par lot)
+TICK_SECONDS = 0.1
+REPORT_SECONDS = 10.0
+DRIFT_TOLERANCE = 0.05
+
+
+class RateController:
+    """Régule l'envoi des lignes ; mode None = sans limite"""
+
+    def __init__(self, mode=None, rate=None, factor=None, burst=None,
+                 report_every=REPORT_SECONDS):
+        if mode in ("fixed", "burst") and not rate:
+            raise ValueError(f"Mode {mode} : un débit (lignes/s) est requis")
+        if mode == "burst" and not burst:
+            raise ValueError("Mode burst : une taille de rafale est requise")
+        if mode == "warp" and not factor:
+            raise ValueError("Mode warp : un facteur d'accélération est requis")
+
+        self.mode = mode
+        self.rate = rate
+        self.factor = factor
+        self.report_every = report_every
+
+        if mode == "burst":
+            self.capacity = int(burst)
+        elif mode == "fixed":
+            self.capacity = max(1, int(rate * TICK_SECONDS))
+        else:
+            self.capacity = None
+        self.tokens = self.capacity or 0
+
+        self.start = None
+        self.last_refill = None
+        self.ts0 = None
+        self.sent = 0
+        self.last_ts = None
+        self.window_start = None
+        self.window_sent = 0
+        self.window_ts = None
+
+    @classmethod
+    def from_args(cls, args, default_rate=None):
+        """Construit le contrôleur depuis les options --rate / --burst / --warp"""
+        if args.warp:
+            return cls("warp", factor=args.warp)
+        rate = args.rate or default_rate
+        if args.burst:
+            return cls("burst", rate=rate, burst=args.burst)
+        if rate:
+            return cls("fixed", rate=rate)
+        return cls(None)
+
+    def describe(self):
+        if self.mode == "warp":
+            return f"rejeu x{self.factor:g} temps réel"
+        if self.mode == "burst":
+            return f"{self.rate:g} lignes/s, rafales de {self.capacity} lignes"
+        if self.mode == "fixed":
+            return f"{self.rate:g} lignes/s"
+        return "sans limite"
+
+    def batch_size(self, ts=None):
+        """
+        Taille de lot maximale compatible avec la consigne
+        (None = pas de découpage). En mode warp, estimée d'après l'écart
+        médian entre les ts du bloc.
+        """
+        if self.mode == "warp":
+            if ts is None or len(ts) < 2:
+                return None
+            gap = np.median(np.diff(ts)) / np.timedelta64(1, "s")
+            if gap <= 0:
+                return None
+            return max(1, int(TICK_SECONDS * self.factor / gap))
+        return self.capacity
+
+    def acquire(self, n, last_ts=None):
+        """
+        Bloque jusqu'à ce que `n` lignes (dernier ts = last_ts) puissent
+        être envoyées sans dépasser la consigne.
+        """
+        now = time.monotonic()
+        if self.start is None:
+            self.start = self.last_refill = self.window_start = now
+            self.ts0 = self.window_ts = last_ts
+
+        if self.mode in ("fixed", "burst"):
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            self.tokens -= n
+            if self.tokens < 0:
+                time.sleep(-self.tokens / self.rate)
+        elif self.mode == "warp" and last_ts is not None:
+            target = self.start + (last_ts - self.ts0).total_seconds() / self.factor
+            if target > now:
+                time.sleep(target - now)
+
+        self.sent += n
+        self.window_sent += n
+        self.last_ts = last_ts
+        self._maybe_report()
+
+    def achieved(self, since, sent, ts_from):
+        """Débit obtenu (lignes/s, ou facteur de rejeu en mode warp)"""
+        elapsed = max(time.monotonic() - since, 1e-9)
+        if self.mode == "warp":
+            if ts_from is None or self.last_ts is None:
+                return None
+            return (self.last_ts - ts_from).total_seconds() / elapsed
+        return sent / elapsed
+
+    def _target(self):
+        return self.factor if self.mode == "warp" else self.rate
+
+    def _maybe_report(self):
+        if self.mode is None:
+            return
+        if time.monotonic() - self.window_start < self.report_every:
+            return
+        self._report(self.achieved(self.window_start, self.window_sent, self.window_ts))
+        self.window_start = time.monotonic()
+        self.window_sent = 0
+        self.window_ts = self.last_ts
+
+    def _report(self, achieved, final=False):
+        if achieved is None:
+            return
+        target = self._target()
+        drift = (achieved - target) / target
+        unit = "x" if self.mode == "warp" else " lignes/s"
+        label = "Débit moyen" if final else "Débit"
+        if abs(drift) > DRIFT_TOLERANCE:
+            print(f"⚠️ {label} {achieved:,.1f}{unit} pour une consigne de "
+                  f"{target:g}{unit} (dérive {drift:+.1%})")
+        else:
+            print(f"⏱️ {label} {achieved:,.1f}{unit} (consigne {target:g}{unit}, "
+                  f"dérive {drift:+.1%})")
+
+    def summary(self):
+        """Affiche le débit moyen obtenu depuis le début du rejeu"""
+        if self.mode is None or self.start is None:
+            return
+        sent = self.sent
+        if self.capacity:
+            # Le seau est plein au départ : cette première rafale est permise
+            sent = max(sent - self.capacity, 0)
+        self._report(self.achieved(self.start, sent, self.ts0), final=True)
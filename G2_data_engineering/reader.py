@@ -0,0 +1,267 @@
+"""
+G2 - Lecture en flux du fichier brut household_power_consumption.txt
+Le fichier est lu par blocs d'octets de taille fixe, coupés sur une fin de
+ligne, puis parsé en colonnes numpy typées (mémoire bornée quelle que soit
+la taille du fichier).
+Sources acceptées : texte brut, gzip, zstd ou zip, décompressées en flux
+(pas de fichier intermédiaire extrait sur disque).
+"""
+
+import contextlib
+import gzip
+import io
+import os
+import zipfile
+import numpy as np
+import pandas as pd
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Correspondance colonnes du fichier .txt → colonnes SQL
+COLUMN_MAPPING = {
+    "Global_active_power": "global_active_power_kw",
+    "Global_reactive_power": "global_reactive_power_kw",
+    "Voltage": "voltage_v",
+    "Global_intensity": "global_intensity_a",
+    "Sub_metering_1": "sub_metering_1_wh",
+    "Sub_metering_2": "sub_metering_2_wh",
+    "Sub_metering_3": "sub_metering_3_wh",
+}
+
+DB_COLUMNS = ["ts"] + list(COLUMN_MAPPING.values())
+
+CHUNK_BYTES = 8 * 1024 * 1024
+
+SOURCE_COLUMNS = ["Date", "Time"] + list(COLUMN_MAPPING.keys())
+TS_SOURCE_FORMAT = "%d/%m/%Y %H:%M:%S"
+
+_DTYPES = {"Date": str, "Time": str}
+_DTYPES.update({col: np.float64 for col in COLUMN_MAPPING})
+
+
+class ColumnBlock:
+    """
+    Bloc de lignes nettoyées : une colonne numpy par colonne SQL
+    (ts en datetime64, mesures en float64 avec NaN pour NULL)
+    et sa position dans la source.
+    """
+
+    def __init__(self, columns, first_row, source_rows, start_offset, end_offset):
+        self.columns = columns
+        self.first_row = first_row          # index (0-based) de la 1ère ligne de données du bloc
+        self.source_rows = source_rows      # lignes lues dans la source (y compris écartées)
+        self.start_offset = start_offset    # position en octets du début du bloc
+        self.end_offset = end_offset        # position en octets juste après le bloc
+
+    def __len__(self):
+        return len(self.columns["ts"])
+
+    @property
+    def next_row(self):
+        return self.first_row + self.source_rows
+
+    @property
+    def last_ts(self):
+        """Dernier ts du bloc (datetime Python) ou None si le bloc est vide"""
+        if len(self) == 0:
+            return None
+        return self.columns["ts"][-1].astype("datetime64[us]").item()
+
+    def after(self, ts):
+        """Bloc restreint aux lignes postérieures à ts (reprise au milieu d'un bloc)"""
+        if ts is None:
+            return self
+        keep = self.columns["ts"] > np.datetime64(ts)
+        columns = {name: values[keep] for name, values in self.columns.items()}
+        return ColumnBlock(columns, self.first_row, self.source_rows,
+                           self.start_offset, self.end_offset)
+
+    def split(self, max_rows):
+        """
+        Découpe le bloc en sous-blocs d'au plus max_rows lignes.
+        Seul le dernier sous-bloc porte la fin du bloc dans la source ;
+        les autres pointent sur son début (reprise par filtre sur ts).
+        """
+        n = len(self)
+        if not max_rows or n <= max_rows:
+            yield self
+            return
+        for start in range(0, n, max_rows):
+            stop = min(start + max_rows, n)
+            columns = {name: values[start:stop] for name, values in self.columns.items()}
+            if stop == n:
+                yield ColumnBlock(columns, self.first_row, self.source_rows,
+                                  self.start_offset, self.end_offset)
+            else:
+                yield ColumnBlock(columns, self.first_row, 0,
+                                  self.start_offset, self.start_offset)
+
+    def to_frame(self):
+        return pd.DataFrame(self.columns, copy=False)
+
+
+def parse_chunk(data):
+    """
+    Parse un bloc d'octets (lignes complètes, sans en-tête).
+    Retourne (colonnes numpy, nombre de lignes lues dans la source).
+    """
+    try:
+        frame = pd.read_csv(
+            io.BytesIO(data), sep=";", header=None, names=SOURCE_COLUMNS,
+            na_values=["?"], keep_default_na=True, dtype=_DTYPES, engine="c",
+        )
+    except ValueError:
+        # Valeur non numérique autre que "?" : conversion tolérante (→ NaN)
+        frame = pd.read_csv(
+            io.BytesIO(data), sep=";", header=None, names=SOURCE_COLUMNS,
+            dtype=str, keep_default_na=False, engine="c",
+        )
+        for col in COLUMN_MAPPING:
+            frame[col] = pd.to_numeric(frame[col], errors="coerce")
+
+    # Un seul appel vectorisé par bloc pour construire ts
+    ts = pd.to_datetime(
+        frame["Date"] + " " + frame["Time"],
+        format=TS_SOURCE_FORMAT,
+        errors="coerce"
+    ).to_numpy()
+    valid = ~np.isnat(ts)
+
+    columns = {"ts": ts[valid]}
+    for src, dst in COLUMN_MAPPING.items():
+        columns[dst] = frame[src].to_numpy(dtype=np.float64)[valid]
+    return columns, len(frame)
+
+
+_MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"\x28\xb5\x2f\xfd": "zstd",
+    b"PK\x03\x04": "zip",
+}
+
+
+def source_format(path):
+    """Détecte le format de la source d'après ses premiers octets"""
+    with open(path, "rb") as f:
+        head = f.read(4)
+    for magic, kind in _MAGIC.items():
+        if head.startswith(magic):
+            return kind
+    return "plain"
+
+
+def is_compressed(path):
+    return source_format(path) != "plain"
+
+
+@contextlib.contextmanager
+def open_source(path):
+    """
+    Ouvre la source en flux binaire décompressé.
+    Les offsets (tell/seek) portent sur le flux décompressé ; sur une source
+    compressée, seek avance en décompressant (pas d'accès direct).
+    """
+    kind = source_format(path)
+    if kind == "gzip":
+        with gzip.open(path, "rb") as f:
+            yield f
+    elif kind == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Source zstd : installer le paquet 'zstandard'")
+        with open(path, "rb") as raw:
+            reader = zstandard.ZstdDecompressor().stream_reader(raw)
+            with io.BufferedReader(reader) as f:
+                yield f
+    elif kind == "zip":
+        with zipfile.ZipFile(path) as archive:
+            members = [m for m in archive.infolist() if not m.is_dir()]
+            txt = [m for m in members if m.filename.lower().endswith(".txt")]
+            with archive.open((txt or members)[0]) as f:
+                yield f
+    else:
+        with open(path, "rb") as f:
+            yield f
+
+
+def data_start(path):
+    """Offset en octets de la première ligne de données (après l'en-tête)"""
+    with open_source(path) as f:
+        return len(f.readline())
+
+
+def _skip_to(f, position, offset):
+    """Avance le flux de `position` à `offset` (seek direct si possible)"""
+    if f.seekable():
+        f.seek(offset)
+        return
+    remaining = offset - position
+    while remaining > 0:
+        data = f.read(min(remaining, CHUNK_BYTES))
+        if not data:
+            break
+        remaining -= len(data)
+
+
+def split_ranges(path, n):
+    """
+    Découpe le fichier en n plages d'octets [début, fin) alignées sur des
+    débuts de ligne, couvrant toutes les lignes de données.
+    """
+    if is_compressed(path):
+        raise ValueError("Découpage en plages impossible sur une source compressée")
+    size = os.path.getsize(path)
+    first = data_start(path)
+    bounds = [first]
+    with open(path, "rb") as f:
+        for i in range(1, n):
+            f.seek(first + (size - first) * i // n)
+            f.readline()  # aller au début de la ligne suivante
+            bounds.append(max(f.tell(), bounds[-1]))
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def iter_blocks(path, chunk_bytes=CHUNK_BYTES, start_offset=0, start_row=0,
+                end_offset=None):
+    """
+    Génère les ColumnBlock du fichier source, dans l'ordre.
+    start_offset / start_row permettent de reprendre directement (seek) à
+    une frontière de bloc enregistrée par un point de reprise ;
+    end_offset (aligné sur un début de ligne) borne la lecture à une plage.
+    Les sources compressées sont décompressées au fil de la lecture : le
+    premier bloc est produit dès qu'il est décompressé.
+    """
+    with open_source(path) as f:
+        offset = len(f.readline())  # en-tête
+        row = 0
+        if start_offset > offset:
+            _skip_to(f, offset, start_offset)
+            offset, row = start_offset, start_row
+        carry = b""
+
+        while True:
+            size = chunk_bytes
+            if end_offset is not None:
+                size = max(min(chunk_bytes, end_offset - offset - len(carry)), 0)
+            data = f.read(size) if size else b""
+            if not data:
+                body, carry = carry, b""
+            else:
+                data = carry + data
+                cut = data.rfind(b"\n") + 1
+                if cut == 0:
+                    carry = data
+                    continue
+                body, carry = data[:cut], data[cut:]
+
+            if body.strip():
+                columns, source_rows = parse_chunk(body)
+                yield ColumnBlock(columns, row, source_rows, offset, offset + len(body))
+                row += source_rows
+            offset += len(body)
+
+            if not data:
+                break
@@ -0,0 +1,87 @@
+"""
+G2 - Agrégats minute / heure / jour (tables power_rollup_*)
+Le producer et G4 les tiennent à jour lot par lot (refresh_power_rollups).
+Ce script sert à les reconstruire, mois par mois, sur une base chargée
+avant leur création ou après une correction de données.
+
+Exemples :
+    python rollups.py --rebuild
+    python rollups.py --rebuild --from 2007-01-01 --to 2007-03-01
+    python rollups.py --from 2007-01-01 --to 2007-02-01   # agrégat d'une plage
+"""
+
+import argparse
+import time
+import pandas as pd
+from test_db_connection import get_connection
+
+REFRESH_SQL = "SELECT refresh_power_rollups(%s, %s)"
+
+# Agrégat d'une plage [from, to) à partir des intervalles les plus grossiers
+RANGE_SQL = """
+    SELECT SUM(row_count), SUM(scored_count), SUM(anomaly_count),
+           SUM(global_active_power_kw_sum)
+               / NULLIF(SUM(row_count) - SUM(global_active_power_kw_nulls), 0),
+           MAX(global_active_power_kw_max),
+           SUM(voltage_v_sum) / NULLIF(SUM(row_count) - SUM(voltage_v_nulls), 0),
+           COUNT(*)
+    FROM power_rollup_buckets(%s, %s)
+"""
+
+
+def rebuild(conn, start=None, end=None):
+    """Recalcule les agrégats mois par mois sur [start, end] (défaut : tout l'historique)"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT MIN(ts), MAX(ts) FROM power_consumption")
+        first, last = cur.fetchone()
+    conn.commit()
+    if first is None:
+        print("ℹ️ power_consumption est vide")
+        return
+
+    start = pd.Timestamp(start or first)
+    end = pd.Timestamp(end or last)
+    month = start.to_period("M").to_timestamp()
+    t0 = time.perf_counter()
+    while month <= end:
+        upper = min(month + pd.DateOffset(months=1) - pd.Timedelta(microseconds=1), end)
+        with conn.cursor() as cur:
+            cur.execute(REFRESH_SQL, (max(month, start).to_pydatetime(), upper.to_pydatetime()))
+        conn.commit()
+        print(f"✅ Agrégats {month:%Y-%m} recalculés")
+        month += pd.DateOffset(months=1)
+    print(f"📊 Reconstruction terminée en {time.perf_counter() - t0:.1f}s")
+
+
+def range_summary(conn, start, end):
+    t0 = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(RANGE_SQL, (start or "-infinity", end or "infinity"))
+        rows, scored, anomalies, avg_power, max_power, avg_voltage, buckets = cur.fetchone()
+    conn.commit()
+    elapsed = (time.perf_counter() - t0) * 1000
+    print(f"📊 {rows or 0} mesures, {scored or 0} scorées, {anomalies or 0} anomalies")
+    if rows:
+        print(f"   puissance moyenne {avg_power:.3f} kW (max {max_power:.3f}), "
+              f"tension moyenne {avg_voltage:.1f} V")
+    print(f"   {buckets} intervalles lus en {elapsed:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="G2 - Agrégats power_rollup_*")
+    parser.add_argument("--rebuild", action="store_true", help="Recalcule les agrégats")
+    parser.add_argument("--from", dest="start", help="Début (inclus)")
+    parser.add_argument("--to", dest="end", help="Fin (exclue pour la lecture, incluse pour --rebuild)")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    try:
+        if args.rebuild:
+            rebuild(conn, args.start, args.end)
+        range_summary(conn, args.start, args.end)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,12 @@ import os
 import psycopg2
 import time
 
+try:
+    # Réglages partagés (common/db.py) : application_name, statement_timeout
+    from common.db import connect_params
+except ImportError:
+    connect_params = None
+
 def get_connection():
     """
     يسترجع اتصال قاعدة البيانات.
@@ -19,13 +25,10 @@ def get_connection():
 
         print(f"🔌 Connecting to DB at {db_host}:{db_port}...")
 
-        conn = psycopg2.connect(
-            host=db_host,
-            port=db_port,
-            database=db_name,
-            user=db_user,
-            password=db_password
-        )
+        params = dict(host=db_host, port=db_port, dbname=db_name, user=db_user, password=db_password)
+        # Sessions longues (COPY par blocs, workers parallèles) : connexion
+        # dédiée plutôt qu'un emprunt au pool
+        conn = psycopg2.connect(**(connect_params(**params) if connect_params else params))
         return conn
     except Exception as e:
         # طباعة الخطأ بوضوح للمساعدة في التشخيص
@@ -1,23 +1,23 @@
-import pandas as pd
-from common.db import get_connection
+from common.db import blocks_to_frame, iter_history
 
-QUERY = """
-SELECT
-    global_active_power_kw,
-    voltage_v,
-    global_intensity_a
-FROM power_consumption
-WHERE global_active_power_kw IS NOT NULL
-  AND voltage_v IS NOT NULL
-  AND global_intensity_a IS NOT NULL
-LIMIT 100000;
-"""
+FEATURES = [
+    "global_active_power_kw",
+    "voltage_v",
+    "global_intensity_a",
+]
+MAX_ROWS = 100000
 
 def fetch_historical_data():
-    print("Chargement des données historiques depuis PostgreSQL")
+    print("Chargement des données historiques (archive Parquet + cache colonnaire)")
 
-    conn = get_connection()
-    df = pd.read_sql(QUERY, conn)
-    conn.close()
+    # Projection sur les 3 colonnes utiles, lignes incomplètes filtrées à la
+    # lecture ; parcours par blocs arrêté dès MAX_ROWS lignes
+    blocks, rows = [], 0
+    for block in iter_history(columns=FEATURES, not_null=FEATURES):
+        blocks.append(block)
+        rows += len(block[FEATURES[0]])
+        if rows >= MAX_ROWS:
+            break
+    df = blocks_to_frame(blocks)
 
-    return df
+    return df.head(MAX_ROWS).reset_index(drop=True)
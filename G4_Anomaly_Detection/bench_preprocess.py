@@ -0,0 +1,121 @@
+"""
+G4 - Benchmark of the preprocessing (G3 scaler + PCA)
+Transforms the same synthetic batch of measurements with two strategies and
+prints the latency per batch size:
+  - steps : fillna(0) on the DataFrame, scaler.transform, pca.transform
+            (former DataPreprocessor.transform, three passes)
+  - fused : DataPreprocessor.transform (one float copy, NaN replaced in
+            place, one X @ W + b projection)
+The outputs of both strategies are compared on every batch: the largest
+absolute difference is printed, and with a trained model the anomaly flags
+must be identical. No database access.
+
+Usage:
+    python bench_preprocess.py
+    python bench_preprocess.py --sizes 1000 50000 500000 --repeat 5
+"""
+
+import argparse
+import logging
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.preprocessor import DataPreprocessor
+from src.anomaly_detector import AnomalyDetector
+from config.config import Config
+
+# Largest difference accepted between the two strategies (rounding only)
+TOLERANCE = 1e-9
+
+# Typical level and spread of each measure
+LEVELS = [1.1, 0.12, 240.8, 4.6, 1.1, 1.3, 6.5]
+SPREADS = [1.0, 0.11, 3.2, 4.4, 6.2, 5.8, 8.4]
+
+
+def make_batch(columns, n):
+    """n synthetic measurements shaped like a scoring batch, ~1% of them with missing values"""
+    rng = np.random.default_rng(42)
+    data = pd.DataFrame(rng.normal(LEVELS, SPREADS, size=(n, len(columns))), columns=columns)
+    data.loc[rng.random(n) < 0.01, columns] = np.nan
+    data.insert(0, 'id', np.arange(1, n + 1))
+    data.insert(1, 'ts', pd.date_range('2007-01-01', periods=n, freq='min'))
+    return data
+
+
+def transform_steps(preprocessor, data):
+    X = data[preprocessor.feature_columns].fillna(0)
+    return preprocessor.pca.transform(preprocessor.scaler.transform(X))
+
+
+def transform_fused(preprocessor, data):
+    return preprocessor.transform(data)
+
+
+STRATEGIES = {
+    "steps": transform_steps,
+    "fused": transform_fused,
+}
+
+
+def time_strategy(preprocessor, transform, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        transform(preprocessor, data)
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='G4 - Benchmark of the preprocessing')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 50_000, 500_000],
+                        help='Batch sizes (number of measurements)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # Only the benchmark table goes to stdout
+    logging.getLogger('src.preprocessor').setLevel(logging.WARNING)
+    logging.getLogger('src.anomaly_detector').setLevel(logging.WARNING)
+
+    preprocessor = DataPreprocessor()
+    if not preprocessor.load_g3_parameters(Config.G3_SCALER_PATH, Config.G3_PCA_PATH):
+        print("✗ G3 parameters not found")
+        return
+    if preprocessor.weights is None:
+        print("✗ Scaler / PCA could not be fused, nothing to compare")
+        return
+
+    detector = AnomalyDetector()
+    detector.load_model(Config.MODEL_PATH)
+
+    results = []
+    for size in args.sizes:
+        data = make_batch(preprocessor.feature_columns, size)
+        reference = transform_steps(preprocessor, data)
+        fused = transform_fused(preprocessor, data)
+        row = {"size": size, "diff": float(np.max(np.abs(fused - reference)))}
+        if row["diff"] > TOLERANCE:
+            print(f"✗ {size:,} measurements: outputs differ by {row['diff']:.3g}")
+            return
+        if detector.is_fitted and not np.array_equal(detector.predict(reference)[1],
+                                                     detector.predict(fused)[1]):
+            print(f"✗ {size:,} measurements: anomaly flags differ")
+            return
+        for name, transform in STRATEGIES.items():
+            row[name] = time_strategy(preprocessor, transform, data, args.repeat)
+        results.append(row)
+        print(f"▶ {size:,} measurements")
+
+    flags = "identical anomaly flags" if detector.is_fitted else "no trained model, flags not compared"
+    print(f"\n✓ Same output ({flags})")
+    print("\n measurements |  steps ms |  fused ms | speedup | max abs diff")
+    for r in results:
+        print(f"{r['size']:13,d} | {r['steps'] * 1000:9.2f} | {r['fused'] * 1000:9.2f} | "
+              f"{r['steps'] / r['fused']:6.1f}x | {r['diff']:12.2e}")
+
+
+if __name__ == "__main__":
+    main()
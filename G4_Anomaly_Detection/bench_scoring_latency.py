@@ -0,0 +1,120 @@
+"""
+G4 - Benchmark of the insert-to-score latency
+Inserts synthetic measurements one by one (one transaction each, like the
+live stream) after the most recent ts, waits until the running scoring
+engine has scored them, and prints the distribution of
+scored_at - inserted_at.
+The scoring engine must be running (python src/scoring_engine.py).
+WARNING: adds rows to power_consumption - run it against a test database
+(--cleanup removes them afterwards).
+
+Usage:
+    python bench_scoring_latency.py
+    python bench_scoring_latency.py --count 100 --period 0.5 --cleanup
+"""
+
+import argparse
+import logging
+import time
+from datetime import timedelta
+
+import numpy as np
+
+from src.database import DatabaseConnection
+
+INSERT_SQL = """
+    INSERT INTO power_consumption (ts, global_active_power_kw, global_reactive_power_kw, voltage_v,
+        global_intensity_a, sub_metering_1_wh, sub_metering_2_wh, sub_metering_3_wh)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    RETURNING id
+"""
+
+LATENCY_SQL = """
+    SELECT EXTRACT(EPOCH FROM MIN(s.scored_at) - p.inserted_at)
+    FROM power_consumption p
+    JOIN anomaly_scores s ON s.measurement_id = p.id AND s.measurement_ts = p.ts
+    WHERE p.id = ANY(%s)
+    GROUP BY p.id, p.inserted_at
+"""
+
+
+def execute(db, query, params=None, fetch=True):
+    with db._connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall() if fetch else None
+        conn.commit()
+    return rows
+
+
+def insert_measurements(db, count, period):
+    """Insert `count` measurements, one every `period` seconds"""
+    rng = np.random.default_rng()
+    last = execute(db, "SELECT MAX(ts) FROM power_consumption")[0][0]
+    first = last + timedelta(minutes=1)
+    execute(db, "SELECT ensure_power_partitions(%s, %s)",
+            (first, first + timedelta(minutes=count)))
+
+    ids, ts_range = [], (first, first + timedelta(minutes=count - 1))
+    for i in range(count):
+        t0 = time.perf_counter()
+        values = (first + timedelta(minutes=i), float(rng.uniform(0.2, 5)), float(rng.uniform(0, 0.5)),
+                  float(rng.normal(240, 3)), float(rng.uniform(1, 20)),
+                  0.0, float(rng.integers(0, 3)), float(rng.integers(0, 20)))
+        ids.append(execute(db, INSERT_SQL, values)[0][0])
+        time.sleep(max(period - (time.perf_counter() - t0), 0))
+    return ids, ts_range
+
+
+def wait_scored(db, ids, timeout):
+    """Latencies (s) of the scored measurements, waiting at most `timeout` s for all of them"""
+    deadline = time.monotonic() + timeout
+    while True:
+        latencies = [row[0] for row in execute(db, LATENCY_SQL, (ids,))]
+        if len(latencies) == len(ids) or time.monotonic() > deadline:
+            return latencies
+        time.sleep(0.5)
+
+
+def cleanup(db, ids, ts_range):
+    execute(db, "DELETE FROM anomaly_scores WHERE measurement_id = ANY(%s)", (ids,), fetch=False)
+    execute(db, "DELETE FROM power_consumption WHERE id = ANY(%s)", (ids,), fetch=False)
+    execute(db, "SELECT refresh_power_rollups(%s, %s)", ts_range, fetch=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='G4 - Benchmark of the insert-to-score latency')
+    parser.add_argument('--count', type=int, default=50, help='Number of measurements inserted')
+    parser.add_argument('--period', type=float, default=2.0, help='Seconds between two insertions')
+    parser.add_argument('--timeout', type=float, default=120.0,
+                        help='Seconds to wait for the last scores')
+    parser.add_argument('--cleanup', action='store_true',
+                        help='Delete the inserted measurements and their scores')
+    args = parser.parse_args()
+
+    logging.getLogger('src.database').setLevel(logging.WARNING)
+
+    db = DatabaseConnection()
+    if not db.connect():
+        return
+
+    try:
+        print(f"▶ Inserting {args.count} measurements, one every {args.period}s")
+        ids, ts_range = insert_measurements(db, args.count, args.period)
+        latencies = np.array(wait_scored(db, ids, args.timeout), dtype=float)
+
+        print(f"\nScored: {len(latencies)}/{len(ids)}")
+        if len(latencies):
+            print(f"Latency (insert → score): median {np.median(latencies) * 1000:.0f} ms | "
+                  f"p95 {np.percentile(latencies, 95) * 1000:.0f} ms | "
+                  f"max {latencies.max() * 1000:.0f} ms")
+
+        if args.cleanup:
+            cleanup(db, ids, ts_range)
+            print("✓ Benchmark measurements removed")
+    finally:
+        db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+G4 - Benchmark of the anomaly score write-back
+Writes the same synthetic batch of scores with three strategies and prints
+the latency per batch size:
+  - row       : one INSERT per score on a fresh connection (former
+                update_anomaly_scores pattern, O(rows) round trips)
+  - values    : one multi-row INSERT ... VALUES (execute_values)
+  - copy      : DatabaseConnection.write_anomaly_scores (COPY into the
+                staging table + one INSERT ... SELECT, O(1) round trips)
+The scores use negative measurement ids and their own model_version; they
+are deleted after each measure, rollups are not touched.
+
+Usage:
+    python bench_write_scores.py
+    python bench_write_scores.py --sizes 100 10000 100000 --repeat 3
+"""
+
+import argparse
+import logging
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import execute_values
+
+from src.database import DatabaseConnection
+
+BENCH_VERSION = "bench-write-scores"
+
+INSERT_SQL = """
+    INSERT INTO anomaly_scores (measurement_id, measurement_ts, model_version, anomaly_score, is_anomaly)
+    VALUES %s
+    ON CONFLICT (measurement_id, model_version) DO NOTHING
+"""
+
+ROW_INSERT_SQL = INSERT_SQL.replace("VALUES %s", "VALUES (%s, %s, %s, %s, %s)")
+
+
+def make_scores(n):
+    """n synthetic (id, ts, score, flag) records, one per minute"""
+    rng = np.random.default_rng(42)
+    start = datetime(2000, 1, 1)
+    scores = rng.normal(size=n)
+    return [(-(i + 1), start + timedelta(minutes=i), float(scores[i]), bool(scores[i] > 2.5))
+            for i in range(n)]
+
+
+def write_row_by_row(db, records):
+    conn = psycopg2.connect(**db._connection_params())
+    try:
+        with conn.cursor() as cursor:
+            for record_id, ts, score, flag in records:
+                cursor.execute(ROW_INSERT_SQL, (record_id, ts, BENCH_VERSION, score, flag))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def write_values(db, records):
+    with db._connection() as conn:
+        with conn.cursor() as cursor:
+            execute_values(cursor, INSERT_SQL,
+                           [(record_id, ts, BENCH_VERSION, score, flag)
+                            for record_id, ts, score, flag in records],
+                           page_size=len(records))
+        conn.commit()
+
+
+def write_copy(db, records):
+    db.write_anomaly_scores(records, BENCH_VERSION)
+
+
+STRATEGIES = {
+    "row": write_row_by_row,
+    "values": write_values,
+    "copy": write_copy,
+}
+
+
+def cleanup(db):
+    with db._connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM anomaly_scores WHERE model_version = %s", (BENCH_VERSION,))
+        conn.commit()
+
+
+def time_strategy(db, write, records, repeat):
+    timings = []
+    for _ in range(repeat):
+        cleanup(db)
+        t0 = time.perf_counter()
+        write(db, records)
+        timings.append(time.perf_counter() - t0)
+    cleanup(db)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='G4 - Benchmark of the score write-back')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10_000, 100_000],
+                        help='Batch sizes (number of scores)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--row-max', type=int, default=100_000,
+                        help='Largest batch measured with the row-by-row strategy')
+    args = parser.parse_args()
+
+    # Only the benchmark table goes to stdout
+    logging.getLogger('src.database').setLevel(logging.WARNING)
+
+    db = DatabaseConnection()
+    if not db.connect():
+        return
+
+    results = []
+    try:
+        for size in args.sizes:
+            records = make_scores(size)
+            row = {"size": size}
+            for name, write in STRATEGIES.items():
+                if name == "row" and size > args.row_max:
+                    row[name] = None
+                    continue
+                row[name] = time_strategy(db, write, records, args.repeat)
+            results.append(row)
+            print(f"▶ {size:,} scores")
+    finally:
+        cleanup(db)
+        db.disconnect()
+
+    print("\n   scores |    row ms |  values ms |   copy ms | copy speedup vs row")
+    for r in results:
+        cells = [f"{r[name] * 1000:9.1f}" if r[name] is not None else f"{'-':>9s}"
+                 for name in STRATEGIES]
+        speedup = f"{r['row'] / r['copy']:8.1f}x" if r["row"] is not None else f"{'-':>9s}"
+        print(f"{r['size']:9,d} | {cells[0]} | {cells[1]:>10s} | {cells[2]} | {speedup}")
+
+
+if __name__ == "__main__":
+    main()
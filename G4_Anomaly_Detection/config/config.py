@@ -18,8 +18,17 @@ class Config:
     DB_NAME = os.getenv('DB_NAME', 'power_consumption_db')
     DB_USER = os.getenv('DB_USER', 'postgres')
     DB_PASSWORD = os.getenv('DB_PASSWORD', 'postgres')
+    DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 1))
+    DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 2))
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))
+    # Batch jobs (backfill, rescore_history): multi-month reads, sweeps and
+    # rollup refreshes run past DB_STATEMENT_TIMEOUT_MS (0: no limit)
+    BATCH_STATEMENT_TIMEOUT_MS = int(os.getenv('BATCH_STATEMENT_TIMEOUT_MS', 0))
     
     # Model Configuration
+    MODEL_PATH = os.getenv('MODEL_PATH', 'models/anomaly_detector.pkl')
+    G3_SCALER_PATH = os.getenv('G3_SCALER_PATH', 'models/g3_scaler.pkl')
+    G3_PCA_PATH = os.getenv('G3_PCA_PATH', 'models/g3_pca.pkl')
     ANOMALY_THRESHOLD = float(os.getenv('ANOMALY_THRESHOLD', -0.5))
     CONTAMINATION = float(os.getenv('CONTAMINATION', 0.01))
     N_ESTIMATORS = int(os.getenv('N_ESTIMATORS', 100))
@@ -33,7 +42,36 @@ class Config:
     
     # Scoring Configuration
     SCORING_INTERVAL = int(os.getenv('SCORING_INTERVAL', 60))
+    # Initial batch size; the engine then adapts it between BATCH_SIZE_MIN
+    # and BATCH_SIZE_MAX to keep each batch within SCORING_LATENCY_TARGET_MS
     BATCH_SIZE = int(os.getenv('BATCH_SIZE', 100))
+    BATCH_SIZE_MIN = int(os.getenv('BATCH_SIZE_MIN', 10))
+    BATCH_SIZE_MAX = int(os.getenv('BATCH_SIZE_MAX', 50000))
+    SCORING_LATENCY_TARGET_MS = int(os.getenv('SCORING_LATENCY_TARGET_MS', 1000))
+    SCORING_METRICS_INTERVAL = int(os.getenv('SCORING_METRICS_INTERVAL', 10))
+    MAX_LOGGED_ANOMALIES = int(os.getenv('MAX_LOGGED_ANOMALIES', 20))
+    # Pipelined mode: claim, compute and write of consecutive batches overlap
+    SCORING_PIPELINE = os.getenv('SCORING_PIPELINE', 'false').lower() in ('1', 'true', 'yes')
+    PIPELINE_QUEUE_DEPTH = int(os.getenv('PIPELINE_QUEUE_DEPTH', 2))
+    SCORING_LEASE_SECONDS = int(os.getenv('SCORING_LEASE_SECONDS', 300))
+    SCORING_GAP_SWEEP_INTERVAL = int(os.getenv('SCORING_GAP_SWEEP_INTERVAL', 300))
+    SCORING_GAP_LOOKBACK = int(os.getenv('SCORING_GAP_LOOKBACK', 100000))
+    # New measurements are notified on this channel (LISTEN/NOTIFY); the
+    # scoring interval is then only a fallback wake-up
+    SCORING_CHANNEL = os.getenv('SCORING_CHANNEL', 'power_consumption_new')
+    SCORING_COALESCE_MS = int(os.getenv('SCORING_COALESCE_MS', 50))
+    # Hot model reload (continuous mode): the model artifacts are checked
+    # every MODEL_RELOAD_INTERVAL s (0: disabled); a new version is scored
+    # on MODEL_PROBE_ROWS recent measurements before being swapped in
+    MODEL_RELOAD_INTERVAL = int(os.getenv('MODEL_RELOAD_INTERVAL', 10))
+    MODEL_PROBE_ROWS = int(os.getenv('MODEL_PROBE_ROWS', 1000))
+    MODEL_PROBE_MAX_ANOMALY_RATE = float(os.getenv('MODEL_PROBE_MAX_ANOMALY_RATE', 0.5))
+    # Backfill mode: ids read, scored and written per batch by each worker
+    BACKFILL_BATCH_SIZE = int(os.getenv('BACKFILL_BATCH_SIZE', 50000))
+    BACKFILL_PROGRESS_INTERVAL = int(os.getenv('BACKFILL_PROGRESS_INTERVAL', 5))
+    # Lease of the range reserved by a backfill (renewed after each batch):
+    # the gap sweep of the live workers skips the range until it expires
+    BACKFILL_RESERVATION_LEASE_SECONDS = int(os.getenv('BACKFILL_RESERVATION_LEASE_SECONDS', 600))
     
     @classmethod
     def get_db_connection_string(cls):
@@ -1,22 +1,5 @@
-﻿DROP TABLE IF EXISTS power_consumption;
-
-CREATE TABLE power_consumption (
-    id BIGSERIAL PRIMARY KEY,
-    ts TIMESTAMP NOT NULL,
-    global_active_power_kw DOUBLE PRECISION NULL,
-    global_reactive_power_kw DOUBLE PRECISION NULL,
-    voltage_v DOUBLE PRECISION NULL,
-    global_intensity_a DOUBLE PRECISION NULL,
-    sub_metering_1_wh DOUBLE PRECISION NULL,
-    sub_metering_2_wh DOUBLE PRECISION NULL,
-    sub_metering_3_wh DOUBLE PRECISION NULL,
-    is_anomaly BOOLEAN NOT NULL DEFAULT FALSE,
-    anomaly_score DOUBLE PRECISION NULL,
-    scored_at TIMESTAMP NULL,
-    inserted_at TIMESTAMP NOT NULL DEFAULT NOW()
-);
-
--- Index pour améliorer les performances
-CREATE INDEX IF NOT EXISTS idx_ts ON power_consumption(ts);
-CREATE INDEX IF NOT EXISTS idx_anomaly ON power_consumption(is_anomaly);
-CREATE INDEX IF NOT EXISTS idx_scored_at ON power_consumption(scored_at);
+-- Schéma de la base G4 : le même que celui de G2, défini une seule fois
+-- dans G2_data_engineering/init_db.sql (monté par docker-compose) et inclus
+-- ici pour les installations manuelles :
+--   psql -d power_consumption_db -f G4_Anomaly_Detection/create_tables.sql
+\ir ../G2_data_engineering/init_db.sql
@@ -39,7 +39,7 @@ def check_dependencies():
     
     required_packages = [
         'pandas', 'numpy', 'scikit-learn', 'psycopg2',
-        'sqlalchemy', 'matplotlib', 'python-dotenv'
+        'matplotlib', 'python-dotenv'
     ]
     
     missing = []
@@ -0,0 +1,174 @@
+"""
+G4 - Rescore History
+Rescores the measurements of a time range with a new model version, in
+parallel worker processes (id slices, large batches, COPY write-back), then
+makes that version the active one. The scores are written under their
+final label (the version, or '<version>:<run>' when the version is already
+the active one: extended range), marked as pending: power_consumption_scored
+and the rollups keep showing the previous scores until the flip. The flip
+only moves the active_model_version pointer, so readers never see a
+half-rescored range and live scoring is not held; the rollups of the range
+are then refreshed one day per transaction.
+
+An interrupted run resumes where it stopped: the records already scored
+by the new version (or its pending label) are skipped.
+
+Usage:
+    python rescore_history.py --start 2007-01-01 --end "2007-06-30 23:59"
+    python rescore_history.py --start 2007-01-01 --end 2007-12-31 --model models/candidate.pkl --workers 4
+    python rescore_history.py --start 2007-01-01 --end 2007-12-31 --no-activate
+"""
+
+import os
+import sys
+import argparse
+import logging
+import pandas as pd
+from src.database import DatabaseConnection
+from src.scoring_engine import ScoringEngine
+from src.backfill import run_slices, split_range
+from src.model_reload import load_model_pair, validate_model_pair
+from config.config import Config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _rescore_slice(after_id, until_id, window, pair, label, ts_range, ids_done, rows_done, worker_id):
+    """
+    Worker process: score the records of one id slice with the new model,
+    one window of `window` ids at a time
+
+    Args:
+        after_id (int): Lower bound of the slice (excluded)
+        until_id (int): Upper bound of the slice (included)
+        window (int): Ids read, scored and written per batch
+        pair (tuple): (DataPreprocessor, AnomalyDetector) of the new version
+        label (str): Label the scores are written under (pending_version)
+        ts_range (tuple): (start, end) of the rescored time range
+        ids_done (multiprocessing.Value): Shared count of ids walked
+        rows_done (multiprocessing.Value): Shared count of records scored
+        worker_id (str): Worker identifier (logs)
+    """
+    logging.getLogger('src.database').setLevel(logging.WARNING)
+    engine = ScoringEngine(worker_id=worker_id, statement_timeout_ms=Config.BATCH_STATEMENT_TIMEOUT_MS)
+    engine.preprocessor, engine.detector = pair
+    if not engine.db.connect():
+        logger.error(f"✗ {worker_id}: no database, slice {after_id} → {until_id} skipped")
+        return
+
+    version = engine.detector.model_version
+    try:
+        cursor = after_id
+        while cursor < until_id:
+            upper = min(cursor + window, until_id)
+            df = engine.db.get_unscored_range(cursor, upper, model_versions=[version, label],
+                                              ts_range=ts_range)
+            if len(df) > 0:
+                batch = engine.compute_batch({'df': df, 'stage_ms': {}})
+                # Pending label, no rollup refresh: both change with the flip
+                written = engine.db.write_anomaly_scores(batch['records'], label)
+                with rows_done.get_lock():
+                    rows_done.value += written
+            with ids_done.get_lock():
+                ids_done.value += upper - cursor
+            cursor = upper
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.db.disconnect()
+
+
+def rescore_history(start, end, model_path=None, workers=None, window=None, activate=True):
+    """
+    Rescore [start, end] with the model of `model_path`, then activate it
+
+    Args:
+        start (datetime): First ts of the range (included)
+        end (datetime): Last ts of the range (included)
+        model_path (str): Model to score with (default: MODEL_PATH)
+        workers (int): Number of worker processes (default: CPU count)
+        window (int): Ids per batch (default: BACKFILL_BATCH_SIZE)
+        activate (bool): Flip the active version once the range is complete
+
+    Returns:
+        bool: True if the whole range is scored by the new version
+    """
+    workers = workers or os.cpu_count() or 1
+    window = window or Config.BACKFILL_BATCH_SIZE
+
+    # Multi-month counts and rollup refreshes: no statement timeout
+    db = DatabaseConnection(statement_timeout_ms=Config.BATCH_STATEMENT_TIMEOUT_MS)
+    if not db.connect():
+        return False
+
+    # New model: loaded once, inherited by the forked workers
+    pair = load_model_pair(model_path or Config.MODEL_PATH, Config.G3_SCALER_PATH, Config.G3_PCA_PATH)
+    if pair is None:
+        logger.error("✗ Model artifacts could not be loaded")
+        return False
+    reason = validate_model_pair(*pair, db.get_probe_data(Config.MODEL_PROBE_ROWS))
+    if reason is not None:
+        logger.error(f"✗ Model rejected: {reason}")
+        return False
+    version = pair[1].model_version
+    logger.info(f"▶ Rescoring {start} → {end} with {version} "
+                f"(active: {db.get_active_model_version()})")
+
+    bounds = db.get_id_range(start, end)
+    if bounds is None:
+        logger.info("✓ No records in this range")
+        return True
+    slices = split_range(*bounds, workers)
+    # Hidden from the readers until the flip
+    label = db.set_pending_model_version(version)
+
+    # The workers are forked: pooled connections must not be shared with them
+    db.disconnect()
+    _, interrupted = run_slices(_rescore_slice, slices, (window, pair, label, (start, end)), label='Rescore')
+    if not db.connect():
+        return False
+
+    try:
+        if interrupted:
+            logger.info("⏸ Rescoring interrupted: run the same command again to resume")
+            return False
+
+        missing = db.count_unscored([version, label], start, end)
+        if missing:
+            logger.error(f"✗ {missing} records not rescored, active version unchanged (run again to resume)")
+            return False
+
+        if activate:
+            db.activate_model_version(version, start, end)
+        else:
+            logger.info(f"✓ Range rescored; activate with: python rescore_history.py "
+                        f"--start '{start}' --end '{end}' --model {model_path or Config.MODEL_PATH}")
+        return True
+    finally:
+        db.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='G4 - Rescore a time range with a new model version')
+    parser.add_argument('--start', required=True, help='First ts of the range (included)')
+    parser.add_argument('--end', required=True, help='Last ts of the range (included)')
+    parser.add_argument('--model', default=None, help='Model file (default: MODEL_PATH)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help='Ids per batch (default: BACKFILL_BATCH_SIZE)')
+    parser.add_argument('--no-activate', action='store_true',
+                        help='Rescore without flipping the active version')
+    args = parser.parse_args()
+
+    ok = rescore_history(pd.Timestamp(args.start).to_pydatetime(), pd.Timestamp(args.end).to_pydatetime(),
+                         model_path=args.model, workers=args.workers, window=args.batch_size,
+                         activate=not args.no_activate)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
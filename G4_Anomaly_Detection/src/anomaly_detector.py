@@ -3,10 +3,13 @@ G4 - Anomaly Detection Model
 Implements Isolation Forest for anomaly detection
 """
 
+import os
 import numpy as np
 import pandas as pd
 import pickle
+import hashlib
 import logging
+from datetime import datetime
 from sklearn.ensemble import IsolationForest
 from sklearn.neighbors import LocalOutlierFactor
 import matplotlib.pyplot as plt
@@ -31,6 +34,7 @@ class AnomalyDetector:
         self.model = None
         self.threshold = Config.ANOMALY_THRESHOLD
         self.is_fitted = False
+        self.model_version = None
         
     def train(self, X_train):
         """
@@ -61,6 +65,7 @@ class AnomalyDetector:
         # Fit the model
         self.model.fit(X_train)
         self.is_fitted = True
+        self.model_version = f"{self.algorithm}-{datetime.now():%Y%m%dT%H%M%S}"
         
         logger.info(f"✓ Model trained on {len(X_train)} samples")
         
@@ -139,7 +144,8 @@ class AnomalyDetector:
     
     def save_model(self, filepath='models/anomaly_detector.pkl'):
         """
-        Save trained model to file
+        Save trained model to file. The file is replaced atomically: a
+        running scoring engine never reads a partially written model.
         
         Args:
             filepath (str): Path to save the model
@@ -149,11 +155,14 @@ class AnomalyDetector:
                 'model': self.model,
                 'algorithm': self.algorithm,
                 'threshold': self.threshold,
-                'is_fitted': self.is_fitted
+                'is_fitted': self.is_fitted,
+                'model_version': self.model_version
             }
             
-            with open(filepath, 'wb') as f:
+            tmp_path = f"{filepath}.tmp"
+            with open(tmp_path, 'wb') as f:
                 pickle.dump(model_data, f)
+            os.replace(tmp_path, filepath)
             
             logger.info(f"✓ Model saved to {filepath}")
         
@@ -169,14 +178,19 @@ class AnomalyDetector:
         """
         try:
             with open(filepath, 'rb') as f:
-                model_data = pickle.load(f)
+                raw = f.read()
+            model_data = pickle.loads(raw)
             
             self.model = model_data['model']
             self.algorithm = model_data['algorithm']
             self.threshold = model_data['threshold']
             self.is_fitted = model_data['is_fitted']
+            # Models saved before versioning are identified by their content
+            self.model_version = (model_data.get('model_version')
+                                  or f"{self.algorithm}-{hashlib.sha256(raw).hexdigest()[:12]}")
             
             logger.info(f"✓ Model loaded from {filepath}")
+            logger.info(f"  Version: {self.model_version}")
             logger.info(f"  Algorithm: {self.algorithm}")
             logger.info(f"  Threshold: {self.threshold}")
         
@@ -216,7 +230,8 @@ class AnomalyDetector:
         info = {
             'algorithm': self.algorithm,
             'threshold': self.threshold,
-            'is_fitted': self.is_fitted
+            'is_fitted': self.is_fitted,
+            'model_version': self.model_version
         }
         
         if self.is_fitted and self.algorithm == 'isolation_forest':
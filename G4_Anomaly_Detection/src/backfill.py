@@ -0,0 +1,195 @@
+"""
+G4 - Backfill Scoring
+Scores the backlog left by a bulk load. The id range after the scoring
+watermark is reserved in one step (reserve_scoring_range), split into
+contiguous slices and scored by parallel worker processes: large id windows,
+one bulk write (COPY) per window, no per-row claims. Live workers keep
+claiming the ids above the reserved range in the meantime; their gap sweep
+skips the range while the reservation lease runs (renewed after each
+window, released at the end).
+"""
+
+import os
+import time
+import socket
+import logging
+import multiprocessing
+from multiprocessing.connection import wait
+from datetime import timedelta
+from config.config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def split_range(range_from, range_to, parts):
+    """
+    Split the id range ]range_from, range_to] into contiguous slices
+
+    Args:
+        range_from (int): Lower bound (excluded)
+        range_to (int): Upper bound (included)
+        parts (int): Number of slices
+
+    Returns:
+        list: (after_id, until_id) bounds of each non-empty slice
+    """
+    span = range_to - range_from
+    parts = max(1, min(parts, span))
+    bounds = [range_from + span * i // parts for i in range(parts + 1)]
+    return [(lo, hi) for lo, hi in zip(bounds, bounds[1:]) if hi > lo]
+
+
+def _score_slice(after_id, until_id, window, owner, ids_done, rows_done, worker_id):
+    """
+    Worker process: score the unscored records of one id slice, one
+    window of `window` ids at a time
+
+    Args:
+        after_id (int): Lower bound of the slice (excluded)
+        until_id (int): Upper bound of the slice (included)
+        window (int): Ids read, scored and written per batch
+        owner (str): Owner of the range reservation
+        ids_done (multiprocessing.Value): Shared count of ids walked
+        rows_done (multiprocessing.Value): Shared count of records scored
+        worker_id (str): Worker identifier (logs)
+    """
+    # Imported here: scoring_engine imports this module
+    from src.scoring_engine import ScoringEngine
+
+    logging.getLogger('src.database').setLevel(logging.WARNING)
+    engine = ScoringEngine(worker_id=worker_id, statement_timeout_ms=Config.BATCH_STATEMENT_TIMEOUT_MS)
+    if not engine.initialize(sweep=False):
+        logger.error(f"✗ {worker_id}: failed to initialize, slice {after_id} → {until_id} skipped")
+        return
+
+    try:
+        cursor = after_id
+        while cursor < until_id:
+            upper = min(cursor + window, until_id)
+            df = engine.db.get_unscored_range(cursor, upper)
+            if len(df) > 0:
+                batch = engine.compute_batch({'df': df, 'stage_ms': {}})
+                written = engine.db.write_anomaly_scores(batch['records'], batch['model_version'],
+                                                         refresh_rollups=True)
+                with rows_done.get_lock():
+                    rows_done.value += written
+            with ids_done.get_lock():
+                ids_done.value += upper - cursor
+            engine.db.renew_scoring_reservation(owner)
+            cursor = upper
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.db.disconnect()
+
+
+def _format_eta(seconds):
+    return str(timedelta(seconds=int(seconds))) if seconds is not None else '?'
+
+
+def run_slices(target, slices, args=(), label='Backfill'):
+    """
+    Run `target(after_id, until_id, *args, ids_done, rows_done, worker_id)`
+    in one worker process per id slice, logging progress and ETA every
+    BACKFILL_PROGRESS_INTERVAL seconds. The caller must not hold pooled
+    connections: the workers are forked.
+
+    Args:
+        target (callable): Slice worker
+        slices (list): (after_id, until_id) bounds, see split_range
+        args (tuple): Extra arguments passed to every worker
+        label (str): Name of the job (logs, process names)
+
+    Returns:
+        tuple: (records scored, interrupted)
+    """
+    total_ids = sum(hi - lo for lo, hi in slices)
+    ids_done = multiprocessing.Value('q', 0)
+    rows_done = multiprocessing.Value('q', 0)
+    host = f"{socket.gethostname()}-{os.getpid()}"
+    processes = [
+        multiprocessing.Process(
+            target=target,
+            args=(lo, hi, *args, ids_done, rows_done, f"{host}-{label.lower()}{i}"),
+            name=f"scoring-{label.lower()}-{i}"
+        )
+        for i, (lo, hi) in enumerate(slices)
+    ]
+    t_start = time.monotonic()
+    for process in processes:
+        process.start()
+
+    interrupted = False
+    try:
+        while True:
+            alive = [process.sentinel for process in processes if process.is_alive()]
+            if not alive:
+                break
+            ready = wait(alive, timeout=Config.BACKFILL_PROGRESS_INTERVAL)
+            # A ready sentinel can precede the exit by a few ms
+            for process in processes:
+                if process.sentinel in ready:
+                    process.join()
+            elapsed = time.monotonic() - t_start
+            walked, scored = ids_done.value, rows_done.value
+            rate = walked / elapsed if elapsed > 0 else 0
+            eta = (total_ids - walked) / rate if rate > 0 else None
+            logger.info(f"📊 {label} {walked / total_ids * 100:5.1f}% | {scored:,} scored | "
+                        f"{scored / elapsed if elapsed > 0 else 0:,.0f} rows/s | ETA {_format_eta(eta)}")
+    except KeyboardInterrupt:
+        # Ctrl+C reaches every worker of the process group
+        logger.info(f"\n⏸ Stopping {label.lower()}...")
+        interrupted = True
+        for process in processes:
+            process.join()
+
+    elapsed = time.monotonic() - t_start
+    scored = rows_done.value
+    logger.info(f"✓ {label}: {scored:,} records scored in {_format_eta(elapsed)} "
+                f"({scored / elapsed if elapsed > 0 else 0:,.0f} rows/s)")
+    return scored, interrupted
+
+
+def run_backfill(db, workers=None, window=None):
+    """
+    Reserve the backlog and score it with parallel worker processes
+    (run_slices). Records of the range left unscored are re-queued for
+    the live workers afterwards.
+
+    Args:
+        db (DatabaseConnection): Connected database, without statement
+            timeout (BATCH_STATEMENT_TIMEOUT_MS); its pool is closed while
+            the workers run, then reopened
+        workers (int): Number of worker processes (default: CPU count)
+        window (int): Ids per batch (default: BACKFILL_BATCH_SIZE)
+
+    Returns:
+        int: Number of records scored, or None if interrupted
+    """
+    workers = workers or os.cpu_count() or 1
+    window = window or Config.BACKFILL_BATCH_SIZE
+
+    owner = f"{socket.gethostname()}-{os.getpid()}-backfill"
+    reserved = db.reserve_scoring_range(owner)
+    if reserved is None:
+        return 0
+    range_from, range_to = reserved
+    slices = split_range(range_from, range_to, workers)
+    if not slices:
+        logger.info("✓ Nothing to backfill")
+        return 0
+
+    logger.info(f"▶ Backfill of {range_to - range_from:,} ids with {len(slices)} workers "
+                f"({window:,} ids per batch)")
+
+    # The workers are forked: pooled connections must not be shared with them
+    db.disconnect()
+    scored, interrupted = run_slices(_score_slice, slices, (window, owner), label='Backfill')
+
+    # Unscored records left in the range (failed window, interrupted run)
+    # are handed to the live workers
+    if db.connect():
+        db.release_scoring_reservation(owner)
+        db.sweep_scoring_gaps(lookback=None)
+    return None if interrupted else scored
@@ -0,0 +1,130 @@
+"""
+G4 - Adaptive Batch Sizing
+Chooses the size of the next scoring batch from the backlog and the
+measured batch latency: small batches when the engine is caught up, batches
+as large as the latency target allows while it works through a backlog
+"""
+
+
+class BatchSizeController:
+    """
+    Batch size controller with a linear latency model.
+
+    The latency of a batch of n rows is modelled as overhead + n * row_cost
+    (claim and write round trips, then per-row transform/predict/COPY work).
+    Both terms are fitted online (exponentially weighted least squares), and
+    the next size is the largest one whose predicted latency stays within
+    the target, capped by the backlog.
+    """
+
+    def __init__(self, target_latency=1.0, min_size=10, max_size=50000,
+                 initial_size=100, smoothing=0.3, max_growth=2.0):
+        """
+        Args:
+            target_latency (float): Target latency of one batch, in seconds
+            min_size (int): Smallest batch size
+            max_size (int): Largest batch size
+            initial_size (int): Batch size before any measurement
+            smoothing (float): Weight of the newest measurement (0-1)
+            max_growth (float): Maximum growth factor between two batches
+        """
+        self.target_latency = target_latency
+        self.min_size = min_size
+        self.max_size = max_size
+        self.smoothing = smoothing
+        self.max_growth = max_growth
+
+        self.size = max(min_size, min(initial_size, max_size))
+        self.backlog = None
+        self.mode = 'live'
+        self.last_rows = 0
+        self.last_latency = 0.0
+
+        # Exponentially weighted moments of (rows, latency)
+        self._moments = None
+        self.row_cost = None
+        self.overhead = 0.0
+
+    def next_size(self):
+        """
+        Returns:
+            int: Number of rows to claim for the next batch
+        """
+        return self.size
+
+    def capacity(self):
+        """
+        Returns:
+            int: Largest batch size predicted to meet the latency target
+        """
+        if not self.row_cost:
+            return self.size
+        budget = self.target_latency - self.overhead
+        if budget <= 0:
+            return self.min_size
+        return int(budget / self.row_cost)
+
+    def _fit(self, rows, latency):
+        sample = (rows, latency, rows * rows, rows * latency)
+        if self._moments is None:
+            self._moments = list(sample)
+        else:
+            a = self.smoothing
+            self._moments = [(1 - a) * m + a * s for m, s in zip(self._moments, sample)]
+
+        mean_x, mean_y, mean_xx, mean_xy = self._moments
+        var_x = mean_xx - mean_x * mean_x
+        if var_x > 1e-9 * max(mean_xx, 1.0):
+            cost = (mean_xy - mean_x * mean_y) / var_x
+        else:
+            cost = 0.0
+        if cost <= 0:
+            # Batches of (nearly) constant size: the whole latency is per-row
+            cost = mean_y / max(mean_x, 1.0)
+            self.overhead = 0.0
+        else:
+            self.overhead = max(mean_y - cost * mean_x, 0.0)
+        self.row_cost = cost
+
+    def update(self, rows, latency, backlog):
+        """
+        Record a finished batch and choose the next size
+
+        Args:
+            rows (int): Rows scored in the batch
+            latency (float): Batch latency in seconds (claim to commit)
+            backlog (int): Rows still waiting to be scored
+
+        Returns:
+            int: Next batch size
+        """
+        self.last_rows = rows
+        self.last_latency = latency
+        self.backlog = backlog
+
+        if rows > 0 and latency > 0:
+            self._fit(rows, latency)
+
+        target = min(self.capacity(), int(self.size * self.max_growth))
+        if backlog is not None:
+            # Caught up: no need to claim more than what is waiting
+            target = min(target, max(backlog, self.min_size))
+        self.size = max(self.min_size, min(target, self.max_size))
+        self.mode = 'catch-up' if backlog is not None and backlog > self.size else 'live'
+        return self.size
+
+    def state(self):
+        """
+        Returns:
+            dict: Controller state (for logs and the worker status table)
+        """
+        return {
+            'mode': self.mode,
+            'batch_size': self.size,
+            'backlog': self.backlog,
+            'last_rows': self.last_rows,
+            'last_latency_ms': round(self.last_latency * 1000, 1),
+            'target_latency_ms': round(self.target_latency * 1000, 1),
+            'row_cost_us': round(self.row_cost * 1e6, 2) if self.row_cost else None,
+            'overhead_ms': round(self.overhead * 1000, 1),
+        }
@@ -4,51 +4,244 @@ Handles PostgreSQL connection and data retrieval
 UPDATED: Matches actual database schema with ts, _kw, _v, _a, _wh suffixes
 """
 
+import io
+import json
 import psycopg2
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine
 import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from config.config import Config
 
+try:
+    # Shared connection pool, Parquet archive + snapshot cache (repo root on PYTHONPATH)
+    from common.db import (NotifyListener, blocks_to_frame, close_pool, configure_pool,
+                           iter_history, pooled_connection, stream_query)
+except ImportError:
+    NotifyListener = blocks_to_frame = close_pool = configure_pool = None
+    iter_history = pooled_connection = stream_query = None
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Score write-back: COPY into a temporary staging table, then one INSERT ... SELECT
+STAGE_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS anomaly_scores_stage (
+        measurement_id BIGINT NOT NULL,
+        measurement_ts TIMESTAMP NOT NULL,
+        model_version TEXT NOT NULL,
+        anomaly_score DOUBLE PRECISION NOT NULL,
+        is_anomaly BOOLEAN NOT NULL
+    ) ON COMMIT DELETE ROWS
+"""
+
+MERGE_SQL = """
+    INSERT INTO anomaly_scores (measurement_id, measurement_ts, model_version, anomaly_score, is_anomaly)
+    SELECT measurement_id, measurement_ts, model_version, anomaly_score, is_anomaly
+    FROM anomaly_scores_stage
+    ON CONFLICT (measurement_id, model_version) DO NOTHING
+"""
+
+# Same merge, restricted to the rows whose claim the worker still holds
+# (the claims are deleted by the same statement)
+MERGE_CLAIMED_SQL = """
+    WITH owned AS (
+        DELETE FROM scoring_claims c
+        USING anomaly_scores_stage s
+        WHERE c.worker = %s AND c.measurement_id = s.measurement_id
+        RETURNING c.measurement_id
+    )
+    INSERT INTO anomaly_scores (measurement_id, measurement_ts, model_version, anomaly_score, is_anomaly)
+    SELECT s.measurement_id, s.measurement_ts, s.model_version, s.anomaly_score, s.is_anomaly
+    FROM anomaly_scores_stage s
+    JOIN owned o ON o.measurement_id = s.measurement_id
+    ON CONFLICT (measurement_id, model_version) DO NOTHING
+"""
+
+# Largest gap between two scored rows refreshed by the same rollup call: a
+# batch mixing swept or late rows with fresh ones refreshes each run of
+# neighbouring rows, never the months in between
+ROLLUP_RUN_GAP = timedelta(hours=1)
+
+def touched_ranges(timestamps, gap=ROLLUP_RUN_GAP):
+    """
+    Split timestamps into contiguous runs (no two consecutive rows further
+    apart than `gap`) and return the (min ts, max ts) of each run
+    """
+    ranges = []
+    for ts in sorted(set(timestamps)):
+        if ranges and ts - ranges[-1][1] <= gap:
+            ranges[-1][1] = ts
+        else:
+            ranges.append([ts, ts])
+    return [tuple(r) for r in ranges]
+
+def rescore_model_version(model_version, active, pending):
+    """
+    Label of the scores written by a rescoring job: the version itself, or
+    '<version>:<run>' when the version is already the active one (extended
+    range; its scores must stay hidden until the flip). An interrupted run
+    keeps its label, so that it resumes where it stopped.
+    
+    Args:
+        model_version (str): Version of the rescoring model
+        active (str): Active version
+        pending (str): Label of the last rescoring job, if not activated
+        
+    Returns:
+        str: Label of the scores
+    """
+    if pending is not None and pending.split(':', 1)[0] == model_version:
+        return pending
+    if model_version != active:
+        return model_version
+    return f"{model_version}:{datetime.now():%Y%m%d%H%M%S}"
+
 class DatabaseConnection:
     """Manages database connections and queries"""
     
-    def __init__(self):
+    def __init__(self, statement_timeout_ms=None, pool_size=1):
+        """
+        Args:
+            statement_timeout_ms (int): statement_timeout of the pooled
+                connections (default: DB_STATEMENT_TIMEOUT_MS, 0: no limit)
+            pool_size (int): Threads of the process using the pool at the
+                same time; the pool holds at least that many connections
+                (DB_POOL_MAX if larger)
+        """
         self.config = Config()
-        self.engine = None
-        self.connection = None
+        self.statement_timeout_ms = (Config.DB_STATEMENT_TIMEOUT_MS if statement_timeout_ms is None
+                                     else statement_timeout_ms)
+        self.pool_size = pool_size
         
+    def _connection_params(self):
+        return {
+            'host': Config.DB_HOST,
+            'port': Config.DB_PORT,
+            'dbname': Config.DB_NAME,
+            'user': Config.DB_USER,
+            'password': Config.DB_PASSWORD
+        }
+    
+    @contextmanager
+    def _connection(self):
+        """Borrow a connection from the shared pool (or open one if common/ is unavailable)"""
+        if pooled_connection is not None:
+            with pooled_connection() as conn:
+                yield conn
+        else:
+            conn = psycopg2.connect(**self._connection_params())
+            try:
+                yield conn
+            finally:
+                conn.close()
+    
     def connect(self):
-        """Establish connection to PostgreSQL database"""
+        """Configure the shared connection pool and check connectivity"""
         try:
-            self.engine = create_engine(Config.get_db_connection_string())
-            self.connection = self.engine.connect()
+            if configure_pool is not None:
+                configure_pool(
+                    minconn=Config.DB_POOL_MIN,
+                    maxconn=max(Config.DB_POOL_MAX, self.pool_size),
+                    application_name='g4_anomaly_detection',
+                    statement_timeout_ms=self.statement_timeout_ms,
+                    **self._connection_params()
+                )
+            with self._connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.commit()
             logger.info("✓ Successfully connected to PostgreSQL database")
             return True
         except Exception as e:
             logger.error(f"✗ Failed to connect to database: {e}")
             return False
     
+    def listen(self, channel):
+        """
+        Subscribe to a NOTIFY channel on a dedicated connection
+        
+        Args:
+            channel (str): Channel name
+            
+        Returns:
+            NotifyListener: Listener (wait(timeout, coalesce), close()),
+                or None if notifications are unavailable (polling fallback)
+        """
+        if NotifyListener is None:
+            return None
+        try:
+            listener = NotifyListener(channel, application_name='g4_anomaly_detection_listen',
+                                      **self._connection_params())
+            logger.info(f"✓ Listening on channel {channel}")
+            return listener
+        except Exception as e:
+            logger.error(f"✗ Failed to listen on channel {channel}: {e}")
+            return None
+    
     def disconnect(self):
-        """Close database connection"""
-        if self.connection:
-            self.connection.close()
-            logger.info("Database connection closed")
+        """Close the pooled connections"""
+        if close_pool is not None:
+            close_pool()
+        logger.info("Database connection closed")
+    
+    def read_sql(self, query, params=None):
+        """
+        Run a read query on a pooled connection
+        
+        Args:
+            query (str): SQL query
+            params (tuple): Query parameters
+            
+        Returns:
+            pd.DataFrame: Query result
+        """
+        with self._connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+                columns = [desc[0] for desc in cursor.description]
+                rows = cursor.fetchall()
+            conn.commit()
+        return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
     
-    def get_historical_data(self, limit=None):
+    def get_historical_data(self, limit=None, start=None, end=None):
         """
-        Retrieve historical data for model training
+        Retrieve historical data for model training (records not flagged
+        as anomalies, oldest first)
         
         Args:
             limit (int): Maximum number of records to retrieve
+            start (datetime): First ts (included), default: start of history
+            end (datetime): Last ts (included), default: end of history
             
         Returns:
             pd.DataFrame: Historical power consumption data
         """
+        if iter_history is not None:
+            try:
+                # Block by block (archive, then columnar cache, in time
+                # order): only the retained rows are kept, and the read
+                # stops once `limit` rows are collected
+                blocks, rows = [], 0
+                for block in iter_history(start=start, end=end, with_anomaly_flag=True):
+                    keep = ~block['is_anomaly']
+                    if limit:
+                        keep &= np.cumsum(keep) <= limit - rows
+                    block = {name: values[keep] for name, values in block.items()}
+                    rows += len(block['ts'])
+                    blocks.append(block)
+                    if limit and rows >= limit:
+                        break
+                df = blocks_to_frame(blocks)
+                if len(df):
+                    df = df.sort_values('ts', kind='stable', ignore_index=True)
+                logger.info(f"✓ Retrieved {len(df)} historical records (Parquet archive + columnar cache)")
+                return df
+            except Exception as e:
+                logger.warning(f"Columnar cache unavailable, falling back to SQL: {e}")
+
         try:
             query = """
             SELECT 
@@ -63,15 +256,23 @@ class DatabaseConnection:
                 is_anomaly,
                 anomaly_score,
                 scored_at
-            FROM power_consumption 
-            WHERE anomaly_score IS NULL OR is_anomaly = FALSE
+            FROM power_consumption_scored 
+            WHERE (anomaly_score IS NULL OR is_anomaly = FALSE)
+              AND (%s::timestamp IS NULL OR ts >= %s)
+              AND (%s::timestamp IS NULL OR ts <= %s)
             ORDER BY ts ASC
             """
+            params = [start, start, end, end]
             
             if limit:
-                query += f" LIMIT {limit}"
+                query += " LIMIT %s"
+                params.append(limit)
             
-            df = pd.read_sql(query, self.engine)
+            if stream_query is not None:
+                # Server-side cursor: typed numpy blocks, no full list of row tuples
+                df = blocks_to_frame(stream_query(query, params))
+            else:
+                df = self.read_sql(query, params)
             logger.info(f"✓ Retrieved {len(df)} historical records")
             return df
         
@@ -81,7 +282,8 @@ class DatabaseConnection:
     
     def get_unscored_data(self, batch_size=100):
         """
-        Retrieve data that hasn't been scored yet
+        Retrieve data that hasn't been claimed for scoring yet (read-only
+        look at the head of the queue, after the scoring_watermark cursor)
         
         Args:
             batch_size (int): Number of records to retrieve
@@ -90,23 +292,26 @@ class DatabaseConnection:
             pd.DataFrame: Unscored power consumption data
         """
         try:
-            query = f"""
+            query = """
             SELECT 
-                id, ts, 
-                global_active_power_kw, 
-                global_reactive_power_kw, 
-                voltage_v, 
-                global_intensity_a, 
-                sub_metering_1_wh, 
-                sub_metering_2_wh, 
-                sub_metering_3_wh
-            FROM power_consumption 
-            WHERE anomaly_score IS NULL 
-            ORDER BY ts ASC 
-            LIMIT {batch_size}
+                p.id, p.ts, 
+                p.global_active_power_kw, 
+                p.global_reactive_power_kw, 
+                p.voltage_v, 
+                p.global_intensity_a, 
+                p.sub_metering_1_wh, 
+                p.sub_metering_2_wh, 
+                p.sub_metering_3_wh
+            FROM power_consumption p
+            WHERE p.id > COALESCE((SELECT last_id FROM scoring_watermark WHERE queue = 'scoring'), 0)
+              AND NOT EXISTS (
+                SELECT 1 FROM anomaly_scores s WHERE s.measurement_id = p.id
+            )
+            ORDER BY p.id ASC 
+            LIMIT %s
             """
             
-            df = pd.read_sql(query, self.engine)
+            df = self.read_sql(query, (batch_size,))
             
             if len(df) > 0:
                 logger.info(f"✓ Retrieved {len(df)} unscored records")
@@ -117,42 +322,479 @@ class DatabaseConnection:
             logger.error(f"✗ Error retrieving unscored data: {e}")
             return pd.DataFrame()
     
-    def update_anomaly_scores(self, updates):
+    def get_probe_data(self, limit=1000):
         """
-        Update anomaly scores and flags in database
+        Retrieve the most recent measurements (probe batch used to validate
+        a new model version before it is swapped in)
         
         Args:
-            updates (list): List of tuples (id, anomaly_score, is_anomaly)
+            limit (int): Number of records to retrieve
+            
+        Returns:
+            pd.DataFrame: Power consumption records
+        """
+        query = """
+        SELECT 
+            p.id, p.ts, 
+            p.global_active_power_kw, 
+            p.global_reactive_power_kw, 
+            p.voltage_v, 
+            p.global_intensity_a, 
+            p.sub_metering_1_wh, 
+            p.sub_metering_2_wh, 
+            p.sub_metering_3_wh
+        FROM power_consumption p
+        ORDER BY p.id DESC 
+        LIMIT %s
+        """
+        return self.read_sql(query, (limit,))
+    
+    def claim_unscored_data(self, worker_id, batch_size=100, lease_seconds=300):
+        """
+        Claim a batch of unscored records for this worker (scoring_claims).
+        Concurrent workers never receive the same rows; claims whose lease
+        has expired (crashed or stopped worker) are handed out again. New
+        records are taken after the durable scoring_watermark cursor, in id
+        order, so a claim costs O(batch) whatever the table size.
+        
+        Args:
+            worker_id (str): Unique worker identifier
+            batch_size (int): Maximum number of records to claim
+            lease_seconds (int): Lease duration before the claim can be taken over
+            
+        Returns:
+            pd.DataFrame: Claimed power consumption records, ordered by ts
         """
         try:
-            conn = psycopg2.connect(
-                host=Config.DB_HOST,
-                port=Config.DB_PORT,
-                database=Config.DB_NAME,
-                user=Config.DB_USER,
-                password=Config.DB_PASSWORD
-            )
-            cursor = conn.cursor()
-            
-            update_query = """
-            UPDATE power_consumption 
-            SET anomaly_score = %s, 
-                is_anomaly = %s,
-                scored_at = NOW()
-            WHERE id = %s
+            query = """
+            SELECT 
+                p.id, p.ts, 
+                p.global_active_power_kw, 
+                p.global_reactive_power_kw, 
+                p.voltage_v, 
+                p.global_intensity_a, 
+                p.sub_metering_1_wh, 
+                p.sub_metering_2_wh, 
+                p.sub_metering_3_wh
+            FROM claim_scoring_batch(%s, %s, make_interval(secs => %s)) c
+            JOIN power_consumption p ON p.id = c.measurement_id AND p.ts = c.measurement_ts
+            ORDER BY p.ts ASC
             """
             
-            for record_id, score, is_anomaly in updates:
-                cursor.execute(update_query, (score, is_anomaly, record_id))
+            df = self.read_sql(query, (worker_id, batch_size, lease_seconds))
+            
+            if len(df) > 0:
+                logger.info(f"✓ Claimed {len(df)} unscored records ({worker_id})")
             
+            return df
+        
+        except Exception as e:
+            logger.error(f"✗ Error claiming unscored data: {e}")
+            return pd.DataFrame()
+    
+    def sweep_scoring_gaps(self, lookback=None):
+        """
+        Re-queue the unscored records left behind the scoring watermark
+        (ids committed after the cursor passed them). They are claimed with
+        an expired lease, so the next claim_unscored_data hands them out first.
+        
+        Args:
+            lookback (int): Number of ids checked below the watermark
+                (None: whole history)
+                
+        Returns:
+            int: Number of records re-queued
+        """
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT sweep_scoring_gaps(%s)", (lookback,))
+                    repaired = cursor.fetchone()[0]
+                conn.commit()
+            if repaired:
+                logger.warning(f"⚠ Gap sweep: {repaired} unscored records re-queued")
+            return repaired
+        except Exception as e:
+            logger.error(f"✗ Error sweeping scoring gaps: {e}")
+            return 0
+    
+    def reserve_scoring_range(self, owner, lease_seconds=None):
+        """
+        Reserve the whole id range after the scoring watermark for a
+        backfill: the watermark jumps to MAX(id), live workers claim the
+        ids above it, and their gap sweep skips the range while the
+        reservation lease runs
+        
+        Args:
+            owner (str): Backfill identifier
+            lease_seconds (int): Reservation lease (default: from config)
+            
+        Returns:
+            tuple: (range_from, range_to), ids in ]range_from, range_to],
+                or None on error
+        """
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT range_from, range_to FROM reserve_scoring_range(%s, %s * INTERVAL '1 second')",
+                                   (owner, lease_seconds or Config.BACKFILL_RESERVATION_LEASE_SECONDS))
+                    reserved = cursor.fetchone()
+                conn.commit()
+            logger.info(f"✓ Reserved ids {reserved[0]} → {reserved[1]} for backfill")
+            return reserved
+        except Exception as e:
+            logger.error(f"✗ Error reserving scoring range: {e}")
+            return None
+    
+    def renew_scoring_reservation(self, owner, lease_seconds=None):
+        """
+        Extend the lease of the ranges reserved by a backfill
+        
+        Args:
+            owner (str): Backfill identifier
+            lease_seconds (int): New lease from now (default: from config)
+        """
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "UPDATE scoring_reservations SET lease_until = NOW() + %s * INTERVAL '1 second' "
+                        "WHERE owner = %s",
+                        (lease_seconds or Config.BACKFILL_RESERVATION_LEASE_SECONDS, owner)
+                    )
+                conn.commit()
+        except Exception as e:
+            logger.error(f"✗ Error renewing scoring reservation: {e}")
+    
+    def release_scoring_reservation(self, owner):
+        """
+        Drop the ranges reserved by a backfill: their unscored records are
+        swept again
+        
+        Args:
+            owner (str): Backfill identifier
+        """
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("DELETE FROM scoring_reservations WHERE owner = %s", (owner,))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"✗ Error releasing scoring reservation: {e}")
+    
+    def get_unscored_range(self, after_id, until_id, model_versions=None, ts_range=None):
+        """
+        Retrieve the unscored records of an id range (backfill: the range
+        is reserved by reserve_scoring_range, no claims are taken)
+        
+        Args:
+            after_id (int): Lower bound (excluded)
+            until_id (int): Upper bound (included)
+            model_versions (list): Only the records without a score of one
+                of these versions (rescoring); default: without any score
+            ts_range (tuple): (start, end) bounds on ts, included
+        
+        Returns:
+            pd.DataFrame: Unscored power consumption records, ordered by id
+        """
+        query = """
+        SELECT
+            p.id, p.ts,
+            p.global_active_power_kw,
+            p.global_reactive_power_kw,
+            p.voltage_v,
+            p.global_intensity_a,
+            p.sub_metering_1_wh,
+            p.sub_metering_2_wh,
+            p.sub_metering_3_wh
+        FROM power_consumption p
+        WHERE p.id > %s AND p.id <= %s
+          AND NOT EXISTS (
+            SELECT 1 FROM anomaly_scores s WHERE s.measurement_id = p.id
+              AND s.measurement_id > %s AND s.measurement_id <= %s
+              AND (%s::text[] IS NULL OR s.model_version = ANY(%s::text[]))
+        )
+        """
+        params = [after_id, until_id, after_id, until_id, model_versions, model_versions]
+        if ts_range is not None:
+            query += " AND p.ts BETWEEN %s AND %s"
+            params.extend(ts_range)
+        query += " ORDER BY p.id ASC"
+        
+        # Plain cursor: the window is read in full, a server-side cursor
+        # would get a fast-start (nested loop) plan for the anti-join
+        return self.read_sql(query, params)
+    
+    def get_id_range(self, start, end):
+        """
+        Id bounds of the records of a time range
+        
+        Args:
+            start (datetime): First ts (included)
+            end (datetime): Last ts (included)
+            
+        Returns:
+            tuple: (min id - 1, max id), ids in ]first, last], or None if
+                the range is empty
+        """
+        with self._connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT MIN(id) - 1, MAX(id) FROM power_consumption WHERE ts BETWEEN %s AND %s",
+                               (start, end))
+                bounds = cursor.fetchone()
+            conn.commit()
+        return bounds if bounds[1] is not None else None
+    
+    def count_unscored(self, model_versions, start, end):
+        """
+        Number of records of a time range without a score of any of the
+        given model versions
+        
+        Args:
+            model_versions (list): Model versions
+            start (datetime): First ts (included)
+            end (datetime): Last ts (included)
+            
+        Returns:
+            int: Records still to be scored by this version
+        """
+        with self._connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT COUNT(*) FROM power_consumption p
+                    WHERE p.ts BETWEEN %s AND %s
+                      AND NOT EXISTS (
+                        SELECT 1 FROM anomaly_scores s
+                        WHERE s.measurement_id = p.id AND s.model_version = ANY(%s)
+                    )
+                """, (start, end, list(model_versions)))
+                missing = cursor.fetchone()[0]
+            conn.commit()
+        return missing
+    
+    def get_active_model_version(self):
+        """
+        Returns:
+            str: Active model version (preferred by power_consumption_scored),
+                or None (most recent score of each record)
+        """
+        with self._connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT model_version FROM active_model_version WHERE name = 'anomaly'")
+                row = cursor.fetchone()
+            conn.commit()
+        return row[0] if row else None
+    
+    def set_pending_model_version(self, model_version):
+        """
+        Mark the scores of a rescoring job: until the flip,
+        power_consumption_scored only shows them for the records that have
+        no other score
+        
+        Args:
+            model_version (str): Version of the rescoring model
+            
+        Returns:
+            str: Label to write the scores under (see rescore_model_version)
+        """
+        with self._connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("INSERT INTO active_model_version (name) VALUES ('anomaly') ON CONFLICT DO NOTHING")
+                cursor.execute("""
+                    SELECT model_version, pending_version FROM active_model_version
+                    WHERE name = 'anomaly' FOR UPDATE
+                """)
+                label = rescore_model_version(model_version, *cursor.fetchone())
+                cursor.execute("UPDATE active_model_version SET pending_version = %s WHERE name = 'anomaly'",
+                               (label,))
             conn.commit()
-            cursor.close()
-            conn.close()
+        return label
+    
+    def activate_model_version(self, model_version, start, end):
+        """
+        Make a model version the active one (pointer flip, constant time),
+        then refresh the rollups of the rescored time range one day per
+        transaction, so that live writers are never held for long
+        
+        Args:
+            model_version (str): Model version
+            start (datetime): First ts of the rescored range
+            end (datetime): Last ts of the rescored range
+            
+        Returns:
+            str: Previously active version
+        """
+        with self._connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT activate_model_version(%s)", (model_version,))
+                previous = cursor.fetchone()[0]
+            conn.commit()
+        logger.info(f"✓ Active model version: {previous} → {model_version}")
+        self.refresh_rollups(start, end)
+        return previous
+    
+    def refresh_rollups(self, start, end):
+        """
+        Refresh the minute/hour/day rollups of a time range, one calendar
+        day per transaction
+        
+        Args:
+            start (datetime): First ts (included)
+            end (datetime): Last ts (included)
+        """
+        lower = start
+        while lower <= end:
+            next_day = (lower + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            upper = min(next_day - timedelta(microseconds=1), end)
+            with self._connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT refresh_power_rollups(%s, %s)", (lower, upper))
+                conn.commit()
+            lower = next_day
+        logger.info(f"✓ Rollups refreshed: {start} → {end}")
+    
+    def get_scoring_backlog(self):
+        """
+        Estimate the number of records waiting to be scored: ids after the
+        scoring watermark plus expired claims (an upper bound, computed
+        from index bounds only)
+        
+        Returns:
+            int: Backlog estimate, or None on error
+        """
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("""
+                        SELECT GREATEST(
+                                   COALESCE((SELECT MAX(id) FROM power_consumption), 0)
+                                   - COALESCE((SELECT last_id FROM scoring_watermark WHERE queue = 'scoring'), 0),
+                                   0)
+                             + (SELECT COUNT(*) FROM scoring_claims WHERE lease_until < NOW())
+                    """)
+                    backlog = cursor.fetchone()[0]
+                conn.commit()
+            return int(backlog)
+        except Exception as e:
+            logger.error(f"✗ Error estimating scoring backlog: {e}")
+            return None
+    
+    def publish_worker_status(self, worker_id, status, stage_ms, rows_per_s=None, utilization=None,
+                              model_version=None):
+        """
+        Upsert the state of a scoring worker in scoring_worker_status
+        
+        Args:
+            worker_id (str): Worker identifier
+            status (dict): Batch size controller state
+            stage_ms (dict): Duration of each stage of the last batch (ms)
+            rows_per_s (float): Scoring throughput since the last publication
+            utilization (dict): Busy fraction of each pipeline stage
+            model_version (str): Version of the model in service
+        """
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("""
+                        INSERT INTO scoring_worker_status (worker, mode, batch_size, backlog, rows_per_s,
+                            last_latency_ms, stage_ms, stage_utilization, model_version, controller, updated_at)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+                        ON CONFLICT (worker) DO UPDATE SET
+                            mode = EXCLUDED.mode, batch_size = EXCLUDED.batch_size,
+                            backlog = EXCLUDED.backlog, rows_per_s = EXCLUDED.rows_per_s,
+                            last_latency_ms = EXCLUDED.last_latency_ms, stage_ms = EXCLUDED.stage_ms,
+                            stage_utilization = EXCLUDED.stage_utilization,
+                            model_version = EXCLUDED.model_version,
+                            controller = EXCLUDED.controller, updated_at = NOW()
+                    """, (worker_id, status['mode'], status['batch_size'], status['backlog'], rows_per_s,
+                          status['last_latency_ms'], json.dumps(stage_ms),
+                          json.dumps(utilization) if utilization is not None else None,
+                          model_version, json.dumps(status)))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"✗ Error publishing worker status: {e}")
+    
+    def release_claims(self, worker_id):
+        """
+        Release the claims still held by a worker (graceful shutdown), so
+        that other workers pick the rows up without waiting for the lease
+        
+        Args:
+            worker_id (str): Worker identifier
+        """
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("DELETE FROM scoring_claims WHERE worker = %s", (worker_id,))
+                    released = cursor.rowcount
+                conn.commit()
+            if released:
+                logger.info(f"✓ Released {released} claims ({worker_id})")
+        except Exception as e:
+            logger.error(f"✗ Error releasing claims: {e}")
+    
+    def write_anomaly_scores(self, scores, model_version, refresh_rollups=False, worker_id=None):
+        """
+        Append anomaly scores to the anomaly_scores table (power_consumption
+        rows are never rewritten). The whole batch costs a constant number of
+        round trips: one COPY into a temporary staging table, then one
+        set-based INSERT ... SELECT into anomaly_scores. Scores already
+        present for (measurement_id, model_version) are skipped, so a retried
+        batch is harmless.
+        
+        Args:
+            scores (list): List of tuples (id, ts, anomaly_score, is_anomaly)
+            model_version (str): Version of the model that produced the scores
+            refresh_rollups (bool): Refresh, in the same transaction, the
+                minute/hour/day rollups of each contiguous run of scored
+                rows (see touched_ranges)
+            worker_id (str): Worker that claimed the rows; only the rows
+                whose claim it still holds are written, and the claims are
+                removed in the same statement
+                
+        Returns:
+            int: Number of scores written
+        """
+        if not scores:
+            return 0
+        
+        try:
+            with self._connection() as conn:
+                with conn.cursor() as cursor:
+                    # Per-connection staging table, emptied at every commit
+                    # (pooled connections keep it between batches)
+                    cursor.execute(STAGE_SQL)
+                    
+                    buf = io.StringIO()
+                    for record_id, ts, score, is_anomaly in scores:
+                        buf.write(f"{record_id}\t{ts}\t{model_version}\t{score!r}\t{'t' if is_anomaly else 'f'}\n")
+                    buf.seek(0)
+                    cursor.copy_expert(
+                        "COPY anomaly_scores_stage (measurement_id, measurement_ts, model_version, "
+                        "anomaly_score, is_anomaly) FROM STDIN",
+                        buf
+                    )
+                    
+                    if worker_id is None:
+                        cursor.execute(MERGE_SQL)
+                    else:
+                        cursor.execute(MERGE_CLAIMED_SQL, (worker_id,))
+                    written = cursor.rowcount
+                    
+                    if refresh_rollups:
+                        for ts_range in touched_ranges(ts for _, ts, _, _ in scores):
+                            cursor.execute("SELECT refresh_power_rollups(%s, %s)", ts_range)
+                conn.commit()
             
-            logger.info(f"✓ Updated {len(updates)} records with anomaly scores")
+            if written < len(scores):
+                logger.warning(f"⚠ {len(scores) - written} scores skipped "
+                               f"(already scored, or claim taken over by another worker)")
+            logger.info(f"✓ Wrote {written} anomaly scores (model {model_version})")
+            return written
             
         except Exception as e:
-            logger.error(f"✗ Error updating anomaly scores: {e}")
+            logger.error(f"✗ Error writing anomaly scores: {e}")
+            return 0
     
     def get_anomaly_statistics(self):
         """
@@ -162,18 +804,19 @@ class DatabaseConnection:
             dict: Statistics about anomalies
         """
         try:
+            # Daily rollups (kept up to date by G2 and write_anomaly_scores)
             query = """
             SELECT 
-                COUNT(*) as total_records,
-                SUM(CASE WHEN is_anomaly = TRUE THEN 1 ELSE 0 END) as total_anomalies,
-                AVG(CASE WHEN is_anomaly = TRUE THEN 1.0 ELSE 0.0 END) * 100 as anomaly_rate,
-                MIN(ts) as first_record,
-                MAX(ts) as last_record,
-                COUNT(CASE WHEN anomaly_score IS NOT NULL THEN 1 END) as scored_records
-            FROM power_consumption
+                SUM(row_count) as total_records,
+                SUM(anomaly_count) as total_anomalies,
+                SUM(anomaly_count) * 100.0 / NULLIF(SUM(row_count), 0) as anomaly_rate,
+                (SELECT MIN(ts) FROM power_consumption) as first_record,
+                (SELECT MAX(ts) FROM power_consumption) as last_record,
+                SUM(scored_count) as scored_records
+            FROM power_rollup_day
             """
             
-            df = pd.read_sql(query, self.engine)
+            df = self.read_sql(query)
             return df.to_dict('records')[0]
         
         except Exception as e:
@@ -184,7 +827,7 @@ class DatabaseConnection:
         """Test database connection"""
         try:
             query = "SELECT COUNT(*) as count FROM power_consumption"
-            df = pd.read_sql(query, self.engine)
+            df = self.read_sql(query)
             count = df['count'][0]
             logger.info(f"✓ Connection test successful. Total records: {count}")
             return True
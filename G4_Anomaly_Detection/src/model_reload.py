@@ -0,0 +1,208 @@
+"""
+G4 - Hot Model Reload
+Watches the model artifacts (detector, G3 scaler and PCA) and loads new
+versions in a background thread. A candidate pair is scored on a probe
+batch of recent measurements first; the scoring engine then swaps it in
+between two batches, so scoring never stops during a reload.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+import numpy as np
+from src.preprocessor import DataPreprocessor
+from src.anomaly_detector import AnomalyDetector
+from config.config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def model_paths():
+    """
+    Returns:
+        tuple: Paths of the detector, G3 scaler and G3 PCA artifacts
+    """
+    return (Config.MODEL_PATH, Config.G3_SCALER_PATH, Config.G3_PCA_PATH)
+
+
+def artifact_signature(paths):
+    """
+    Args:
+        paths (tuple): Artifact paths
+
+    Returns:
+        tuple: (mtime_ns, size) of each artifact, or None if one is missing
+    """
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def pair_version(detector, paths):
+    """
+    Version of a preprocessor / detector pair: the version of the detector
+    plus a digest of the three artifacts. Replacing the G3 scaler or PCA
+    alone changes the scores, so it must also change the version (scores
+    are keyed by measurement and version).
+
+    Args:
+        detector (AnomalyDetector): Loaded detector
+        paths (tuple): Paths of the detector, G3 scaler and G3 PCA artifacts
+
+    Returns:
+        str: Version written with the scores of the pair
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        digest.update(b'\0')
+    return f"{detector.model_version}+{digest.hexdigest()[:12]}"
+
+
+def load_model_pair(model_path, scaler_path, pca_path):
+    """
+    Load a preprocessor / detector pair from the artifacts
+
+    Returns:
+        tuple: (DataPreprocessor, AnomalyDetector), or None if an artifact
+            could not be loaded (missing, truncated or corrupt)
+    """
+    try:
+        preprocessor = DataPreprocessor()
+        if not preprocessor.load_g3_parameters(scaler_path, pca_path):
+            return None
+        detector = AnomalyDetector()
+        detector.load_model(model_path)
+        if not detector.is_fitted:
+            return None
+        detector.model_version = pair_version(detector, (model_path, scaler_path, pca_path))
+    except Exception as e:
+        logger.error(f"✗ Error loading model artifacts: {e}")
+        return None
+    return preprocessor, detector
+
+
+def validate_model_pair(preprocessor, detector, probe):
+    """
+    Score a probe batch with a candidate pair
+
+    Args:
+        preprocessor (DataPreprocessor): Candidate preprocessor
+        detector (AnomalyDetector): Candidate detector
+        probe (pd.DataFrame): Recent measurements
+
+    Returns:
+        str: Reason of the rejection, or None if the pair is valid
+    """
+    try:
+        anomaly_scores, is_anomaly = detector.predict(preprocessor.transform(probe))
+    except Exception as e:
+        return f"probe batch failed: {e}"
+
+    if len(anomaly_scores) != len(probe):
+        return f"{len(anomaly_scores)} scores for {len(probe)} probe rows"
+    if not np.all(np.isfinite(anomaly_scores)):
+        return "non-finite scores on the probe batch"
+    anomaly_rate = float(np.mean(is_anomaly)) if len(probe) else 0.0
+    if anomaly_rate > Config.MODEL_PROBE_MAX_ANOMALY_RATE:
+        return f"anomaly rate {anomaly_rate:.1%} on the probe batch"
+    return None
+
+
+class ModelWatcher:
+    """
+    Background watcher of the model artifacts. New versions are loaded and
+    validated off the scoring path; the engine takes the validated pair
+    with take() between two batches.
+    """
+
+    def __init__(self, db, signature, interval=None, paths=None):
+        """
+        Args:
+            db (DatabaseConnection): Connected database (probe batches)
+            signature (tuple): Signature of the artifacts in service
+            interval (int): Seconds between two checks (default: from config)
+            paths (tuple): Artifact paths (default: from config)
+        """
+        self.db = db
+        self.paths = paths or model_paths()
+        self.interval = interval or Config.MODEL_RELOAD_INTERVAL
+        self.current = signature
+        self._seen = signature
+        self._rejected = None
+        self._pending = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+        self._thread.start()
+        logger.info(f"✓ Watching model artifacts (every {self.interval}s)")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def take(self):
+        """
+        Returns:
+            tuple: ((preprocessor, detector), signature) validated and not
+                yet swapped in, or None
+        """
+        with self._lock:
+            pending, self._pending = self._pending, None
+        return pending
+
+    def check(self):
+        """
+        Load and validate the artifacts if they changed
+
+        Returns:
+            bool: True if a new pair is waiting to be swapped in
+        """
+        signature = artifact_signature(self.paths)
+        # A rejected (or unreadable) version is skipped until its files change
+        if signature is None or signature in (self.current, self._rejected):
+            return False
+
+        # Files still being copied: wait until they stop changing
+        if signature != self._seen:
+            self._seen = signature
+            return False
+
+        pair = load_model_pair(*self.paths)
+        if pair is None:
+            reason = "artifacts could not be loaded"
+        else:
+            probe = self.db.get_probe_data(Config.MODEL_PROBE_ROWS)
+            reason = validate_model_pair(*pair, probe)
+
+        if reason is not None:
+            logger.error(f"✗ New model rejected, keeping the current one: {reason}")
+            self._rejected = signature
+            return False
+
+        with self._lock:
+            self._pending = (pair, signature)
+        self.current = signature
+        logger.info(f"✓ Model {pair[1].model_version} validated on {len(probe)} probe rows, "
+                    f"swapped in at the next batch")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"✗ Model watcher error: {e}")
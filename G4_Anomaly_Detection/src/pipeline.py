@@ -0,0 +1,196 @@
+"""
+G4 - Pipelined Scoring
+Runs the stages of ScoringEngine concurrently: a fetch thread claims batch
+N+1 while the main thread transforms and predicts batch N and a write
+thread writes batch N-1 back. Bounded queues between the stages keep at
+most PIPELINE_QUEUE_DEPTH batches waiting in front of each stage.
+Per-stage utilization (busy time / wall time) shows the bottleneck.
+"""
+
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from config.config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# End of stream marker passed down the queues
+_STOP = object()
+
+STAGES = ('fetch', 'compute', 'write')
+
+# Threads holding a pooled connection at the same time (fetch and write;
+# the LISTEN connection of the fetch thread is not pooled)
+DB_THREADS = 2
+
+
+class StageMeter:
+    """Busy time of one pipeline stage"""
+
+    def __init__(self):
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.busy += time.perf_counter() - t0
+
+    def total(self):
+        with self._lock:
+            return self.busy
+
+
+class ScoringPipeline:
+    """
+    Pipelined execution of ScoringEngine.claim_batch / compute_batch /
+    write_batch (one thread per I/O stage, compute on the calling thread)
+    """
+
+    def __init__(self, engine, queue_depth=None):
+        """
+        Args:
+            engine (ScoringEngine): Initialized scoring engine
+            queue_depth (int): Batches waiting in front of each stage
+                (default: from config)
+        """
+        self.engine = engine
+        depth = queue_depth or Config.PIPELINE_QUEUE_DEPTH
+        self.fetched = queue.Queue(maxsize=depth)
+        self.scored = queue.Queue(maxsize=depth)
+        self.stop_event = threading.Event()
+        self.meters = {stage: StageMeter() for stage in STAGES}
+        self._report_lock = threading.Lock()
+        self._last_report = (time.perf_counter(), {stage: 0.0 for stage in STAGES})
+
+    def _fetch_loop(self, interval):
+        """Claim batches ahead of the compute stage; sleep on LISTEN when idle"""
+        listener = self.engine.db.listen(Config.SCORING_CHANNEL)
+        coalesce = Config.SCORING_COALESCE_MS / 1000
+        last_claim = 0.0
+        try:
+            while not self.stop_event.is_set():
+                self.engine.sweep_gaps_if_due()
+
+                last_claim = time.monotonic()
+                with self.meters['fetch'].measure():
+                    batch = self.engine.claim_batch()
+
+                if batch is not None:
+                    # Blocks while the compute stage is behind (back-pressure)
+                    self.fetched.put(batch)
+                    continue
+
+                # Nothing waiting: wake up on a notification or after
+                # `interval` s, checking for shutdown every second
+                while not self.stop_event.is_set():
+                    if listener is not None:
+                        if listener.wait(min(interval, 1.0), coalesce=coalesce):
+                            break
+                    else:
+                        self.stop_event.wait(min(interval, 1.0))
+                    if time.monotonic() - last_claim >= interval:
+                        break
+        except Exception as e:
+            logger.error(f"✗ Fetch stage stopped: {e}")
+        finally:
+            if listener is not None:
+                listener.close()
+            self.fetched.put(_STOP)
+
+    def _write_loop(self):
+        """Write scored batches back"""
+        while True:
+            batch = self.scored.get()
+            if batch is _STOP:
+                return
+            try:
+                with self.meters['write'].measure():
+                    self.engine.write_batch(batch)
+                self.report()
+            except Exception as e:
+                logger.error(f"Error writing batch: {e}")
+
+    def report(self, force=False):
+        """
+        Log and store the utilization of each stage since the last report
+        (every SCORING_METRICS_INTERVAL seconds)
+
+        Returns:
+            dict: Busy fraction per stage, or None if not due yet
+        """
+        with self._report_lock:
+            now = time.perf_counter()
+            last_time, last_busy = self._last_report
+            wall = now - last_time
+            if wall <= 0 or (not force and wall < Config.SCORING_METRICS_INTERVAL):
+                return None
+            busy = {stage: meter.total() for stage, meter in self.meters.items()}
+            utilization = {stage: round(min((busy[stage] - last_busy[stage]) / wall, 1.0), 3)
+                           for stage in STAGES}
+            self._last_report = (now, busy)
+
+        bottleneck = max(utilization, key=utilization.get)
+        logger.info(
+            "📈 Stage utilization: " +
+            " | ".join(f"{stage} {utilization[stage] * 100:.0f}%" for stage in STAGES) +
+            f" → bottleneck: {bottleneck}"
+        )
+        self.engine.utilization = utilization
+        return utilization
+
+    def run(self, interval):
+        """
+        Run until Ctrl+C. Batches already claimed when stopping are
+        scored and written before returning.
+
+        Args:
+            interval (int): Fallback wake-up in seconds when no notification
+                arrives
+        """
+        fetcher = threading.Thread(target=self._fetch_loop, args=(interval,),
+                                   name='scoring-fetch', daemon=True)
+        writer = threading.Thread(target=self._write_loop, name='scoring-write', daemon=True)
+        fetcher.start()
+        writer.start()
+
+        try:
+            while True:
+                try:
+                    batch = self.fetched.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                if batch is _STOP:
+                    break
+                try:
+                    with self.meters['compute'].measure():
+                        batch = self.engine.compute_batch(batch)
+                except Exception as e:
+                    logger.error(f"Error scoring batch: {e}")
+                    continue
+                # Blocks while the write stage is behind (back-pressure)
+                self.scored.put(batch)
+        except KeyboardInterrupt:
+            # Drain: stop claiming, finish the batches in flight
+            self.stop_event.set()
+            while True:
+                batch = self.fetched.get()
+                if batch is _STOP:
+                    break
+                try:
+                    self.scored.put(self.engine.compute_batch(batch))
+                except Exception as e:
+                    logger.error(f"Error scoring batch: {e}")
+        finally:
+            self.stop_event.set()
+            self.scored.put(_STOP)
+            writer.join()
+            fetcher.join(timeout=5)
+            self.report(force=True)
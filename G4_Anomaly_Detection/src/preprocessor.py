@@ -2,6 +2,9 @@
 G4 - Data Preprocessing Module
 Synchronizes with G3 normalization parameters and PCA axes
 UPDATED: Matches actual database schema with _kw, _v, _a, _wh suffixes
+
+Scaler and PCA are both affine: once loaded, they are fused into one
+projection (X @ W + b) so that a batch is transformed in a single pass.
 """
 
 import numpy as np
@@ -14,6 +17,10 @@ from sklearn.decomposition import PCA
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Length of the basis vectors the fused weights are read from (power of 2:
+# dividing by it is exact)
+_BASIS_SCALE = 1024.0
+
 class DataPreprocessor:
     """
     Handles data preprocessing using G3's normalization parameters
@@ -33,6 +40,9 @@ class DataPreprocessor:
             'sub_metering_3_wh'
         ]
         self.g3_params_loaded = False
+        # Fused scaler + PCA projection (see _fuse_affine)
+        self.weights = None
+        self.offset = None
     
     def load_g3_parameters(self, scaler_path='models/g3_scaler.pkl', pca_path='models/g3_pca.pkl'):
         """
@@ -53,6 +63,7 @@ class DataPreprocessor:
                 self.pca = pickle.load(f)
             logger.info(f"✓ Loaded G3 PCA from {pca_path}")
             
+            self._fuse_affine()
             self.g3_params_loaded = True
             return True
             
@@ -73,6 +84,7 @@ class DataPreprocessor:
         """
         self.scaler = StandardScaler()
         self.pca = PCA(n_components=3, random_state=42)
+        self.weights = self.offset = None
         logger.warning("⚠ Using default parameters - synchronize with G3 for production!")
     
     def fit_default(self, data):
@@ -97,6 +109,54 @@ class DataPreprocessor:
         X_scaled = self.scaler.transform(X)
         self.pca.fit(X_scaled)
         logger.info(f"✓ Fitted default PCA (explained variance: {sum(self.pca.explained_variance_ratio_):.2%})")
+        self._fuse_affine()
+    
+    def _transform_steps(self, X):
+        """
+        Reference path: scaler then PCA, one step at a time
+        
+        Args:
+            X (np.ndarray): Features, NaN already replaced by 0
+            
+        Returns:
+            np.ndarray: PCA components
+        """
+        frame = pd.DataFrame(X, columns=self.feature_columns)
+        return self.pca.transform(self.scaler.transform(frame))
+    
+    def _fuse_affine(self):
+        """
+        Fuse the scaler and the PCA into one projection X @ weights + offset.
+        Both are affine, so the map is read off the step-by-step path: the
+        offset is the image of 0, each row of the weights the image of a
+        basis vector minus the offset (basis vectors of length _BASIS_SCALE,
+        so that rounding in the offset, large for features far from 0 such
+        as the voltage, does not carry into the weights). The fused map is
+        checked against the step-by-step path on a random batch; if a step
+        is not affine (another G3 scaler), it is not used.
+        
+        Returns:
+            bool: True if transform uses the fused projection
+        """
+        self.weights = self.offset = None
+        n = len(self.feature_columns)
+        try:
+            basis = np.vstack([np.zeros(n), _BASIS_SCALE * np.eye(n)])
+            images = self._transform_steps(basis)
+            offset = images[0]
+            weights = np.ascontiguousarray((images[1:] - offset) / _BASIS_SCALE)
+            
+            probe = np.random.default_rng(0).normal(scale=100.0, size=(64, n))
+            if not np.allclose(probe @ weights + offset, self._transform_steps(probe),
+                               rtol=1e-9, atol=1e-9):
+                logger.warning("⚠ Scaler / PCA not affine, transform runs them step by step")
+                return False
+        except Exception as e:
+            logger.warning(f"⚠ Could not fuse scaler and PCA: {e}")
+            return False
+        
+        self.weights, self.offset = weights, offset
+        return True
     
     def transform(self, data):
         """
@@ -111,15 +171,19 @@ class DataPreprocessor:
         if self.scaler is None or self.pca is None:
             raise ValueError("Preprocessor not initialized. Load G3 parameters first.")
         
-        # Select features and handle missing values
-        X = data[self.feature_columns].fillna(0)
-        
-        # Apply normalization
-        X_scaled = self.scaler.transform(X)
+        # Select features (one float copy) and handle missing values in
+        # place: a NaN cannot be zeroed inside the matrix product, so this
+        # stays a pass of its own, over the copy only
+        X = data[self.feature_columns].to_numpy(dtype=np.float64, copy=True)
+        np.copyto(X, 0.0, where=np.isnan(X))
         
-        # Apply PCA transformation
-        X_pca = self.pca.transform(X_scaled)
+        if self.weights is None:
+            # Apply normalization, then PCA transformation
+            return self._transform_steps(X)
         
+        # Normalization and PCA in one projection
+        X_pca = X @ self.weights
+        X_pca += self.offset
         return X_pca
     
     def save_parameters(self, scaler_path='models/g4_scaler.pkl', pca_path='models/g4_pca.pkl'):
@@ -59,7 +59,7 @@ class ROICalculator:
                 voltage_v,
                 is_anomaly,
                 anomaly_score
-            FROM power_consumption
+            FROM power_consumption_scored
             WHERE anomaly_score IS NOT NULL
             """
             
@@ -70,7 +70,7 @@ class ROICalculator:
             
             query += " ORDER BY ts"
             
-            df = pd.read_sql(query, self.db.engine)
+            df = self.db.read_sql(query)
             logger.info(f"✓ Retrieved {len(df)} records for ROI analysis")
             
             return df
@@ -1,17 +1,33 @@
 """
 G4 - Real-Time Scoring Engine
-Consumer script that scores new data and updates the database
+Consumer script that scores new data and writes the scores to the database
 UPDATED: Matches actual database schema
+Several workers (--workers N, or several containers) can run side by side:
+each one claims its own batches through claim_scoring_batch (scoring_claims)
+The batch size adapts to the backlog and to a latency target
+(BatchSizeController); each worker publishes its state in
+scoring_worker_status
+In continuous mode, a retrained model (or new G3 artifacts) is validated
+in the background and swapped in between two batches (src/model_reload.py)
+After a bulk load, --mode backfill scores the whole backlog with parallel
+worker processes (src/backfill.py), then switches to live scoring
 """
 
+import os
 import time
+import socket
 import logging
+import multiprocessing
 import pandas as pd
 import numpy as np
 from datetime import datetime
 from src.database import DatabaseConnection
 from src.preprocessor import DataPreprocessor
 from src.anomaly_detector import AnomalyDetector
+from src.batch_controller import BatchSizeController
+from src.pipeline import DB_THREADS, ScoringPipeline
+from src.model_reload import ModelWatcher, artifact_signature, model_paths, pair_version
+from src.backfill import run_backfill
 from config.config import Config
 
 logging.basicConfig(
@@ -23,29 +39,63 @@ logger = logging.getLogger(__name__)
 class ScoringEngine:
     """
     Real-time scoring engine that processes unscored data
-    and updates the database with anomaly scores
+    and appends anomaly scores to the database
     """
     
-    def __init__(self):
-        self.db = DatabaseConnection()
+    def __init__(self, worker_id=None, statement_timeout_ms=None, pipelined=False):
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.pipelined = pipelined
+        self.db = DatabaseConnection(statement_timeout_ms=statement_timeout_ms,
+                                     pool_size=self.pool_size(pipelined))
         self.preprocessor = DataPreprocessor()
         self.detector = AnomalyDetector(algorithm='isolation_forest')
         self.is_initialized = False
+        self.controller = BatchSizeController(
+            target_latency=Config.SCORING_LATENCY_TARGET_MS / 1000,
+            min_size=Config.BATCH_SIZE_MIN,
+            max_size=Config.BATCH_SIZE_MAX,
+            initial_size=Config.BATCH_SIZE
+        )
+        self.stage_ms = {}
+        self.utilization = None  # per-stage utilization (pipelined mode)
+        self.model_signature = None
+        self.model_watcher = None
         
         # Statistics
         self.total_processed = 0
         self.total_anomalies = 0
         self.start_time = None
+        self.last_gap_sweep = 0.0
+        self.last_publish = 0.0
+        self.processed_at_publish = 0
     
-    def initialize(self):
+    @staticmethod
+    def pool_size(pipelined):
+        """
+        Pooled connections in use at the same time: the scoring loop (fetch
+        and write threads in pipelined mode) plus the model watcher
+        
+        Args:
+            pipelined (bool): Pipelined stages
+            
+        Returns:
+            int: Minimum size of the connection pool
+        """
+        return (DB_THREADS if pipelined else 1) + (1 if Config.MODEL_RELOAD_INTERVAL > 0 else 0)
+    
+    def initialize(self, sweep=True):
         """
         Initialize all components:
         1. Connect to database
         2. Load G3 preprocessing parameters
         3. Load trained anomaly detection model
+        
+        Args:
+            sweep (bool): Re-queue the records left behind the scoring
+                watermark (not needed by backfill workers)
         """
         logger.info("=" * 60)
-        logger.info("G4 - Initializing Real-Time Scoring Engine")
+        logger.info(f"G4 - Initializing Real-Time Scoring Engine ({self.worker_id})")
         logger.info("=" * 60)
         
         # Connect to database
@@ -53,24 +103,34 @@ class ScoringEngine:
             logger.error("Failed to connect to database")
             return False
         
+        # Signature taken before loading: artifacts replaced meanwhile are reloaded
+        self.model_signature = artifact_signature(model_paths())
+        
         # Load G3 parameters
         logger.info("\n[1/3] Loading G3 preprocessing parameters...")
-        if not self.preprocessor.load_g3_parameters():
+        if not self.preprocessor.load_g3_parameters(Config.G3_SCALER_PATH, Config.G3_PCA_PATH):
             logger.warning("Using default parameters - please synchronize with G3!")
         
         # Load trained model
         logger.info("\n[2/3] Loading trained anomaly detection model...")
         try:
-            self.detector.load_model('models/anomaly_detector.pkl')
+            self.detector.load_model(Config.MODEL_PATH)
         except:
             logger.error("Model not found. Please train the model first.")
             return False
+        # Same version as a hot reload of these artifacts (detector + G3 digest)
+        if self.detector.is_fitted:
+            self.detector.model_version = pair_version(self.detector, model_paths())
         
         # Test database connection
         logger.info("\n[3/3] Testing database connection...")
         if not self.db.test_connection():
             return False
         
+        # Records left behind the watermark while the engine was down
+        if sweep:
+            self.sweep_gaps()
+        
         self.is_initialized = True
         self.start_time = datetime.now()
         
@@ -80,52 +140,128 @@ class ScoringEngine:
         
         return True
     
-    def score_batch(self):
+    def claim_batch(self):
+        """
+        Stage 1 - claim a batch of unscored records for this worker, sized
+        by the batch size controller
+        
+        Returns:
+            dict: Batch (records DataFrame and stage timings), or None if
+                nothing is waiting
+        """
+        t_start = time.perf_counter()
+        df = self.db.claim_unscored_data(
+            self.worker_id,
+            batch_size=self.controller.next_size(),
+            lease_seconds=Config.SCORING_LEASE_SECONDS
+        )
+        if len(df) == 0:
+            return None
+        return {'df': df, 'stage_ms': {'claim': (time.perf_counter() - t_start) * 1000}}
+    
+    def compute_batch(self, batch):
+        """
+        Stage 2 - transform (G3 parameters) and predict anomaly scores
+        
+        Args:
+            batch (dict): Batch returned by claim_batch
+            
+        Returns:
+            dict: The same batch, with score records and anomaly flags
+        """
+        df = batch['df']
+        
+        # Between two batches: take a new model validated in the background,
+        # the whole batch is then scored by the same preprocessor / detector
+        self.swap_model_if_ready()
+        preprocessor, detector = self.preprocessor, self.detector
+        
+        # Transform data using G3 parameters
+        t0 = time.perf_counter()
+        X_transformed = preprocessor.transform(df)
+        t_transform = time.perf_counter()
+        
+        # Predict anomaly scores
+        anomaly_scores, is_anomaly = detector.predict(X_transformed)
+        t_predict = time.perf_counter()
+        
+        # Prepare score records for database
+        batch['records'] = list(zip(df['id'].tolist(), df['ts'].tolist(),
+                                    anomaly_scores.tolist(), is_anomaly.tolist()))
+        batch['is_anomaly'] = is_anomaly
+        batch['model_version'] = detector.model_version
+        batch['stage_ms']['transform'] = (t_transform - t0) * 1000
+        batch['stage_ms']['predict'] = (t_predict - t_transform) * 1000
+        return batch
+    
+    def write_batch(self, batch):
         """
-        Score a batch of unscored records
+        Stage 3 - append the scores, feed the batch size controller, log
         
+        Args:
+            batch (dict): Batch returned by compute_batch
+            
         Returns:
             int: Number of records processed
         """
-        # Get unscored data
-        df = self.db.get_unscored_data(batch_size=Config.BATCH_SIZE)
+        df, is_anomaly = batch['df'], batch['is_anomaly']
         
-        if len(df) == 0:
+        # Append scores (and refresh the rollups of the runs of scored rows);
+        # only the rows whose claim this worker still holds are written
+        t0 = time.perf_counter()
+        self.db.write_anomaly_scores(batch['records'], batch['model_version'],
+                                     refresh_rollups=True, worker_id=self.worker_id)
+        batch['stage_ms']['write'] = (time.perf_counter() - t0) * 1000
+        
+        # Feed the batch size controller with the time spent in the stages
+        # (queue waits of the pipelined mode excluded)
+        self.stage_ms = {stage: round(ms, 1) for stage, ms in batch['stage_ms'].items()}
+        self.controller.update(len(df), sum(batch['stage_ms'].values()) / 1000,
+                               self.db.get_scoring_backlog())
+        state = self.controller.state()
+        logger.info(
+            f"⚙ Batch {len(df)} rows in {state['last_latency_ms']:.0f} ms "
+            f"(claim {self.stage_ms['claim']:.0f} | transform {self.stage_ms['transform']:.0f} | "
+            f"predict {self.stage_ms['predict']:.0f} | write {self.stage_ms['write']:.0f}) | "
+            f"backlog {state['backlog']} | next batch {state['batch_size']} ({state['mode']})"
+        )
+        
+        # Update statistics
+        self.total_processed += len(df)
+        self.total_anomalies += int(is_anomaly.sum())
+        
+        # Log anomalies (the first ones only for large catch-up batches)
+        if is_anomaly.any():
+            logger.warning(f"⚠ ANOMALIES DETECTED: {int(is_anomaly.sum())}/{len(df)} records")
+            anomaly_records = df[is_anomaly]
+            for _, record in anomaly_records.head(Config.MAX_LOGGED_ANOMALIES).iterrows():
+                logger.warning(
+                    f"  → ID {record['id']}: "
+                    f"ts={record['ts']}, "
+                    f"power={record.get('global_active_power_kw', 'N/A'):.2f} kW, "
+                    f"voltage={record.get('voltage_v', 'N/A'):.1f} V"
+                )
+            if len(anomaly_records) > Config.MAX_LOGGED_ANOMALIES:
+                logger.warning(f"  → ... and {len(anomaly_records) - Config.MAX_LOGGED_ANOMALIES} more")
+        
+        self._publish_status()
+        
+        return len(df)
+    
+    def score_batch(self):
+        """
+        Score a batch of unscored records, stages run in sequence
+        (see src/pipeline.py for the pipelined mode)
+        
+        Returns:
+            int: Number of records processed
+        """
+        batch = self.claim_batch()
+        if batch is None:
             return 0
         
         try:
-            # Transform data using G3 parameters
-            X_transformed = self.preprocessor.transform(df)
-            
-            # Predict anomaly scores
-            anomaly_scores, is_anomaly = self.detector.predict(X_transformed)
-            
-            # Prepare updates for database
-            updates = []
-            for idx, (score, flag) in enumerate(zip(anomaly_scores, is_anomaly)):
-                record_id = int(df.iloc[idx]['id'])  # Convertir en int Python
-                updates.append((record_id, float(score), bool(flag)))
-            
-            # Update database
-            self.db.update_anomaly_scores(updates)
-            
-            # Update statistics
-            self.total_processed += len(df)
-            self.total_anomalies += sum(is_anomaly)
-            
-            # Log anomalies
-            if sum(is_anomaly) > 0:
-                logger.warning(f"⚠ ANOMALIES DETECTED: {sum(is_anomaly)}/{len(df)} records")
-                anomaly_records = df[is_anomaly]
-                for _, record in anomaly_records.iterrows():
-                    logger.warning(
-                        f"  → ID {record['id']}: "
-                        f"ts={record['ts']}, "
-                        f"power={record.get('global_active_power_kw', 'N/A'):.2f} kW, "
-                        f"voltage={record.get('voltage_v', 'N/A'):.1f} V"
-                    )
-            
-            return len(df)
+            return self.write_batch(self.compute_batch(batch))
         
         except Exception as e:
             logger.error(f"Error scoring batch: {e}")
@@ -133,12 +269,77 @@ class ScoringEngine:
             traceback.print_exc()
             return 0
     
-    def run_continuous(self, interval=None):
+    def _publish_status(self, force=False):
+        """Publish the controller state in scoring_worker_status (throttled)"""
+        now = time.monotonic()
+        elapsed = now - self.last_publish
+        if not force and elapsed < Config.SCORING_METRICS_INTERVAL:
+            return
+        rows_per_s = None
+        if self.last_publish > 0 and elapsed > 0:
+            rows_per_s = round((self.total_processed - self.processed_at_publish) / elapsed, 1)
+        self.db.publish_worker_status(self.worker_id, self.controller.state(), self.stage_ms,
+                                      rows_per_s, utilization=self.utilization,
+                                      model_version=self.detector.model_version)
+        self.last_publish = now
+        self.processed_at_publish = self.total_processed
+    
+    def swap_model_if_ready(self):
+        """
+        Swap in the preprocessor / detector pair validated by the model
+        watcher, if any (called between two batches)
+        
+        Returns:
+            bool: True if a new model was swapped in
+        """
+        if self.model_watcher is None:
+            return False
+        pending = self.model_watcher.take()
+        if pending is None:
+            return False
+        (preprocessor, detector), signature = pending
+        previous = self.detector.model_version
+        self.preprocessor, self.detector = preprocessor, detector
+        self.model_signature = signature
+        logger.info(f"🔄 Model swapped: {previous} → {detector.model_version}")
+        return True
+    
+    def watch_models(self):
+        """Start the background watcher of the model artifacts"""
+        if Config.MODEL_RELOAD_INTERVAL > 0 and self.model_watcher is None:
+            self.model_watcher = ModelWatcher(self.db, self.model_signature)
+            self.model_watcher.start()
+    
+    def sweep_gaps(self):
+        """Re-queue unscored records left behind the scoring watermark"""
+        self.last_gap_sweep = time.monotonic()
+        return self.db.sweep_scoring_gaps(lookback=Config.SCORING_GAP_LOOKBACK)
+    
+    def sweep_gaps_if_due(self):
+        """Gap sweep every SCORING_GAP_SWEEP_INTERVAL seconds"""
+        if time.monotonic() - self.last_gap_sweep >= Config.SCORING_GAP_SWEEP_INTERVAL:
+            self.sweep_gaps()
+    
+    def run_continuous(self, interval=None, pipelined=None):
         """
-        Run scoring engine continuously
+        Run scoring engine continuously. The engine sleeps on the
+        power_consumption_new notification channel and scores as soon as
+        new measurements are committed; notifications received within
+        SCORING_COALESCE_MS are coalesced into one micro-batch. While rows
+        are waiting (backlog estimate), the next batch is claimed without
+        waiting.
         
         Args:
-            interval (int): Seconds between scoring runs (default: from config)
+            interval (int): Fallback wake-up in seconds when no notification
+                arrives (polling interval if LISTEN is unavailable;
+                default: from config)
+            pipelined (bool): Run the claim / compute / write stages
+                concurrently (ScoringPipeline) instead of in sequence
+                (default: as given to the constructor, which sizes the
+                connection pool for it)
+        
+        New model artifacts are picked up without restart: see
+        swap_model_if_ready.
         """
         if not self.is_initialized:
             logger.error("Engine not initialized. Call initialize() first.")
@@ -146,23 +347,60 @@ class ScoringEngine:
         
         if interval is None:
             interval = Config.SCORING_INTERVAL
+        if pipelined is None:
+            pipelined = self.pipelined
+        
+        self.watch_models()
+        
+        if pipelined:
+            logger.info(f"\n▶ Starting pipelined scoring (fallback wake-up: {interval}s)")
+            logger.info("Press Ctrl+C to stop\n")
+            ScoringPipeline(self).run(interval)
+            logger.info("\n\n⏸ Stopping scoring engine...")
+            self._shutdown()
+            return
+        
+        listener = self.db.listen(Config.SCORING_CHANNEL)
+        coalesce = Config.SCORING_COALESCE_MS / 1000
         
-        logger.info(f"\n▶ Starting continuous scoring (interval: {interval}s)")
+        if listener is not None:
+            logger.info(f"\n▶ Starting event-driven scoring (fallback wake-up: {interval}s)")
+        else:
+            logger.info(f"\n▶ Starting continuous scoring (interval: {interval}s)")
         logger.info("Press Ctrl+C to stop\n")
         
         try:
             while True:
+                self.sweep_gaps_if_due()
+                
                 processed = self.score_batch()
                 
                 if processed > 0:
                     self._print_statistics()
                 
-                time.sleep(interval)
+                # Rows still waiting: claim the next batch without waiting
+                if processed > 0 and self.controller.backlog:
+                    continue
+                
+                if listener is not None:
+                    listener.wait(interval, coalesce=coalesce)
+                else:
+                    time.sleep(interval)
         
         except KeyboardInterrupt:
             logger.info("\n\n⏸ Stopping scoring engine...")
-            self._print_final_statistics()
-            self.db.disconnect()
+            if listener is not None:
+                listener.close()
+            self._shutdown()
+    
+    def _shutdown(self):
+        """Final statistics, release of the remaining claims, disconnection"""
+        if self.model_watcher is not None:
+            self.model_watcher.stop()
+        self._print_final_statistics()
+        self._publish_status(force=True)
+        self.db.release_claims(self.worker_id)
+        self.db.disconnect()
     
     def run_once(self):
         """
@@ -180,6 +418,7 @@ class ScoringEngine:
         else:
             logger.info("No unscored records found")
         
+        self.db.release_claims(self.worker_id)
         self.db.disconnect()
     
     def _print_statistics(self):
@@ -215,30 +454,86 @@ class ScoringEngine:
         logger.info("=" * 60)
 
 
+def run_worker(mode, interval, worker_id=None, pipelined=False):
+    """
+    Initialize and run one scoring engine (one process per worker)
+    
+    Args:
+        mode (str): 'continuous' or 'once'
+        interval (int): Scoring interval in seconds (continuous mode only)
+        worker_id (str): Worker identifier (default: hostname-pid)
+        pipelined (bool): Pipelined stages (continuous mode only)
+    """
+    engine = ScoringEngine(worker_id=worker_id, pipelined=pipelined and mode == 'continuous')
+    
+    if not engine.initialize():
+        logger.error("Failed to initialize scoring engine")
+        return
+    
+    # Run based on mode
+    if mode == 'continuous':
+        engine.run_continuous(interval=interval)
+    else:
+        engine.run_once()
+
+
 def main():
     """Main function to run the scoring engine"""
     import argparse
     
     parser = argparse.ArgumentParser(description='G4 - Real-Time Anomaly Scoring Engine')
-    parser.add_argument('--mode', choices=['continuous', 'once'], default='continuous',
-                       help='Run mode: continuous or once')
+    parser.add_argument('--mode', choices=['continuous', 'once', 'backfill'], default='continuous',
+                       help='Run mode: continuous, once, or backfill (score the backlog '
+                            'in parallel, then continuous)')
     parser.add_argument('--interval', type=int, default=None,
                        help='Scoring interval in seconds (continuous mode only)')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Number of concurrent scoring processes '
+                            '(default: 1, CPU count in backfill mode)')
+    parser.add_argument('--batch-size', type=int, default=None,
+                       help='Ids per batch in backfill mode (default: BACKFILL_BATCH_SIZE)')
+    parser.add_argument('--pipeline', action='store_true', default=Config.SCORING_PIPELINE,
+                       help='Overlap claim, compute and write of consecutive batches')
     
     args = parser.parse_args()
     
-    # Create and initialize engine
-    engine = ScoringEngine()
+    if args.mode == 'backfill':
+        db = DatabaseConnection(statement_timeout_ms=Config.BATCH_STATEMENT_TIMEOUT_MS)
+        if not db.connect():
+            return
+        scored = run_backfill(db, workers=args.workers, window=args.batch_size)
+        db.disconnect()
+        if scored is None:
+            return
+        # Caught up: the records inserted meanwhile are after the watermark
+        logger.info("▶ Backfill done, switching to live scoring")
+        run_worker('continuous', args.interval, pipelined=args.pipeline)
+        return
     
-    if not engine.initialize():
-        logger.error("Failed to initialize scoring engine")
+    if args.workers is None or args.workers <= 1:
+        run_worker(args.mode, args.interval, pipelined=args.pipeline)
         return
     
-    # Run based on mode
-    if args.mode == 'continuous':
-        engine.run_continuous(interval=args.interval)
-    else:
-        engine.run_once()
+    # One process per worker: each one opens its own connections and
+    # claims its own batches, so no row is scored twice
+    logger.info(f"▶ Starting {args.workers} scoring workers")
+    workers = [
+        multiprocessing.Process(
+            target=run_worker,
+            args=(args.mode, args.interval, f"{socket.gethostname()}-{os.getpid()}-w{i}", args.pipeline),
+            name=f"scoring-worker-{i}"
+        )
+        for i in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # Ctrl+C reaches every worker of the process group; wait for their shutdown
+        for worker in workers:
+            worker.join()
 
 
 if __name__ == "__main__":
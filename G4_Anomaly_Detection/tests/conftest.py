@@ -0,0 +1,11 @@
+"""
+Shared test setup: the G2 modules import each other by name (as when run
+from G2_data_engineering/), so that directory goes on the import path
+"""
+
+import sys
+from pathlib import Path
+
+G2_DIR = Path(__file__).resolve().parents[2] / 'G2_data_engineering'
+if str(G2_DIR) not in sys.path:
+    sys.path.insert(0, str(G2_DIR))
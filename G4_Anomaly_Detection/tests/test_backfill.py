@@ -0,0 +1,36 @@
+"""
+Tests of the id range split of the backfill mode (src/backfill.py)
+"""
+
+import pytest
+
+from src.backfill import split_range
+
+
+@pytest.mark.parametrize('range_from, range_to, parts', [
+    (0, 1000, 4),
+    (12345, 98765, 7),
+    (100, 103, 8),
+    (0, 1, 1),
+])
+def test_slices_are_contiguous_and_cover_the_range(range_from, range_to, parts):
+    slices = split_range(range_from, range_to, parts)
+    assert 1 <= len(slices) <= parts
+    assert slices[0][0] == range_from
+    assert slices[-1][1] == range_to
+    for (_, until_id), (after_id, _) in zip(slices, slices[1:]):
+        assert until_id == after_id
+    assert all(until_id > after_id for after_id, until_id in slices)
+
+
+def test_slices_are_balanced():
+    sizes = [hi - lo for lo, hi in split_range(0, 1003, 4)]
+    assert max(sizes) - min(sizes) <= 1
+
+
+def test_more_parts_than_ids():
+    assert split_range(100, 103, 8) == [(100, 101), (101, 102), (102, 103)]
+
+
+def test_empty_range():
+    assert split_range(500, 500, 4) == []
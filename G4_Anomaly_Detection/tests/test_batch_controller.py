@@ -0,0 +1,64 @@
+"""
+Tests of the adaptive batch size controller (src/batch_controller.py)
+"""
+
+import pytest
+
+from src.batch_controller import BatchSizeController
+
+OVERHEAD = 0.05     # s per batch
+ROW_COST = 1e-4     # s per row
+
+
+def latency(rows):
+    return OVERHEAD + rows * ROW_COST
+
+
+def test_fit_recovers_the_linear_model():
+    controller = BatchSizeController(target_latency=1.0, min_size=10, max_size=100000)
+    for rows in [100, 400, 250, 1000, 50, 800, 3000, 120]:
+        controller.update(rows, latency(rows), backlog=10 ** 6)
+    assert controller.row_cost == pytest.approx(ROW_COST, rel=1e-6)
+    assert controller.overhead == pytest.approx(OVERHEAD, rel=1e-6)
+    assert controller.capacity() == pytest.approx((1.0 - OVERHEAD) / ROW_COST, abs=1)
+
+
+def test_constant_size_charges_everything_per_row():
+    controller = BatchSizeController(target_latency=1.0, max_growth=1.0, initial_size=500)
+    for _ in range(5):
+        controller.update(500, latency(500), backlog=10 ** 6)
+    assert controller.overhead == 0.0
+    assert controller.row_cost == pytest.approx(latency(500) / 500)
+
+
+def test_newest_measurements_weigh_more():
+    controller = BatchSizeController(target_latency=1.0, smoothing=0.5)
+    for rows in [100, 1000, 100, 1000]:
+        controller.update(rows, latency(rows), backlog=10 ** 6)
+    # The per-row cost doubles: the fit follows within a few batches
+    for _ in range(20):
+        for rows in [100, 1000]:
+            controller.update(rows, OVERHEAD + rows * 2 * ROW_COST, backlog=10 ** 6)
+    assert controller.row_cost == pytest.approx(2 * ROW_COST, rel=1e-3)
+
+
+def test_growth_is_bounded():
+    controller = BatchSizeController(target_latency=10.0, initial_size=100, max_growth=2.0)
+    assert controller.update(100, latency(100), backlog=10 ** 6) == 200
+    assert controller.update(200, latency(200), backlog=10 ** 6) == 400
+    assert controller.mode == 'catch-up'
+
+
+def test_caught_up_follows_the_backlog():
+    controller = BatchSizeController(target_latency=1.0, min_size=10, initial_size=1000)
+    assert controller.update(1000, latency(1000), backlog=42) == 42
+    assert controller.mode == 'live'
+    assert controller.update(42, latency(42), backlog=0) == 10
+
+
+def test_overhead_above_target_falls_back_to_min_size():
+    controller = BatchSizeController(target_latency=0.01, min_size=10)
+    for rows in [100, 400, 1000]:
+        controller.update(rows, latency(rows), backlog=10 ** 6)
+    assert controller.capacity() == 10
+    assert controller.next_size() == 10
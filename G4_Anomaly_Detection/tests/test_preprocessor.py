@@ -0,0 +1,60 @@
+"""
+Tests of the fused scaler + PCA projection (src/preprocessor.py)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import QuantileTransformer
+
+from src.preprocessor import DataPreprocessor
+
+
+def measurements(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    preprocessor = DataPreprocessor()
+    scale = np.array([1.5, 0.2, 3.0, 6.0, 5.0, 6.0, 8.0])
+    center = np.array([1.1, 0.1, 240.0, 4.6, 1.1, 1.3, 6.4])
+    data = pd.DataFrame(rng.normal(size=(rows, len(scale))) * scale + center,
+                        columns=preprocessor.feature_columns)
+    # Missing measurements ('?' in the source)
+    data.iloc[::7, 1] = np.nan
+    data.iloc[::11, 4] = np.nan
+    return data
+
+
+@pytest.fixture
+def preprocessor():
+    preprocessor = DataPreprocessor()
+    preprocessor._create_default_parameters()
+    preprocessor.fit_default(measurements(5000))
+    return preprocessor
+
+
+def test_fused_matches_step_by_step(preprocessor):
+    assert preprocessor.weights is not None
+    data = measurements(20000, seed=1)
+    fused = preprocessor.transform(data)
+    steps = preprocessor._transform_steps(data[preprocessor.feature_columns].fillna(0).to_numpy())
+    assert fused.shape == steps.shape
+    assert np.abs(fused - steps).max() <= 1e-12
+
+
+def test_input_is_not_modified(preprocessor):
+    data = measurements(100, seed=2)
+    before = data.copy()
+    preprocessor.transform(data)
+    pd.testing.assert_frame_equal(data, before)
+
+
+def test_non_affine_scaler_runs_step_by_step(preprocessor):
+    preprocessor.scaler = QuantileTransformer(n_quantiles=100).fit(
+        measurements(5000)[preprocessor.feature_columns].fillna(0))
+    preprocessor.pca.fit(preprocessor.scaler.transform(
+        measurements(5000)[preprocessor.feature_columns].fillna(0)))
+    assert preprocessor._fuse_affine() is False
+    assert preprocessor.weights is None
+    data = measurements(1000, seed=3)
+    np.testing.assert_array_equal(
+        preprocessor.transform(data),
+        preprocessor._transform_steps(data[preprocessor.feature_columns].fillna(0).to_numpy()))
@@ -0,0 +1,75 @@
+"""
+Tests of the G2 replay rate controller (G2_data_engineering/rate_control.py)
+"""
+
+import pytest
+
+import rate_control
+from rate_control import RateController
+
+
+class FakeClock:
+    """monotonic / sleep without waiting: sleep advances the clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        self.slept += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_control, 'time', clock)
+    return clock
+
+
+def test_fixed_rate_bucket_starts_full(clock):
+    controller = RateController('fixed', rate=1000)
+    assert controller.capacity == 100
+    controller.acquire(100)
+    assert clock.slept == 0
+    controller.acquire(100)
+    assert clock.slept == pytest.approx(0.1)
+
+
+def test_fixed_rate_long_run(clock):
+    controller = RateController('fixed', rate=1000, report_every=1e9)
+    for _ in range(100):
+        controller.acquire(100)
+    # The first full bucket is free, the rest is sent at the target rate
+    assert clock.slept == pytest.approx((10000 - 100) / 1000)
+
+
+def test_refill_is_capped_at_capacity(clock):
+    controller = RateController('burst', rate=100, burst=500, report_every=1e9)
+    controller.acquire(500)
+    clock.now += 3600
+    controller.acquire(500)
+    assert clock.slept == 0
+    controller.acquire(1)
+    assert clock.slept == pytest.approx(0.01)
+
+
+def test_partial_refill(clock):
+    controller = RateController('fixed', rate=1000, report_every=1e9)
+    controller.acquire(100)
+    clock.now += 0.05
+    controller.acquire(50)
+    assert clock.slept == pytest.approx(0, abs=1e-9)
+    controller.acquire(50)
+    assert clock.slept == pytest.approx(0.05)
+
+
+def test_unlimited_never_sleeps(clock):
+    controller = RateController(None)
+    for _ in range(10):
+        controller.acquire(10 ** 6)
+    assert clock.slept == 0
+    assert controller.batch_size() is None
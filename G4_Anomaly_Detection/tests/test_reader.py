@@ -0,0 +1,134 @@
+"""
+Tests of the G2 streaming reader (G2_data_engineering/reader.py)
+"""
+
+import gzip
+import zipfile
+
+import numpy as np
+import pytest
+
+from reader import data_start, iter_blocks, split_ranges
+
+HEADER = "Date;Time;Global_active_power;Global_reactive_power;Voltage;Global_intensity;" \
+         "Sub_metering_1;Sub_metering_2;Sub_metering_3\n"
+CHUNK_BYTES = 4096
+
+
+def _lines(n):
+    """n minutes of measurements, every 50th one missing ('?')"""
+    rng = np.random.default_rng(0)
+    for i in range(n):
+        day, minute = divmod(i, 1440)
+        stamp = f"{16 + day:02d}/12/2006;{minute // 60:02d}:{minute % 60:02d}:00"
+        if i % 50 == 0:
+            yield stamp + ";?;?;?;?;?;?;\n"
+        else:
+            values = rng.uniform(0, 250, size=7)
+            yield stamp + ";" + ";".join(f"{v:.3f}" for v in values) + "\n"
+
+
+@pytest.fixture(scope='module')
+def sources(tmp_path_factory):
+    """The same data as plain text, gzip, zip and zstd"""
+    root = tmp_path_factory.mktemp('sources')
+    data = (HEADER + "".join(_lines(3000))).encode()
+
+    paths = {'plain': root / 'household_power_consumption.txt'}
+    paths['plain'].write_bytes(data)
+    paths['gzip'] = root / 'household_power_consumption.txt.gz'
+    with gzip.open(paths['gzip'], 'wb') as f:
+        f.write(data)
+    paths['zip'] = root / 'household_power_consumption.zip'
+    with zipfile.ZipFile(paths['zip'], 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('household_power_consumption.txt', data)
+    try:
+        import zstandard
+        paths['zstd'] = root / 'household_power_consumption.txt.zst'
+        paths['zstd'].write_bytes(zstandard.ZstdCompressor().compress(data))
+    except ImportError:
+        pass
+    return paths
+
+
+def assert_same_blocks(blocks, expected):
+    assert len(blocks) == len(expected)
+    for block, other in zip(blocks, expected):
+        assert (block.first_row, block.source_rows, block.start_offset, block.end_offset) == \
+               (other.first_row, other.source_rows, other.start_offset, other.end_offset)
+        assert block.columns.keys() == other.columns.keys()
+        for name in block.columns:
+            # NaN (missing measurements) compare equal
+            np.testing.assert_array_equal(block.columns[name], other.columns[name])
+
+
+def test_blocks_cover_the_source(sources):
+    blocks = list(iter_blocks(sources['plain'], chunk_bytes=CHUNK_BYTES))
+    assert len(blocks) > 1
+    assert sum(block.source_rows for block in blocks) == 3000
+    assert sum(len(block) for block in blocks) == 3000
+    for block, following in zip(blocks, blocks[1:]):
+        assert block.end_offset == following.start_offset
+        assert block.next_row == following.first_row
+    ts = np.concatenate([block.columns['ts'] for block in blocks])
+    assert (np.diff(ts) == np.timedelta64(60, 's')).all()
+    power = np.concatenate([block.columns['global_active_power_kw'] for block in blocks])
+    assert np.isnan(power[::50]).all()
+
+
+@pytest.mark.parametrize('codec', ['gzip', 'zip', 'zstd'])
+def test_compressed_blocks_match_plain(sources, codec):
+    if codec not in sources:
+        pytest.skip(f"{codec} not available")
+    expected = list(iter_blocks(sources['plain'], chunk_bytes=CHUNK_BYTES))
+    assert_same_blocks(list(iter_blocks(sources[codec], chunk_bytes=CHUNK_BYTES)), expected)
+
+
+@pytest.mark.parametrize('codec', ['plain', 'gzip'])
+def test_resume_at_block_boundary(sources, codec):
+    blocks = list(iter_blocks(sources[codec], chunk_bytes=CHUNK_BYTES))
+    k = len(blocks) // 2
+    resumed = list(iter_blocks(sources[codec], chunk_bytes=CHUNK_BYTES,
+                               start_offset=blocks[k].start_offset, start_row=blocks[k].first_row))
+    # Blocks are cut afresh from the resume point: same rows, same numbering
+    assert resumed[0].first_row == blocks[k].first_row
+    assert resumed[-1].next_row == blocks[-1].next_row
+    assert resumed[-1].end_offset == blocks[-1].end_offset
+    for name in blocks[k].columns:
+        np.testing.assert_array_equal(np.concatenate([block.columns[name] for block in resumed]),
+                                      np.concatenate([block.columns[name] for block in blocks[k:]]))
+
+
+@pytest.mark.parametrize('n', [1, 3, 8])
+def test_split_ranges_cover_the_rows(sources, n):
+    path = sources['plain']
+    data = path.read_bytes()
+    ranges = split_ranges(path, n)
+    assert 1 <= len(ranges) <= n
+    assert ranges[0][0] == data_start(path)
+    assert ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        # Contiguous and aligned on line starts
+        assert end == start
+        assert data[start - 1:start] == b"\n"
+
+    expected = np.concatenate([block.columns['ts'] for block in iter_blocks(path, chunk_bytes=CHUNK_BYTES)])
+    ts = np.concatenate([block.columns['ts']
+                         for start, end in ranges
+                         for block in iter_blocks(path, chunk_bytes=CHUNK_BYTES,
+                                                  start_offset=start, end_offset=end)])
+    np.testing.assert_array_equal(ts, expected)
+
+
+def test_split_ranges_more_ranges_than_lines(tmp_path):
+    path = tmp_path / 'small.txt'
+    path.write_text(HEADER + "".join(_lines(3)))
+    ranges = split_ranges(path, 10)
+    assert len(ranges) <= 3
+    assert all(end > start for start, end in ranges)
+    assert ranges[0][0] == len(HEADER) and ranges[-1][1] == path.stat().st_size
+
+
+def test_split_ranges_rejects_compressed_source(sources):
+    with pytest.raises(ValueError):
+        split_ranges(sources['gzip'], 4)
@@ -0,0 +1,48 @@
+"""
+Tests of the rollup refresh ranges of a scored batch (src/database.py)
+"""
+
+from datetime import datetime, timedelta
+
+from src.database import ROLLUP_RUN_GAP, touched_ranges
+
+T0 = datetime(2007, 3, 1)
+
+
+def minutes(*offsets):
+    return [T0 + timedelta(minutes=m) for m in offsets]
+
+
+def test_contiguous_rows_give_one_range():
+    assert touched_ranges(minutes(*range(100))) == [(T0, T0 + timedelta(minutes=99))]
+
+
+def test_distant_rows_are_not_bridged():
+    # Fresh rows plus a row swept from a month earlier: two runs, not the month between
+    ts = minutes(0, 1, 2) + [T0 - timedelta(days=30)]
+    assert touched_ranges(ts) == [(T0 - timedelta(days=30), T0 - timedelta(days=30)),
+                                  (T0, T0 + timedelta(minutes=2))]
+
+
+def test_gap_bound_is_inclusive():
+    gap = int(ROLLUP_RUN_GAP.total_seconds() // 60)
+    assert len(touched_ranges(minutes(0, gap))) == 1
+    assert len(touched_ranges(minutes(0, gap + 1))) == 2
+
+
+def test_unsorted_and_duplicate_timestamps():
+    ts = minutes(5, 0, 3, 3, 200, 1)
+    assert touched_ranges(ts) == [(T0, T0 + timedelta(minutes=5)),
+                                  (T0 + timedelta(minutes=200), T0 + timedelta(minutes=200))]
+
+
+def test_ranges_cover_every_timestamp():
+    ts = minutes(0, 10, 70, 131, 500, 501, 2000)
+    ranges = touched_ranges(ts)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert start - end > ROLLUP_RUN_GAP
+    assert all(any(lo <= t <= hi for lo, hi in ranges) for t in ts)
+
+
+def test_empty_batch():
+    assert touched_ranges([]) == []
@@ -1,9 +1,9 @@
 import pandas as pd
 import json
 
-df = pd.read_csv("data/baseline_dec_2006.csv")
+features = ["global_active_power_kw", "voltage_v", "global_intensity_a"]
 
-features = ["Global_active_power", "Voltage", "Global_intensity"]
+df = pd.read_parquet("data/baseline_dec_2006.parquet", columns=features)
 
 baseline = {}
 
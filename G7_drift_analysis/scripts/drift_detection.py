@@ -8,8 +8,8 @@ DATA_DIR = Path("data")
 OUT_DIR = Path("outputs")
 OUT_DIR.mkdir(exist_ok=True)
 
-baseline = pd.read_csv(DATA_DIR / "baseline_dec_2006.csv")
-current  = pd.read_csv(DATA_DIR / "current_data.csv")
+baseline = pd.read_parquet(DATA_DIR / "baseline_dec_2006.parquet")
+current  = pd.read_parquet(DATA_DIR / "current_data.parquet")
 
 # Colonnes numériques disponibles dans la DB (adaptées au schéma du projet)
 CANDIDATES = [
@@ -61,8 +61,8 @@ psi_df = pd.DataFrame(
 psi_df.to_csv(OUT_DIR / "psi_scores.csv", index=False)
 
 report = {
-    "baseline_file": str(DATA_DIR / "baseline_dec_2006.csv"),
-    "current_file": str(DATA_DIR / "current_data.csv"),
+    "baseline_file": str(DATA_DIR / "baseline_dec_2006.parquet"),
+    "current_file": str(DATA_DIR / "current_data.parquet"),
     "features_checked": cols,
     "results": results,
     "interpretation": {
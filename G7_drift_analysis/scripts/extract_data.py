@@ -1,30 +1,43 @@
-import psycopg2
-import pandas as pd
-
-conn = psycopg2.connect(
-    host="sdid_postgres",
-    port=5432,
-    database="sdid_db",
-    user="sdid_user",
-    password="sdid_password"
-)
-
-query_baseline = """
-SELECT *
-FROM power_consumption
-WHERE ts BETWEEN '2006-12-01' AND '2006-12-31'
-"""
-
-query_current = """
-SELECT *
-FROM power_consumption
-WHERE ts BETWEEN '2007-05-01' AND '2007-05-31'
-"""
-
-baseline = pd.read_sql(query_baseline, conn)
-current = pd.read_sql(query_current, conn)
-
-baseline.to_csv("data/baseline_dec_2006.csv", index=False)
-current.to_csv("data/current_data.csv", index=False)
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from common.columnar_cache import MEASUREMENT_COLUMNS
+from common.db import iter_history, read_history
+
+DATA_DIR = Path("data")
+DATA_DIR.mkdir(exist_ok=True)
+
+# Fenêtres comparées (bornes incluses, comme BETWEEN)
+BASELINE_WINDOW = ("2006-12-01", "2006-12-31")
+CURRENT_WINDOW = ("2007-05-01", "2007-05-31")
+
+COLUMNS = ["id", "ts"] + MEASUREMENT_COLUMNS
+
+
+def extract(path, window, with_anomaly_flag=False, refresh=True):
+    """
+    Écrit une fenêtre bloc par bloc : la mémoire ne dépend pas de la
+    largeur de la fenêtre.
+    """
+    writer = None
+    for block in iter_history(columns=COLUMNS, start=window[0], end=window[1],
+                              with_anomaly_flag=with_anomaly_flag, refresh=refresh):
+        table = pa.table(block)
+        writer = writer or pq.ParquetWriter(path, table.schema)
+        writer.write_table(table)
+    if writer is None:
+        # Fenêtre vide : fichier vide avec les bonnes colonnes
+        read_history(columns=COLUMNS, start=window[0], end=window[1],
+                     with_anomaly_flag=with_anomaly_flag, refresh=False).to_parquet(path, index=False)
+    else:
+        writer.close()
+
+
+# Lecture depuis l'archive froide et le cache Parquet partagé : seules les
+# partitions des deux fenêtres sont lues, sans requête sur la base (hormis is_anomaly)
+extract(DATA_DIR / "baseline_dec_2006.parquet", BASELINE_WINDOW)
+extract(DATA_DIR / "current_data.parquet", CURRENT_WINDOW, with_anomaly_flag=True, refresh=False)
 
 print("Extraction terminée avec succès")
@@ -1,6 +1,6 @@
 import pandas as pd
 
-df = pd.read_csv("data/current_data.csv")
+df = pd.read_parquet("data/current_data.parquet", columns=["is_anomaly"])
 
 precision_baseline = 0.95
 precision_current = 1 - df["is_anomaly"].mean()
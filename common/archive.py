@@ -0,0 +1,323 @@
+"""
+Archivage à froid des mois clos de power_consumption.
+
+- Chaque partition mensuelle antérieure à la fenêtre chaude est exportée
+  en Parquet (zstd, colonnes utiles seulement) :
+  <archive>/power_consumption/month=AAAA-MM/data.parquet
+- Les lignes exportées quittent la base : scores et réclamations de
+  scoring supprimés, partition détachée puis supprimée (pas de DELETE
+  ligne à ligne, rien à VACUUMer).
+- _manifest.json liste les mois archivés. Un mois est lu dans l'archive
+  s'il y figure et n'a plus de partition en base (`cold_months`) : un mois
+  rechargé depuis redevient chaud, un mois non archivé entre deux mois
+  archivés reste lu en base. Les lectures historiques passent par
+  common.db.read_history / iter_history, qui réunissent les deux. Un mois
+  n'entre au manifeste qu'une fois sa partition supprimée (commit validé).
+
+Les agrégats power_rollup_* ne sont pas touchés : ils couvrent toujours
+tout l'historique.
+
+Exemples :
+    python -m common.archive --list
+    python -m common.archive --keep-months 3
+    python -m common.archive --before 2007-06-01 --dry-run
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from common.columnar_cache import MEASUREMENT_COLUMNS, SCHEMA, block_to_table, build_filter, prune_months
+from common.db import get_connection, stream_query
+
+ARCHIVE_DIR = Path(os.getenv(
+    "SDID_ARCHIVE_DIR",
+    Path(__file__).resolve().parent.parent / "data" / "archive"
+))
+
+# inserted_at / scored_at ne servent à aucune lecture historique
+ARCHIVE_COLUMNS = ["id", "ts"] + MEASUREMENT_COLUMNS + ["is_anomaly", "anomaly_score", "model_version"]
+ARCHIVE_SCHEMA = (SCHEMA
+                  .append(pa.field("is_anomaly", pa.bool_()))
+                  .append(pa.field("anomaly_score", pa.float64()))
+                  .append(pa.field("model_version", pa.string())))
+PARTITIONING = ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive")
+DATASET_SCHEMA = ARCHIVE_SCHEMA.append(pa.field("month", pa.string()))
+
+# Un groupe de lignes par semaine de mesures : les filtres sur ts sautent
+# les groupes hors plage grâce aux statistiques min/max
+ROW_GROUP_ROWS = 7 * 1440
+
+PARTITIONS_SQL = """
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'power_consumption'::regclass
+      AND c.relname ~ '_y[0-9]{4}m[0-9]{2}$'
+    ORDER BY c.relname
+"""
+
+EXPORT_SQL = f"""
+    SELECT {", ".join(ARCHIVE_COLUMNS)}
+    FROM power_consumption_scored
+    WHERE ts >= %s AND ts < %s
+    ORDER BY id
+"""
+
+
+def dataset_dir():
+    return ARCHIVE_DIR / "power_consumption"
+
+
+def _manifest_path():
+    return ARCHIVE_DIR / "_manifest.json"
+
+
+def load_manifest():
+    """Mois archivés (AAAA-MM) et borne archived_until (exclue)"""
+    path = _manifest_path()
+    if not path.exists():
+        return {"months": [], "archived_until": None}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _save_manifest(months):
+    months = sorted(set(months))
+    until = (pd.Period(months[-1], "M") + 1).to_timestamp() if months else None
+    manifest = {"months": months, "archived_until": str(until) if until is not None else None}
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    path = _manifest_path()
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(tmp, path)
+    return manifest
+
+
+def _partition_month(relname):
+    """power_consumption_y2007m01 → '2007-01'"""
+    return f"{relname[-7:-3]}-{relname[-2:]}"
+
+
+def _partition_months(conn):
+    """Mois (AAAA-MM) ayant une partition en base"""
+    with conn.cursor() as cur:
+        cur.execute(PARTITIONS_SQL)
+        months = {_partition_month(row[0]) for row in cur.fetchall()}
+    conn.commit()
+    return months
+
+
+def cold_months(conn, start=None, end=None):
+    """
+    Mois à lire dans l'archive (AAAA-MM, triés) : listés au manifeste et
+    sans partition en base, limités aux mois de [start, end]
+    """
+    archived = set(load_manifest()["months"])
+    if not archived:
+        return []
+    first = pd.Timestamp(start).strftime("%Y-%m") if start is not None else "0000-00"
+    last = pd.Timestamp(end).strftime("%Y-%m") if end is not None else "9999-99"
+    return sorted(month for month in archived - _partition_months(conn) if first <= month <= last)
+
+
+def _write_month(month, table):
+    """
+    Écrit (ou complète) le fichier d'un mois. Si le mois est déjà archivé
+    (mois rechargé puis réarchivé), les ts déjà présents sont conservés.
+    """
+    month_dir = dataset_dir() / f"month={month}"
+    month_dir.mkdir(parents=True, exist_ok=True)
+    path = month_dir / "data.parquet"
+    if path.exists():
+        existing = pq.read_table(path, schema=ARCHIVE_SCHEMA)
+        known = pc.is_in(table.column("ts"), value_set=existing.column("ts"))
+        table = pa.concat_tables([existing, table.filter(pc.invert(known))])
+    table = table.sort_by("ts")
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(table, tmp, compression="zstd", row_group_size=ROW_GROUP_ROWS)
+    os.replace(tmp, path)
+    return table.num_rows
+
+
+def archive_partition(conn, relname):
+    """
+    Archive une partition mensuelle puis la supprime de la base, dans une
+    seule transaction : la partition est verrouillée en écriture pendant
+    l'export, aucune ligne ne peut donc être perdue entre export et DROP.
+    Retourne le nombre de lignes archivées.
+    """
+    month = _partition_month(relname)
+    start = pd.Period(month, "M").to_timestamp()
+    end = (pd.Period(month, "M") + 1).to_timestamp()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f'LOCK TABLE "{relname}" IN EXCLUSIVE MODE')
+            tables = [block_to_table(block, ARCHIVE_SCHEMA)
+                      for block in stream_query(EXPORT_SQL, (start.to_pydatetime(), end.to_pydatetime()),
+                                                conn=conn)]
+            rows = sum(table.num_rows for table in tables)
+            if rows:
+                _write_month(month, pa.concat_tables(tables))
+
+            cur.execute("DELETE FROM anomaly_scores WHERE measurement_ts >= %s AND measurement_ts < %s",
+                        (start.to_pydatetime(), end.to_pydatetime()))
+            cur.execute("DELETE FROM scoring_claims WHERE measurement_ts >= %s AND measurement_ts < %s",
+                        (start.to_pydatetime(), end.to_pydatetime()))
+            cur.execute(f'ALTER TABLE power_consumption DETACH PARTITION "{relname}"')
+            cur.execute(f'DROP TABLE "{relname}"')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    # Le mois n'est lu dans l'archive qu'une fois la partition supprimée :
+    # tant que le DROP n'est pas validé, ses lignes restent lues en base.
+    # Un arrêt avant cette ligne est réparé par recover_manifest.
+    _save_manifest(load_manifest()["months"] + [month])
+    return rows
+
+
+def recover_manifest(conn):
+    """
+    Ajoute au manifeste les mois dont le fichier est écrit et la partition
+    supprimée (archivage interrompu entre le commit et le manifeste).
+    Retourne les mois ajoutés.
+    """
+    listed = set(load_manifest()["months"])
+    written = {path.parent.name[len("month="):] for path in dataset_dir().glob("month=*/data.parquet")}
+    if not written - listed:
+        return []
+    recovered = sorted(written - listed - _partition_months(conn))
+    if recovered:
+        _save_manifest(sorted(listed) + recovered)
+    return recovered
+
+
+def closed_partitions(conn, before):
+    """Partitions entièrement antérieures à `before`"""
+    before = pd.Timestamp(before)
+    with conn.cursor() as cur:
+        cur.execute(PARTITIONS_SQL)
+        names = [row[0] for row in cur.fetchall()]
+    conn.commit()
+    return [name for name in names
+            if (pd.Period(_partition_month(name), "M") + 1).to_timestamp() <= before]
+
+
+def default_cutoff(conn, keep_months):
+    """Début du mois situé `keep_months` mois avant la mesure la plus récente"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT MAX(ts) FROM power_consumption")
+        last = cur.fetchone()[0]
+    conn.commit()
+    if last is None:
+        return None
+    return (pd.Period(pd.Timestamp(last), "M") - keep_months + 1).to_timestamp()
+
+
+def run(conn, before, dry_run=False):
+    """Archive toutes les partitions closes avant `before`"""
+    for month in recover_manifest(conn):
+        print(f"📦 {month} : archivage interrompu repris, mois ajouté au manifeste")
+    parts = closed_partitions(conn, before)
+    if dry_run:
+        for name in parts:
+            print(f"📦 {name} serait archivée")
+        return 0
+
+    total = 0
+    for name in parts:
+        rows = archive_partition(conn, name)
+        total += rows
+        print(f"📦 {name} : {rows} lignes archivées, partition supprimée")
+
+    # Les jours des mois archivés n'ont plus à rester dans le cache des lignes chaudes
+    prune_months(cold_months(conn))
+    return total
+
+
+def build_archive_filter(start=None, end=None, not_null=None, months=None):
+    """
+    Comme columnar_cache.build_filter, avec élimination des mois hors plage
+    (et hors `months` si la liste est donnée)
+    """
+    expr = build_filter(not_null=not_null)
+    if months is not None:
+        month = ds.field("month").isin(list(months))
+        expr = month if expr is None else expr & month
+    if start is not None:
+        start = pd.Timestamp(start)
+        month = ds.field("month") >= start.strftime("%Y-%m")
+        ts = ds.field("ts") >= pa.scalar(start.to_pydatetime(), type=pa.timestamp("us"))
+        expr = month & ts if expr is None else expr & month & ts
+    if end is not None:
+        end = pd.Timestamp(end)
+        month = ds.field("month") <= end.strftime("%Y-%m")
+        ts = ds.field("ts") <= pa.scalar(end.to_pydatetime(), type=pa.timestamp("us"))
+        expr = month & ts if expr is None else expr & month & ts
+    return expr
+
+
+def read_archive(columns=None, start=None, end=None, not_null=None, months=None):
+    """
+    Lit les mois archivés (bornes incluses sur ts, comme BETWEEN), limités
+    à `months` si la liste est donnée (voir cold_months).
+
+    Returns:
+        pd.DataFrame trié par id
+    """
+    columns = list(columns or ARCHIVE_COLUMNS)
+    root = dataset_dir()
+    if not any(root.glob("month=*/data.parquet")):
+        return pd.DataFrame({col: pd.Series(dtype=ARCHIVE_SCHEMA.field(col).type.to_pandas_dtype())
+                             for col in columns})
+
+    expr = build_archive_filter(start, end, not_null, months)
+    dataset = ds.dataset(root, schema=DATASET_SCHEMA, format="parquet", partitioning=PARTITIONING)
+    frame = dataset.to_table(columns=columns, filter=expr).to_pandas()
+    if "id" in frame.columns:
+        frame = frame.sort_values("id", ignore_index=True)
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivage à froid de power_consumption")
+    parser.add_argument("--keep-months", type=int, default=3,
+                        help="Mois conservés en base (mois de la mesure la plus récente inclus)")
+    parser.add_argument("--before", metavar="AAAA-MM-JJ",
+                        help="Archive les partitions entièrement antérieures à cette date")
+    parser.add_argument("--dry-run", action="store_true", help="Liste sans archiver")
+    parser.add_argument("--list", action="store_true", help="Affiche les mois archivés")
+    args = parser.parse_args()
+
+    if args.list:
+        manifest = load_manifest()
+        print(f"🗄️ {len(manifest['months'])} mois archivés, jusqu'à {manifest['archived_until'] or '-'} (exclu)")
+        for month in manifest["months"]:
+            path = dataset_dir() / f"month={month}" / "data.parquet"
+            if path.exists():
+                print(f"   {month} : {pq.ParquetFile(path).metadata.num_rows:>8,d} lignes "
+                      f"{path.stat().st_size / 1e6:6.1f} Mo")
+        return
+
+    conn = get_connection()
+    try:
+        before = args.before or default_cutoff(conn, args.keep_months)
+        if before is None:
+            print("ℹ️ power_consumption est vide")
+            return
+        total = run(conn, before, dry_run=args.dry_run)
+        if not args.dry_run:
+            print(f"✅ {total} lignes archivées (avant {pd.Timestamp(before):%Y-%m-%d})")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
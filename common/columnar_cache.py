@@ -0,0 +1,402 @@
+"""
+Cache colonnaire local de power_consumption, partagé par G3, G4 et G7.
+
+- Fichiers Parquet partitionnés par jour : <cache>/power_consumption/day=AAAA-MM-JJ/
+- Synchronisation incrémentale depuis PostgreSQL : seules les lignes
+  d'id supérieur au filigrane (_watermark.json) sont lues, plus les lignes
+  validées en retard derrière lui (chargement parallèle : des lots d'ids
+  plus bas validés après des ids plus hauts), recherchées sur les
+  SYNC_LOOKBACK_IDS derniers ids.
+- Lecture avec projection de colonnes et filtres poussés (pyarrow.dataset) :
+  seuls les jours et groupes de lignes concernés sont lus.
+
+Le cache ne contient que les colonnes de power_consumption (id, ts,
+mesures). Les résultats de scoring (table anomaly_scores) restent lus
+dans la base (voir with_anomaly_flag).
+"""
+
+import json
+import os
+from contextlib import nullcontext
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from common.db import pooled_connection, stream_query
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus
+    fcntl = None
+
+CACHE_DIR = Path(os.getenv(
+    "SDID_CACHE_DIR",
+    Path(__file__).resolve().parent.parent / "data" / "cache"
+))
+
+MEASUREMENT_COLUMNS = [
+    "global_active_power_kw",
+    "global_reactive_power_kw",
+    "voltage_v",
+    "global_intensity_a",
+    "sub_metering_1_wh",
+    "sub_metering_2_wh",
+    "sub_metering_3_wh",
+]
+CACHE_COLUMNS = ["id", "ts"] + MEASUREMENT_COLUMNS
+
+SCHEMA = pa.schema(
+    [("id", pa.int64()), ("ts", pa.timestamp("us"))]
+    + [(col, pa.float64()) for col in MEASUREMENT_COLUMNS]
+)
+PARTITIONING = ds.partitioning(pa.schema([("day", pa.string())]), flavor="hive")
+DATASET_SCHEMA = SCHEMA.append(pa.field("day", pa.string()))
+
+SYNC_BATCH_ROWS = 200_000
+MAX_FILES_PER_DAY = 8
+# Fenêtre d'ids, derrière le filigrane, où sont cherchées les lignes validées
+# en retard (comme SCORING_GAP_LOOKBACK côté G4)
+SYNC_LOOKBACK_IDS = 100_000
+
+SYNC_QUERY = f"""
+    SELECT {", ".join(CACHE_COLUMNS)}
+    FROM power_consumption
+    WHERE id > %s
+    ORDER BY id
+"""
+
+LOOKBACK_COUNT_QUERY = "SELECT COUNT(*) FROM power_consumption WHERE id > %s AND id <= %s"
+LOOKBACK_IDS_QUERY = "SELECT id FROM power_consumption WHERE id > %s AND id <= %s"
+
+LATE_ROWS_QUERY = f"""
+    SELECT {", ".join(CACHE_COLUMNS)}
+    FROM power_consumption
+    WHERE id = ANY(%s)
+    ORDER BY id
+"""
+
+
+def dataset_dir():
+    return CACHE_DIR / "power_consumption"
+
+
+def _watermark_path():
+    return CACHE_DIR / "_watermark.json"
+
+
+def load_watermark():
+    """Dernier id (et ts) présent dans le cache"""
+    path = _watermark_path()
+    if not path.exists():
+        return {"last_id": 0, "last_ts": None}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _save_watermark(last_id, last_ts):
+    path = _watermark_path()
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"last_id": int(last_id), "last_ts": str(last_ts)}), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _part_range(path):
+    """(id min, id max) encodés dans le nom part-<min>-<max>.parquet"""
+    _, lo, hi = path.stem.split("-")
+    return int(lo), int(hi)
+
+
+def _cleanup(root, last_id):
+    """
+    Supprime les fichiers écrits après le dernier filigrane validé
+    (synchronisation interrompue) et ceux couverts par un fichier compacté.
+    """
+    for day_dir in root.glob("day=*"):
+        # Les fichiers englobants (compactés) passent avant ceux qu'ils couvrent
+        parts = sorted(day_dir.glob("part-*.parquet"),
+                       key=lambda p: (_part_range(p)[0], -_part_range(p)[1]))
+        kept = []
+        for part in parts:
+            lo, hi = _part_range(part)
+            if lo > last_id or any(klo <= lo and hi <= khi for klo, khi in kept):
+                part.unlink()
+            else:
+                kept.append((lo, hi))
+        for tmp in day_dir.glob("*.tmp"):
+            tmp.unlink()
+
+
+def _write_part(day_dir, table):
+    ids = table.column("id").to_numpy()
+    day_dir.mkdir(parents=True, exist_ok=True)
+    path = day_dir / f"part-{ids.min():012d}-{ids.max():012d}.parquet"
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+    return path
+
+
+def block_to_table(block, schema=SCHEMA):
+    """Bloc de stream_query (dict de tableaux numpy) → table Arrow (NaN → null)"""
+    return pa.table({field.name: pa.array(block[field.name], type=field.type, from_pandas=True)
+                     for field in schema}, schema=schema)
+
+
+def _write_days(root, table):
+    """Écrit un lot trié par id en un fichier par jour ; retourne les jours touchés"""
+    ts = table.column("ts").to_numpy()
+    days = np.datetime_as_string(ts.astype("datetime64[D]"))
+    touched = []
+    for day in np.unique(days):
+        _write_part(root / f"day={day}", table.filter(pa.array(days == day)))
+        touched.append(day)
+    return touched
+
+
+def _lookback_parts(root, after_id):
+    """Fichiers du cache dont la plage d'ids dépasse after_id"""
+    return [part for part in root.glob("day=*/part-*.parquet") if _part_range(part)[1] > after_id]
+
+
+def _cached_ids(parts, after_id):
+    """Ids du cache supérieurs à after_id"""
+    ids = [pq.read_table(part, columns=["id"]).column("id").to_numpy() for part in parts]
+    ids = np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+    return ids[ids > after_id]
+
+
+def _merge_late(root, table):
+    """
+    Intègre des lignes d'ids déjà dépassés par le filigrane : chaque jour
+    touché est réécrit en un seul fichier trié, dont la plage couvre les
+    anciens (supprimés, ou par _cleanup après une interruption).
+    """
+    ts = table.column("ts").to_numpy()
+    days = np.datetime_as_string(ts.astype("datetime64[D]"))
+    for day in np.unique(days):
+        day_dir = root / f"day={day}"
+        parts = sorted(day_dir.glob("part-*.parquet"), key=_part_range)
+        merged = pa.concat_tables([pq.read_table(p, schema=SCHEMA) for p in parts]
+                                  + [table.filter(pa.array(days == day))])
+        path = _write_part(day_dir, merged.sort_by("id"))
+        for part in parts:
+            if part != path:
+                part.unlink()
+
+
+def _sync_late(root, conn, last_id, lookback):
+    """
+    Rattrape les lignes validées en retard : ids de (last_id - lookback,
+    last_id] présents en base mais absents du cache. Retourne leur nombre.
+    """
+    after_id = max(last_id - lookback, 0)
+    parts = _lookback_parts(root, after_id)
+    with conn.cursor() as cursor:
+        # Cas courant : mêmes effectifs, sans lire les ids (statistiques
+        # des groupes de lignes côté Parquet, index côté base)
+        cursor.execute(LOOKBACK_COUNT_QUERY, (after_id, last_id))
+        cached = ds.dataset(parts, schema=SCHEMA).count_rows(filter=ds.field("id") > after_id)
+        if cursor.fetchone()[0] == cached:
+            return 0
+        cursor.execute(LOOKBACK_IDS_QUERY, (after_id, last_id))
+        db_ids = np.fromiter((row[0] for row in cursor), dtype=np.int64)
+    missing = np.setdiff1d(db_ids, _cached_ids(parts, after_id))
+    if len(missing) == 0:
+        return 0
+
+    tables = [block_to_table(block)
+              for block in stream_query(LATE_ROWS_QUERY, (missing.tolist(),), SYNC_BATCH_ROWS, conn)]
+    _merge_late(root, pa.concat_tables(tables))
+    return len(missing)
+
+
+def _compact(root, days):
+    """Fusionne les fichiers d'un jour quand ils deviennent trop nombreux"""
+    for day in days:
+        day_dir = root / f"day={day}"
+        parts = sorted(day_dir.glob("part-*.parquet"), key=_part_range)
+        if len(parts) <= MAX_FILES_PER_DAY:
+            continue
+        table = pa.concat_tables([pq.read_table(p, schema=SCHEMA) for p in parts])
+        table = table.sort_by("id")
+        _write_part(day_dir, table)
+        for part in parts:
+            part.unlink()
+
+
+class _SyncLock:
+    """Verrou fichier : un seul service synchronise le cache à la fois"""
+
+    def __enter__(self):
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        self.handle = open(CACHE_DIR / ".lock", "w")
+        if fcntl:
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+        self.handle.close()
+
+
+def sync(conn=None, batch_rows=SYNC_BATCH_ROWS, lookback=SYNC_LOOKBACK_IDS):
+    """
+    Ajoute au cache les lignes de power_consumption d'id supérieur au
+    filigrane, puis celles validées en retard sur les `lookback` ids
+    précédents. Retourne le nombre de lignes ajoutées.
+    """
+    root = dataset_dir()
+    added = 0
+    touched = set()
+
+    with _SyncLock():
+        watermark = load_watermark()
+        last_id = watermark["last_id"]
+        _cleanup(root, last_id)
+
+        with (nullcontext(conn) if conn is not None else pooled_connection()) as conn:
+            # Curseur côté serveur : un seul bloc de batch_rows lignes en mémoire
+            for block in stream_query(SYNC_QUERY, (last_id,), batch_rows, conn):
+                touched.update(_write_days(root, block_to_table(block)))
+                last_id = int(block["id"][-1])
+                _save_watermark(last_id, pd.Timestamp(block["ts"][-1]))
+                added += len(block["id"])
+            late = _sync_late(root, conn, last_id, lookback) if lookback else 0
+            added += late
+            conn.commit()
+
+        _compact(root, touched)
+
+    if added:
+        detail = f", dont {late} validées en retard" if late else ""
+        print(f"Cache colonnaire : {added} nouvelles lignes (id ≤ {last_id}{detail})")
+    return added
+
+
+def prune_months(months):
+    """
+    Supprime du cache les jours des mois donnés (AAAA-MM : mois archivés,
+    voir common/archive.py) ; le filigrane n'est pas modifié.
+    """
+    months = set(months)
+    removed = 0
+    with _SyncLock():
+        for day_dir in dataset_dir().glob("day=*"):
+            if day_dir.name[len("day="):len("day=") + 7] in months:
+                for part in day_dir.iterdir():
+                    part.unlink()
+                day_dir.rmdir()
+                removed += 1
+    return removed
+
+
+def _ts_scalar(value):
+    return pa.scalar(pd.Timestamp(value).to_pydatetime(), type=pa.timestamp("us"))
+
+
+def build_filter(start=None, end=None, not_null=None, exclude_months=None):
+    """
+    Expression de filtre : start <= ts <= end (comme BETWEEN), colonnes
+    non nulles, hors des mois `exclude_months` (AAAA-MM). Le filtre sur
+    `day` élimine les partitions hors plage.
+    """
+    expr = None
+
+    def _and(e):
+        return e if expr is None else expr & e
+
+    if start is not None:
+        expr = _and((ds.field("day") >= pd.Timestamp(start).strftime("%Y-%m-%d"))
+                    & (ds.field("ts") >= _ts_scalar(start)))
+    if end is not None:
+        expr = _and((ds.field("day") <= pd.Timestamp(end).strftime("%Y-%m-%d"))
+                    & (ds.field("ts") <= _ts_scalar(end)))
+    for month in exclude_months or []:
+        expr = _and((ds.field("day") < f"{month}-01") | (ds.field("day") > f"{month}-31"))
+    for col in not_null or []:
+        expr = _and(ds.field(col).is_valid())
+    return expr
+
+
+def anomaly_ids(conn, start=None, end=None):
+    """
+    Ids des mesures dont le score retenu est une anomalie : celui de la
+    version de modèle active, sinon le plus récent hors rescorage en cours,
+    comme dans power_consumption_scored (petit ensemble, lu en base)
+    """
+    query = """
+        WITH v AS (
+            SELECT (SELECT model_version FROM active_model_version WHERE name = 'anomaly') AS active,
+                   (SELECT pending_version FROM active_model_version WHERE name = 'anomaly') AS pending
+        )
+        SELECT s.measurement_id FROM anomaly_scores s, v
+        WHERE s.is_anomaly
+          AND NOT EXISTS (
+              SELECT 1 FROM anomaly_scores n
+              WHERE n.measurement_id = s.measurement_id
+                AND (served_score_rank(n.model_version, v.active, v.pending), n.scored_at)
+                    > (served_score_rank(s.model_version, v.active, v.pending), s.scored_at)
+          )
+    """
+    params = []
+    if start is not None:
+        query += " AND s.measurement_ts >= %s"
+        params.append(start)
+    if end is not None:
+        query += " AND s.measurement_ts <= %s"
+        params.append(end)
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+        ids = [row[0] for row in cur.fetchall()]
+    conn.commit()
+    return ids
+
+
+def read_power_consumption(columns=None, start=None, end=None, not_null=None,
+                           with_anomaly_flag=False, refresh=True, exclude_months=None):
+    """
+    Lit power_consumption depuis le cache local.
+
+    Args:
+        columns (list): colonnes à lire (défaut : toutes les colonnes du cache)
+        start, end: bornes incluses sur ts
+        not_null (list): colonnes devant être non nulles
+        with_anomaly_flag (bool): ajoute is_anomaly (lu en base pour les seuls ids signalés)
+        refresh (bool): synchronise le cache avant lecture
+        exclude_months (list): mois (AAAA-MM) non lus (lus dans l'archive)
+
+    Returns:
+        pd.DataFrame trié par id
+    """
+    if refresh:
+        sync()
+
+    columns = list(columns or CACHE_COLUMNS)
+    read_columns = list(columns)
+    if with_anomaly_flag and "id" not in read_columns:
+        read_columns.append("id")
+
+    root = dataset_dir()
+    if not any(root.glob("day=*/part-*.parquet")):
+        frame = pd.DataFrame({col: pd.Series(dtype=SCHEMA.field(col).type.to_pandas_dtype())
+                              for col in read_columns})
+    else:
+        dataset = ds.dataset(root, schema=DATASET_SCHEMA, format="parquet", partitioning=PARTITIONING)
+        table = dataset.to_table(columns=read_columns,
+                                 filter=build_filter(start, end, not_null, exclude_months))
+        frame = table.to_pandas()
+        if "id" in frame.columns:
+            frame = frame.sort_values("id", ignore_index=True)
+
+    if with_anomaly_flag:
+        with pooled_connection() as conn:
+            flagged = anomaly_ids(conn, start, end)
+        frame["is_anomaly"] = frame["id"].isin(flagged)
+        if "id" not in columns:
+            frame = frame.drop(columns="id")
+
+    return frame
@@ -1,9 +1,10 @@
 import os
 
+# Les services du docker-compose exportent DB_* ; POSTGRES_* reste accepté
 DB_CONFIG = {
-    "host": os.getenv("POSTGRES_HOST", "127.0.0.1"),
-    "port": os.getenv("POSTGRES_PORT", 5433),
-    "dbname": os.getenv("POSTGRES_DB", "sdid_db"),
-    "user": os.getenv("POSTGRES_USER", "sdid_user"),
-    "password": os.getenv("POSTGRES_PASSWORD", "sdid_password"),
+    "host": os.getenv("DB_HOST", os.getenv("POSTGRES_HOST", "127.0.0.1")),
+    "port": os.getenv("DB_PORT", os.getenv("POSTGRES_PORT", 5433)),
+    "dbname": os.getenv("DB_NAME", os.getenv("POSTGRES_DB", "sdid_db")),
+    "user": os.getenv("DB_USER", os.getenv("POSTGRES_USER", "sdid_user")),
+    "password": os.getenv("DB_PASSWORD", os.getenv("POSTGRES_PASSWORD", "sdid_password")),
 }
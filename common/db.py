@@ -1,5 +1,398 @@
+import itertools
+import os
+import select
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
 import psycopg2
+from psycopg2 import extensions, pool, sql
 from common.config import DB_CONFIG
 
-def get_connection():
-    return psycopg2.connect(**DB_CONFIG)
+# Réglages par service (variables d'environnement du docker-compose)
+POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+POOL_MAX = int(os.getenv("DB_POOL_MAX", 4))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))        # attente max d'une connexion libre (s)
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))  # 0 : pas de limite
+APPLICATION_NAME = os.getenv("DB_APPLICATION_NAME", "sdid")
+
+# Une connexion inactive depuis plus longtemps est vérifiée (SELECT 1) à l'emprunt
+HEALTHCHECK_IDLE_S = 30
+
+# Lignes par bloc des lectures en flux (stream_query, iter_history)
+STREAM_BLOCK_ROWS = int(os.getenv("DB_STREAM_BLOCK_ROWS", 100_000))
+
+# OID PostgreSQL → dtype numpy des blocs (le reste reste en objets Python)
+_NUMPY_TYPES = {}
+_NUMPY_TYPES.update(dict.fromkeys(extensions.INTEGER.values + extensions.LONGINTEGER.values, np.int64))
+_NUMPY_TYPES.update(dict.fromkeys(extensions.FLOAT.values + extensions.DECIMAL.values, np.float64))
+_NUMPY_TYPES.update(dict.fromkeys(extensions.BOOLEAN.values, np.bool_))
+_NUMPY_TYPES.update(dict.fromkeys(extensions.PYDATETIME.values, "datetime64[us]"))
+_cursor_ids = itertools.count()
+
+
+def connect_params(application_name=None, statement_timeout_ms=None, **overrides):
+    """Paramètres psycopg2 communs : DB_CONFIG, application_name, statement_timeout"""
+    params = dict(DB_CONFIG, **overrides)
+    timeout = STATEMENT_TIMEOUT_MS if statement_timeout_ms is None else statement_timeout_ms
+    params["application_name"] = application_name or APPLICATION_NAME
+    params["options"] = f"-c statement_timeout={int(timeout)}"
+    params.setdefault("connect_timeout", 5)
+    return params
+
+
+def get_connection(**kwargs):
+    """
+    Connexion dédiée, pour les sessions longues (ingestion, synchronisation
+    du cache, archivage). Les accès courts passent par pooled_connection().
+    """
+    return psycopg2.connect(**connect_params(**kwargs))
+
+
+class ConnectionPool:
+    """
+    Pool thread-safe de connexions psycopg2 :
+    - minconn connexions ouvertes d'avance, au plus maxconn ;
+    - emprunt bloquant (au plus `timeout` s) quand toutes sont prises ;
+    - contrôle de santé à l'emprunt : une connexion fermée, ou inactive
+      depuis HEALTHCHECK_IDLE_S et qui ne répond plus, est remplacée ;
+    - au retour, une transaction laissée ouverte est annulée.
+    """
+
+    def __init__(self, minconn=POOL_MIN, maxconn=POOL_MAX, timeout=POOL_TIMEOUT, **params):
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self._pool = pool.ThreadedConnectionPool(minconn, maxconn, **connect_params(**params))
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}
+        self.pid = os.getpid()
+
+    def _healthy(self, conn):
+        if conn.closed:
+            return False
+        if time.monotonic() - self._last_used.get(id(conn), 0) < HEALTHCHECK_IDLE_S:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise pool.PoolError(f"aucune connexion libre après {self.timeout}s ({self.maxconn} en service)")
+        try:
+            # Après un redémarrage de PostgreSQL, toutes les connexions du
+            # pool peuvent être mortes : au plus maxconn remplacements
+            for _ in range(self.maxconn + 1):
+                conn = self._pool.getconn()
+                if self._healthy(conn):
+                    return conn
+                self._last_used.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+            raise pool.PoolError("aucune connexion saine disponible")
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        try:
+            close = bool(conn.closed)
+            if not close and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+            if close:
+                self._last_used.pop(id(conn), None)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+            self._pool.putconn(conn, close=close)
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+
+_pool = None
+_pool_settings = {}
+_pool_lock = threading.Lock()
+
+
+def configure_pool(**settings):
+    """
+    Réglages du pool du processus (minconn, maxconn, timeout,
+    application_name, statement_timeout_ms, paramètres de connexion).
+    À appeler au démarrage d'un service ; un pool déjà ouvert est refermé.
+    """
+    global _pool
+    with _pool_lock:
+        _pool_settings.clear()
+        _pool_settings.update(settings)
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+def get_pool():
+    """Pool du processus, créé au premier emprunt (recréé après un fork)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = ConnectionPool(**_pool_settings)
+        return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool.pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+
+
+@contextmanager
+def pooled_connection():
+    """
+    Emprunte une connexion du pool pour la durée du bloc. L'appelant valide
+    lui-même (conn.commit()) ; ce qui n'est pas validé est annulé au retour.
+    """
+    conn_pool = get_pool()
+    conn = conn_pool.getconn()
+    try:
+        yield conn
+    finally:
+        conn_pool.putconn(conn)
+
+
+class NotifyListener:
+    """
+    Abonnement LISTEN à un canal, sur une connexion dédiée (hors pool :
+    l'abonnement vit avec la session). wait() attend sur le socket de la
+    connexion (select), sans aucune requête tant que rien n'arrive.
+    """
+
+    def __init__(self, channel, **connect_kwargs):
+        self.channel = channel
+        self._connect_kwargs = connect_kwargs
+        self.conn = None
+        self._connect()
+
+    def _connect(self):
+        conn = get_connection(**self._connect_kwargs)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+        self.conn = conn
+
+    def _drain(self):
+        self.conn.poll()
+        received = len(self.conn.notifies)
+        self.conn.notifies.clear()
+        return received
+
+    def _select(self, timeout):
+        return bool(select.select([self.conn], [], [], max(timeout, 0))[0])
+
+    def wait(self, timeout, coalesce=0.0):
+        """
+        Attend au plus `timeout` s une notification. Une fois réveillé,
+        regroupe les notifications arrivées dans les `coalesce` s suivantes
+        (micro-lot). Retourne le nombre de notifications reçues, 0 si le
+        délai a expiré.
+        Connexion perdue : réabonnement, et 1 est retourné (des
+        notifications ont pu être perdues, l'appelant doit relire la file).
+        """
+        try:
+            if self.conn is None:
+                self._connect()
+                return 1
+            received = self._drain()
+            if not received:
+                if not self._select(timeout):
+                    return 0
+                received = self._drain()
+            deadline = time.monotonic() + coalesce
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._select(remaining):
+                    break
+                received += self._drain()
+            return received
+        except psycopg2.Error:
+            self.close()
+            time.sleep(min(timeout, 5))
+            return 1
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except psycopg2.Error:
+                pass
+            self.conn = None
+
+
+def _column_array(values, dtype):
+    """Colonne d'un bloc → tableau numpy typé (NULL → NaN / NaT)"""
+    if dtype is None:
+        return np.array(values, dtype=object)
+    if None in values and dtype in (np.int64, np.bool_):
+        # Entiers NULL : float64 (comme pandas) ; booléens NULL : objets
+        dtype = np.float64 if dtype is np.int64 else object
+    return np.array(values, dtype=dtype)
+
+
+def stream_query(query, params=None, block_rows=STREAM_BLOCK_ROWS, conn=None):
+    """
+    Exécute une requête avec un curseur nommé (côté serveur) et produit des
+    blocs d'au plus `block_rows` lignes : dict colonne → tableau numpy typé.
+    Seul le bloc courant existe en objets Python : la mémoire reste bornée
+    quelle que soit la taille du résultat.
+
+    Avec `conn`, le curseur vit dans la transaction en cours de l'appelant ;
+    sinon une connexion est empruntée au pool pour la durée du parcours.
+    """
+    if conn is None:
+        with pooled_connection() as conn:
+            yield from stream_query(query, params, block_rows, conn)
+            conn.commit()
+        return
+
+    with conn.cursor(name=f"sdid_stream_{next(_cursor_ids)}") as cur:
+        cur.itersize = block_rows
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(block_rows)
+            if not rows:
+                break
+            names = [desc[0] for desc in cur.description]
+            dtypes = [_NUMPY_TYPES.get(desc[1]) for desc in cur.description]
+            columns = list(zip(*rows))
+            del rows
+            yield {name: _column_array(values, dtype)
+                   for name, values, dtype in zip(names, columns, dtypes)}
+
+
+def blocks_to_frame(blocks):
+    """Concatène des blocs en un DataFrame (une seule copie des données)"""
+    blocks = list(blocks)
+    if not blocks:
+        return pd.DataFrame()
+    return pd.DataFrame({name: np.concatenate([block[name] for block in blocks])
+                         for name in blocks[0]})
+
+
+def _history_segments(cold, start=None, end=None):
+    """
+    Découpe [start, end] en segments chronologiques (niveau, début, fin),
+    bornes incluses, None : non borné : ("archive", …) pour chaque mois
+    froid (voir common.archive.cold_months), ("cache", …) entre eux.
+    """
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    tick = pd.Timedelta(microseconds=1)
+    segments = []
+    lower = start
+    for month in cold:
+        month_start = pd.Period(month, "M").to_timestamp()
+        month_end = (pd.Period(month, "M") + 1).to_timestamp() - tick
+        if lower is None or lower < month_start:
+            segments.append(("cache", lower, month_start - tick))
+        segments.append(("archive", max(lower, month_start) if lower is not None else month_start,
+                         min(end, month_end) if end is not None else month_end))
+        lower = month_end + tick
+    if lower is None or end is None or lower <= end:
+        segments.append(("cache", lower, end))
+    return segments
+
+
+def read_history(columns=None, start=None, end=None, not_null=None,
+                 with_anomaly_flag=False, refresh=True):
+    """
+    Lecture historique de power_consumption, archive comprise : les mois
+    archivés (sans partition en base) sont lus dans les fichiers Parquet
+    (common/archive.py), les autres dans le cache synchronisé depuis la
+    base (common/columnar_cache.py). Mêmes paramètres et même résultat
+    (trié par id) que read_power_consumption.
+    """
+    # Imports différés : ces modules importent get_connection
+    from common.archive import cold_months, read_archive
+    from common.columnar_cache import read_power_consumption, sync
+
+    if refresh:
+        sync()
+    with pooled_connection() as conn:
+        cold = cold_months(conn, start, end)
+
+    frames = []
+    if cold:
+        archive_columns = list(columns) if columns else None
+        if archive_columns and with_anomaly_flag and "is_anomaly" not in archive_columns:
+            archive_columns.append("is_anomaly")
+        archived = read_archive(archive_columns, start, end, not_null, months=cold)
+        if columns is None:
+            archived = archived.drop(columns=["anomaly_score", "model_version"]
+                                     + ([] if with_anomaly_flag else ["is_anomaly"]))
+        frames.append(archived)
+
+    # Toujours lu : donne les colonnes du résultat, même vide
+    frames.append(read_power_consumption(columns, start, end, not_null, with_anomaly_flag=with_anomaly_flag,
+                                         refresh=False, exclude_months=cold))
+
+    frames = [frame for frame in frames if len(frame)] or frames[-1:]
+    frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if "id" in frame.columns:
+        frame = frame.sort_values("id", ignore_index=True)
+    return frame
+
+
+def iter_history(columns=None, start=None, end=None, not_null=None,
+                 with_anomaly_flag=False, block_rows=STREAM_BLOCK_ROWS, refresh=True):
+    """
+    Même périmètre que read_history (archive + cache), parcouru par blocs
+    d'au plus `block_rows` lignes (dict colonne → tableau numpy), dans
+    l'ordre chronologique (mois archivés et mois chauds entrelacés). Pour
+    traiter tout l'historique avec une mémoire bornée.
+    """
+    import pyarrow.dataset as ds
+    from common import archive, columnar_cache
+
+    if refresh:
+        columnar_cache.sync()
+    columns = list(columns or columnar_cache.CACHE_COLUMNS)
+    with pooled_connection() as conn:
+        cold = archive.cold_months(conn, start, end)
+        flagged = (np.array(columnar_cache.anomaly_ids(conn, start, end), dtype=np.int64)
+                   if with_anomaly_flag else None)
+
+    out_columns = columns + (["is_anomaly"] if with_anomaly_flag and "is_anomaly" not in columns else [])
+    # niveau → (dossier, schéma, partitionnement, filtre, colonnes lues)
+    tiers = {
+        "archive": (archive.dataset_dir(), archive.DATASET_SCHEMA, archive.PARTITIONING,
+                    archive.build_archive_filter, out_columns),
+        "cache": (columnar_cache.dataset_dir(), columnar_cache.DATASET_SCHEMA, columnar_cache.PARTITIONING,
+                  columnar_cache.build_filter,
+                  columns + (["id"] if with_anomaly_flag and "id" not in columns else [])),
+    }
+    datasets = {}
+    for tier, lower, upper in _history_segments(cold, start, end):
+        root, schema, partitioning, build_filter, read_columns = tiers[tier]
+        if tier not in datasets:
+            datasets[tier] = (ds.dataset(root, schema=schema, format="parquet", partitioning=partitioning)
+                              if any(root.glob("*=*/*.parquet")) else None)
+        if datasets[tier] is None:
+            continue
+        for batch in datasets[tier].to_batches(columns=read_columns, filter=build_filter(lower, upper, not_null),
+                                               batch_size=block_rows):
+            if not batch.num_rows:
+                continue
+            block = {name: batch.column(name).to_numpy(zero_copy_only=False) for name in read_columns}
+            if tier == "cache" and flagged is not None:
+                block["is_anomaly"] = np.isin(block["id"], flagged)
+            yield {name: block[name] for name in out_columns}
@@ -3,21 +3,66 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 from flask import Flask, render_template, jsonify, session, request, redirect, url_for, render_template_string
 from functools import wraps
+from contextlib import contextmanager
 from datetime import datetime
 
 # استيراد وظيفة الاتصال (تأكد أن ملف db_connection.py موجود في نفس المجلد)
 try:
-    from db_connection import get_connection
+    from db_connection import pooled_connection
 except ImportError:
     # وظيفة احتياطية في حال لم يتم العثور sur le fichier
-    def get_connection():
-        return psycopg2.connect(
+    @contextmanager
+    def pooled_connection():
+        conn = psycopg2.connect(
             host=os.getenv('DB_HOST', 'db'),
             port=os.getenv('DB_PORT', '5432'),
             dbname=os.getenv('DB_NAME', 'sdid_db'),
             user=os.getenv('DB_USER', 'sdid_user'),
             password=os.getenv('DB_PASSWORD', 'sdid_password')
         )
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+def query_db(query, one=False):
+    """ Exécute une requête de lecture sur une connexion du pool """
+    with pooled_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(query)
+            result = cur.fetchone() if one else cur.fetchall()
+        conn.commit()
+    return result
+
+# Score retenu de chaque mesure, comme dans la vue power_consumption_scored :
+# version active d'abord, puis le plus récent, les scores d'un rescorage en
+# cours (pending_version) en dernier recours. Les `limit` anomalies les plus
+# récentes sont lues par scored_at décroissant (index idx_as_anomalies) ; un
+# score écarté au profit d'un autre score de la même mesure n'est jamais
+# renvoyé.
+RECENT_ANOMALIES = """
+    WITH v AS (
+        SELECT (SELECT model_version FROM active_model_version WHERE name = 'anomaly') AS active,
+               (SELECT pending_version FROM active_model_version WHERE name = 'anomaly') AS pending
+    ), s AS (
+        SELECT s.measurement_id, s.measurement_ts, s.anomaly_score, s.scored_at
+        FROM anomaly_scores s, v
+        WHERE s.is_anomaly = TRUE {where}
+          AND NOT EXISTS (
+              SELECT 1 FROM anomaly_scores n
+              WHERE n.measurement_id = s.measurement_id
+                AND (served_score_rank(n.model_version, v.active, v.pending), n.scored_at)
+                    > (served_score_rank(s.model_version, v.active, v.pending), s.scored_at)
+          )
+        ORDER BY s.scored_at DESC LIMIT {limit}
+    )
+    SELECT p.ts, p.global_active_power_kw, p.voltage_v, p.global_intensity_a,
+           s.anomaly_score, s.scored_at
+    FROM s
+    JOIN power_consumption p ON p.id = s.measurement_id AND p.ts = s.measurement_ts
+    ORDER BY s.scored_at DESC
+"""
 
 app = Flask(__name__)
 
@@ -116,20 +161,14 @@ def index():
 def api_data():
     """ API : Renvoie les 100 dernières mesures """
     try:
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
         query = """
             SELECT ts, global_active_power_kw, global_reactive_power_kw, voltage_v, 
                    global_intensity_a, sub_metering_1_wh, sub_metering_2_wh, sub_metering_3_wh, 
                    is_anomaly, anomaly_score
-            FROM power_consumption
+            FROM power_consumption_scored
             ORDER BY ts DESC LIMIT 100
         """
-        cur.execute(query)
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+        rows = query_db(query)
 
         data = []
         for row in rows:
@@ -154,20 +193,18 @@ def api_data():
 def api_stats():
     """ API : Statistiques globales """
     try:
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        # Agrégats journaliers tenus à jour par G2 / G4 (quelques centaines de lignes
+        # au lieu d'un parcours complet de power_consumption)
         query = """
-            SELECT COUNT(*) as total_records,
-                   COUNT(CASE WHEN is_anomaly = TRUE THEN 1 END) as total_anomalies,
-                   AVG(global_active_power_kw) as avg_power,
-                   MAX(global_active_power_kw) as max_power,
-                   AVG(voltage_v) as avg_voltage
-            FROM power_consumption
+            SELECT SUM(row_count) as total_records,
+                   SUM(anomaly_count) as total_anomalies,
+                   SUM(global_active_power_kw_sum)
+                       / NULLIF(SUM(row_count) - SUM(global_active_power_kw_nulls), 0) as avg_power,
+                   MAX(global_active_power_kw_max) as max_power,
+                   SUM(voltage_v_sum) / NULLIF(SUM(row_count) - SUM(voltage_v_nulls), 0) as avg_voltage
+            FROM power_rollup_day
         """
-        cur.execute(query)
-        stats = cur.fetchone()
-        cur.close()
-        conn.close()
+        stats = query_db(query, one=True)
 
         return jsonify({
             'success': True,
@@ -187,20 +224,9 @@ def api_stats():
 def api_anomalies():
     """ API : Anomalies récentes (basées sur scored_at) """
     try:
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
         # Filtre sur les anomalies détectées dans les 10 dernières minutes
-        query = """
-            SELECT ts, global_active_power_kw, voltage_v, anomaly_score, scored_at
-            FROM power_consumption
-            WHERE is_anomaly = TRUE 
-              AND scored_at IS NOT NULL
-            ORDER BY scored_at DESC LIMIT 20
-        """
-        cur.execute(query)
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+        query = RECENT_ANOMALIES.format(where="", limit=20)
+        rows = query_db(query)
 
         anomalies = []
         for row in rows:
@@ -220,19 +246,8 @@ def api_anomalies():
 def api_current_alert():
     """ API : Alerte Temps Réel (Dernière minute) """
     try:
-        conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        query = """
-            SELECT ts, global_active_power_kw, voltage_v, global_intensity_a, anomaly_score, scored_at
-            FROM power_consumption
-            WHERE is_anomaly = TRUE 
-              AND scored_at >= NOW() - INTERVAL '1 minute'
-            ORDER BY scored_at DESC LIMIT 1
-        """
-        cur.execute(query)
-        alert = cur.fetchone()
-        cur.close()
-        conn.close()
+        query = RECENT_ANOMALIES.format(where="AND s.scored_at >= NOW() - INTERVAL '1 minute'", limit=1)
+        alert = query_db(query, one=True)
 
         if alert:
             return jsonify({
@@ -1,6 +1,35 @@
 import psycopg2
 from psycopg2.extras import RealDictCursor  # ← NOUVEAU : Import pour curseur dictionnaire
 import os
+from contextlib import contextmanager
+
+# Paramètres de connexion (identiques à ceux de G2)
+DB_PARAMS = {
+    "host": os.getenv("DB_HOST", "127.0.0.1"),  # "db" pour Docker, "127.0.0.1" pour local
+    "port": os.getenv("DB_PORT", "5432"),  # Ton port PostgreSQL
+    "dbname": os.getenv("DB_NAME", "sdid_db"),
+    "user": os.getenv("DB_USER", "postgres"),
+    "password": os.getenv("DB_PASSWORD", "23654"),
+}
+
+try:
+    # Pool partagé (common/db.py, monté dans le conteneur) : une requête API
+    # emprunte une connexion déjà ouverte au lieu d'en ouvrir une
+    from common.db import configure_pool, pooled_connection
+    configure_pool(
+        application_name=os.getenv("DB_APPLICATION_NAME", "g5_dashboard"),
+        statement_timeout_ms=int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 5000)),
+        **DB_PARAMS
+    )
+except ImportError:
+    # Dashboard déployé seul (Dockerfile.txt) : une connexion par requête
+    @contextmanager
+    def pooled_connection():
+        conn = get_connection()
+        try:
+            yield conn
+        finally:
+            conn.close()
 
 
 def get_connection():
@@ -12,17 +41,10 @@ def get_connection():
     - Import RealDictCursor pour utilisation dans app.py
     - Paramètres flexibles via variables d'environnement
     - Gestion robuste des erreurs
+    - Les routes de app.py passent par pooled_connection()
     """
     try:
-        # Paramètres de connexion (identiques à ceux de G2)
-        return psycopg2.connect(
-            host=os.getenv("DB_HOST", "127.0.0.1"),  # "db" pour Docker, "127.0.0.1" pour local
-            port=os.getenv("DB_PORT", "5432"),  # Ton port PostgreSQL
-            dbname=os.getenv("DB_NAME", "sdid_db"),
-            user=os.getenv("DB_USER", "postgres"),
-            password=os.getenv("DB_PASSWORD", "23654"),
-            connect_timeout=5
-        )
+        return psycopg2.connect(connect_timeout=5, **DB_PARAMS)
     except psycopg2.OperationalError as e:
         raise RuntimeError(f"❌ Impossible de se connecter à PostgreSQL : {e}")
 
@@ -45,7 +67,7 @@ if __name__ == "__main__":
         # Test bonus : Vérifier les anomalies récentes
         cur.execute("""
             SELECT COUNT(*) as recent_anomalies 
-            FROM power_consumption 
+            FROM anomaly_scores 
             WHERE is_anomaly = TRUE 
               AND scored_at >= NOW() - INTERVAL '10 minutes'
         """)